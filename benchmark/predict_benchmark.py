@@ -0,0 +1,256 @@
+"""
+预测链路基准测试
+
+用数据集样本合成不同分辨率、不同数字个数的图片，分别测量
+_pre_processing / _get_contours / transform / inference 各阶段以及端到端的延迟分位数与吞吐量，
+各阶段耗时取自 Predictor.predict 内 track_stage 记录的直方图（即 /api/metrics 的 predict_stage_seconds），
+与线上链路完全一致（包括按 max_batch_size 分块推理），结果写入 JSON；指定 --baseline 时与基线比较，任一阶段退化超过阈值则以非零状态退出。
+
+用法：
+- python benchmark/predict_benchmark.py --output storage/benchmarks/latest.json
+- python benchmark/predict_benchmark.py --baseline storage/benchmarks/baseline.json --threshold 0.15
+"""
+
+import sys
+import os
+
+# 添加项目根目录到 sys.path，以便能够导入 core 模块
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import argparse
+import json
+import platform
+import time
+from datetime import datetime
+from typing import Dict, Any, List
+
+import cv2
+import numpy as np
+import torch
+from config.config_manager import ConfigManager
+from core.metrics import STAGE_LATENCY
+from core.model_factory import ModelFactory
+from core.predictor import Predictor
+
+RESOLUTIONS = [(320, 240), (1280, 720), (1920, 1080)]
+DIGIT_COUNTS = [1, 5, 20]
+# 合成图片中单个数字的最小边长与相邻数字的最小间距（像素），
+# 间距需大于预处理中膨胀操作的范围，否则相邻数字会被分割为同一个轮廓
+MIN_DIGIT_SIZE = 16
+MIN_DIGIT_GAP = 6
+STAGES = ["pre_processing", "get_contours", "transform", "inference", "end_to_end"]
+# 结果中的阶段名 -> Predictor 中 track_stage 使用的阶段名
+STAGE_LABELS = {
+    "pre_processing": "preprocess",
+    "get_contours": "contours",
+    "transform": "transform",
+    "inference": "inference",
+}
+
+
+def load_digit_samples(config_manager: ConfigManager, dataset_name: str, count: int = 200) -> List[np.ndarray]:
+    """
+    从数据集中取若干张数字样本，转为白底黑字的 uint8 图片
+    数据集不可用时用 cv2.putText 渲染的数字代替
+    """
+    samples = []
+    try:
+        loaders = ModelFactory(config_manager).create_data_loaders(dataset_name, {"batch_size": 64})
+        for images, _ in loaders["val"]:
+            for image in images:
+                arr = image.reshape(28, 28).numpy()
+                arr = (arr - arr.min()) / max(arr.max() - arr.min(), 1e-6)
+                samples.append((255 - arr * 255).astype(np.uint8))
+            if len(samples) >= count:
+                break
+    except Exception as e:
+        print(f"[WARN] 无法加载数据集 {dataset_name}，改用渲染数字: {e}")
+
+    if not samples:
+        for digit in range(10):
+            img = np.full((28, 28), 255, dtype=np.uint8)
+            cv2.putText(img, str(digit), (5, 23), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+            samples.append(img)
+    return samples[:count]
+
+
+def digit_size(width: int, height: int, num_digits: int) -> int:
+    """每个数字的边长：不超过画布高度的一半，且与相邻数字至少相隔 MIN_DIGIT_GAP"""
+    slot = width // num_digits
+    return min(int(height * 0.5), int(slot * 0.8), slot - MIN_DIGIT_GAP)
+
+
+def compose_image(samples: List[np.ndarray], width: int, height: int, num_digits: int,
+                  rng: np.random.Generator) -> np.ndarray:
+    """把 num_digits 个样本从左到右贴到白色画布上，模拟拍照上传的多数字图片（BGR）"""
+    size = digit_size(width, height, num_digits)
+    if size < MIN_DIGIT_SIZE:
+        raise ValueError(f"{width}x{height} 的画布放不下 {num_digits} 个数字")
+    canvas = np.full((height, width), 255, dtype=np.uint8)
+    slot = width // num_digits
+
+    for i in range(num_digits):
+        sample = samples[rng.integers(len(samples))]
+        digit = cv2.resize(sample, (size, size), interpolation=cv2.INTER_LINEAR)
+        x = i * slot + (slot - size) // 2
+        y = (height - size) // 2 + int(rng.integers(-size // 8, size // 8 + 1))
+        y = min(max(y, 0), height - size)
+        canvas[y:y + size, x:x + size] = np.minimum(canvas[y:y + size, x:x + size], digit)
+
+    noise = rng.normal(0, 4, canvas.shape)
+    canvas = np.clip(canvas.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(canvas, cv2.COLOR_GRAY2BGR)
+
+
+def summarize(latencies: List[float], items_per_run: float = 1.0) -> Dict[str, float]:
+    arr = np.array(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p90_ms": float(np.percentile(arr, 90)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "mean_ms": float(arr.mean()),
+        "throughput_per_s": float(items_per_run * 1000 / arr.mean()) if arr.mean() > 0 else 0.0,
+    }
+
+
+def stage_seconds() -> Dict[str, float]:
+    """track_stage 直方图中各阶段的累计耗时（秒）"""
+    snapshot = STAGE_LATENCY.snapshot()
+    return {stage: snapshot.get((label,), [0.0])[-1] for stage, label in STAGE_LABELS.items()}
+
+
+def bench_scenario(predictor: Predictor, images: List[np.ndarray], repeats: int, warmup: int) -> Dict[str, Any]:
+    """
+    对一组图片逐阶段计时：每次只调用一次 predictor.predict，
+    各阶段耗时为调用前后 track_stage 累计耗时之差（分块推理时为各分块之和）
+    """
+    timings = {stage: [] for stage in STAGES}
+    crops_total = 0
+    runs = 0
+
+    for iteration in range(warmup + repeats):
+        for img in images:
+            before = stage_seconds()
+            t0 = time.perf_counter()
+            result = predictor.predict(img, render="none")
+            t1 = time.perf_counter()
+            after = stage_seconds()
+
+            if iteration < warmup:
+                continue
+            for stage in STAGE_LABELS:
+                timings[stage].append(after[stage] - before[stage])
+            timings["end_to_end"].append(t1 - t0)
+            crops_total += len(result["probabilities"])
+            runs += 1
+
+    crops_per_image = crops_total / runs if runs else 0.0
+    result = {stage: summarize(values) for stage, values in timings.items()}
+    # transform 与 inference 的吞吐量以字符为单位
+    for stage in ("transform", "inference"):
+        result[stage] = summarize(timings[stage], crops_per_image)
+    result["crops_per_image"] = crops_per_image
+    return result
+
+
+def run_benchmark(dataset_name: str, repeats: int, warmup: int, images_per_scenario: int,
+                  seed: int) -> Dict[str, Any]:
+    config_manager = ConfigManager()
+    predictor = Predictor(config_manager)
+    predictor.load_model()
+
+    rng = np.random.default_rng(seed)
+    samples = load_digit_samples(config_manager, dataset_name)
+
+    scenarios = {}
+    for width, height in RESOLUTIONS:
+        for num_digits in DIGIT_COUNTS:
+            name = f"{width}x{height}_d{num_digits}"
+            if digit_size(width, height, num_digits) < MIN_DIGIT_SIZE:
+                print(f"[WARN] 跳过 {name}：画布宽度不足，数字之间无法留出间距")
+                continue
+            images = [compose_image(samples, width, height, num_digits, rng) for _ in range(images_per_scenario)]
+            scenarios[name] = bench_scenario(predictor, images, repeats, warmup)
+            print(f"{name}: 端到端 p50 {scenarios[name]['end_to_end']['p50_ms']:.2f} ms, "
+                  f"p99 {scenarios[name]['end_to_end']['p99_ms']:.2f} ms")
+
+    return {
+        "meta": {
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "opencv": cv2.__version__,
+            "torch_threads": torch.get_num_threads(),
+            "device": str(predictor.device),
+            "model": predictor.get_model_info().get("model_type"),
+            "backend": predictor.backend,
+            "preprocess_backend": predictor.preprocess_backend,
+            "dataset": dataset_name,
+            "repeats": repeats,
+            "images_per_scenario": images_per_scenario,
+            "seed": seed,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            metric: str = "p50_ms") -> List[Dict[str, Any]]:
+    """返回相对基线退化超过 threshold 的阶段列表"""
+    regressions = []
+    for name, stages in baseline.get("scenarios", {}).items():
+        if name not in current["scenarios"]:
+            continue
+        for stage in STAGES:
+            if stage not in stages:
+                continue
+            base = stages[stage][metric]
+            now = current["scenarios"][name][stage][metric]
+            change = (now - base) / base if base > 0 else 0.0
+            if change > threshold:
+                regressions.append({
+                    "scenario": name,
+                    "stage": stage,
+                    "baseline": base,
+                    "current": now,
+                    "change": change,
+                })
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='预测链路基准测试')
+    parser.add_argument('--dataset', default='mnist', help='用于合成图片的数据集')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--images', type=int, default=5, help='每个场景合成的图片数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=os.path.join(project_root, 'storage/benchmarks/latest.json'))
+    parser.add_argument('--baseline', help='基线结果 JSON，指定后进行回归比较')
+    parser.add_argument('--threshold', type=float, default=0.15, help='允许的相对退化比例')
+    parser.add_argument('--metric', default='p50_ms', choices=['p50_ms', 'p90_ms', 'p99_ms', 'mean_ms'])
+    args = parser.parse_args()
+
+    torch.manual_seed(args.seed)
+    results = run_benchmark(args.dataset, args.repeats, args.warmup, args.images, args.seed)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=4, ensure_ascii=False)
+    print(f"📘 基准结果已保存到: {os.path.abspath(args.output)}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.metric)
+        if regressions:
+            print(f"❌ {len(regressions)} 个阶段相对基线退化超过 {args.threshold:.0%}:")
+            for r in regressions:
+                print(f"  {r['scenario']:<16} {r['stage']:<15} {r['baseline']:.3f} -> {r['current']:.3f} ms "
+                      f"(+{r['change']:.0%})")
+            sys.exit(1)
+        print(f"✅ 所有阶段均未超过基线 {args.threshold:.0%}")
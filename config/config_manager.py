@@ -1,9 +1,20 @@
+import copy
 import json
 import os
-from typing import Dict, Any, Optional
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable, List, Tuple
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
 class ConfigManager:
     def __init__(self):
         self.config_dir = Path(__file__).parent
@@ -11,6 +22,14 @@ class ConfigManager:
         self.train_config_path = os.path.join(self.config_dir, "train_config.json")
         self.system_config_path = os.path.join(self.config_dir, "system_config.json")
 
+        # 已解析配置的内存缓存：路径 -> (文件签名, 配置内容)，签名变化时重新读取
+        self._cache: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_file = None
+        # 配置变化订阅者：callback(file_path, config)
+        self._subscribers: List[Callable[[str, Dict[str, Any]], None]] = []
+
         # 确保配置文件存在
         self._ensure_config_files_exist()
 
@@ -30,26 +49,121 @@ class ConfigManager:
         if not os.path.exists(self.system_config_path):
             print(f"缺少配置文件-system_config")
 
+    @staticmethod
+    def _file_signature(file_path: str) -> Tuple[int, int, int]:
+        """文件签名：修改时间 + 大小 + inode（原子替换后 inode 会变化）"""
+        st = os.stat(file_path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
     def _load_json(self, file_path: str) -> Dict[str, Any]:
-        """加载JSON文件"""
+        """加载JSON文件，返回可自由修改的副本"""
+        return copy.deepcopy(self._read_config(file_path))
+
+    def _read_config(self, file_path: str) -> Dict[str, Any]:
+        """
+        读取配置，文件签名未变化时直接返回缓存对象
+        返回值与缓存共享，调用方只能读取，需要修改时使用 _load_json
+        """
         try:
+            signature = self._file_signature(file_path)
+            with self._lock:
+                cached = self._cache.get(file_path)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
             with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                data = json.load(f)
         except (FileNotFoundError, json.JSONDecodeError) as e:
             raise Exception(f"Failed to load config file {file_path}: {str(e)}")
 
+        with self._lock:
+            self._cache[file_path] = (signature, data)
+        if cached is not None:
+            # 文件被其他进程或实例修改过
+            self._notify(file_path, data)
+        return data
+
     def _save_json(self, file_path: str, data: Dict[str, Any]):
-        """保存JSON文件"""
+        """保存JSON文件：写入临时文件后原子替换，读者不会看到写了一半的文件"""
+        tmp_path = None
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            with self._locked():
+                fd, tmp_path = tempfile.mkstemp(dir=self.config_dir, prefix=".", suffix=".tmp")
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=4, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, file_path)
+                tmp_path = None
+
+                with self._lock:
+                    self._cache[file_path] = (self._file_signature(file_path), copy.deepcopy(data))
         except Exception as e:
             raise Exception(f"Failed to save config file {file_path}: {str(e)}")
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._notify(file_path, data)
+
+    @contextmanager
+    def _locked(self):
+        """
+        配置写锁：线程间使用可重入锁，进程间使用 config 目录下的锁文件
+        setter 的“读取-修改-保存”全程持有该锁，避免并发写入互相覆盖
+        """
+        with self._lock:
+            if self._lock_depth == 0:
+                self._lock_file = open(os.path.join(self.config_dir, ".config.lock"), 'a+')
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+                else:
+                    self._lock_file.seek(0)
+                    msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    if fcntl is not None:
+                        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+                    else:
+                        self._lock_file.seek(0)
+                        msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def subscribe(self, callback: Callable[[str, Dict[str, Any]], None]):
+        """订阅配置变化，callback(file_path, config) 在检测到文件内容变化或保存后调用"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, Dict[str, Any]], None]):
+        """取消订阅配置变化"""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _notify(self, file_path: str, data: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(file_path, copy.deepcopy(data))
+            except Exception as e:
+                print(f"配置变化回调执行失败: {e}")
+
+    def check_for_changes(self):
+        """主动检查所有配置文件是否被外部修改，有变化时重新加载并通知订阅者"""
+        for file_path in (self.prediction_config_path, self.train_config_path, self.system_config_path):
+            if os.path.exists(file_path):
+                self._read_config(file_path)
 
     def create_training_config(self, training_request: Dict[str, Any]) -> Dict[str, Any]:
         """根据训练请求生成训练配置对象"""
         # 获取系统配置中的默认值
-        system_config = self.get_system_config()
+        system_config = self._read_config(self.system_config_path)
         training_defaults = system_config.get("training_defaults", {})
 
         # 创建训练配置
@@ -64,11 +178,37 @@ class ConfigManager:
                 "epochs": training_request.get("epochs", training_defaults.get("epochs", 50)),
                 "optimizer": training_request.get("optimizer", training_defaults.get("optimizer", "adam")),
                 "loss_function": training_request.get("loss_function",
-                                                      training_defaults.get("loss_function", "cross_entropy"))
-
+                                                      training_defaults.get("loss_function", "cross_entropy")),
+                "val_interval": training_request.get("val_interval", training_defaults.get("val_interval", 1)),
+                "val_fraction": training_request.get("val_fraction", training_defaults.get("val_fraction", 1.0)),
+                "checkpoint_interval": training_request.get("checkpoint_interval",
+                                                            training_defaults.get("checkpoint_interval", 1)),
+                "checkpoint_keep": training_request.get("checkpoint_keep", training_defaults.get("checkpoint_keep", 2)),
+                "monitor": training_request.get("monitor", training_defaults.get("monitor", "val_loss")),
+                "early_stopping_patience": training_request.get("early_stopping_patience",
+                                                                training_defaults.get("early_stopping_patience", 0)),
+                "early_stopping_min_delta": training_request.get("early_stopping_min_delta",
+                                                                 training_defaults.get("early_stopping_min_delta", 0.0)),
+                "restore_best_weights": training_request.get("restore_best_weights",
+                                                             training_defaults.get("restore_best_weights", True)),
+                "lr_scheduler": training_request.get("lr_scheduler", training_defaults.get("lr_scheduler", "none")),
+                "num_workers": training_request.get("num_workers", training_defaults.get("num_workers", 0)),
+                "prefetch_factor": training_request.get("prefetch_factor", training_defaults.get("prefetch_factor", 2)),
+                "persistent_workers": training_request.get("persistent_workers",
+                                                           training_defaults.get("persistent_workers", False)),
+                "pin_memory": training_request.get("pin_memory", training_defaults.get("pin_memory", False)),
+                "augmentation": training_request.get("augmentation", training_defaults.get("augmentation")),
+                "progress_step_interval": training_request.get("progress_step_interval",
+                                                               training_defaults.get("progress_step_interval", 50))
             },
         }
 
+        # 学习率调度器与验证子集种子的可选参数，未指定时使用 ModelFactory 中的默认值
+        for key in ("lr_step_size", "lr_gamma", "lr_min", "lr_max", "lr_patience", "val_seed",
+                    "stop_check_interval"):
+            if key in training_request:
+                training_config["hyperparameters"][key] = training_request[key]
+
         return training_config
 
     def get_train_config(self) -> Dict[str, Any]:
@@ -77,50 +217,176 @@ class ConfigManager:
 
     def get_mobile_prediction_model(self) -> str:
         """获取手机端预测使用的模型名称"""
-        config = self._load_json(self.prediction_config_path)
+        config = self._read_config(self.prediction_config_path)
         return config.get("mobile_prediction_model", "mlp_model")
 
     def set_mobile_prediction_model(self, model_name: str):
         """设置手机端预测使用的模型"""
-        config = self._load_json(self.prediction_config_path)
-        config["mobile_prediction_model"] = model_name
-        config["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self._save_json(self.prediction_config_path, config)
+        with self._locked():
+            config = self._load_json(self.prediction_config_path)
+            config["mobile_prediction_model"] = model_name
+            config["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._save_json(self.prediction_config_path, config)
 
     def get_system_config(self) -> Dict[str, Any]:
         """获取系统配置"""
         return self._load_json(self.system_config_path)
 
+    def get_dataset_cache_config(self) -> Dict[str, Any]:
+        """获取数据集预解码缓存配置"""
+        system_config = self._read_config(self.system_config_path)
+        dataset_cache = system_config.get("dataset_cache", {})
+        return {
+            "enabled": dataset_cache.get("enabled", True),
+            "cache_dir": dataset_cache.get("cache_dir", "storage/dataset_cache"),
+            "verify_checksum": dataset_cache.get("verify_checksum", False),
+        }
+
+    def get_training_server_config(self) -> Dict[str, Any]:
+        """获取训练任务服务的监听地址、并发上限与进度推送频率配置"""
+        system_config = self._read_config(self.system_config_path)
+        training_server = system_config.get("training_server", {})
+        return {
+            "host": training_server.get("host", "0.0.0.0"),
+            "port": training_server.get("port", 5897),
+            "max_concurrent_jobs": training_server.get("max_concurrent_jobs", 1),
+            "progress_interval": training_server.get("progress_interval", 0.5),
+            "max_history": training_server.get("max_history", 100),
+        }
+
     def get_available_models(self) -> Dict[str, Any]:
         """获取可用的模型列表"""
-        system_config = self.get_system_config()
-        return system_config.get("available_models", {})
+        system_config = self._read_config(self.system_config_path)
+        return copy.deepcopy(system_config.get("available_models", {}))
 
     def get_available_datasets(self) -> Dict[str, Any]:
         """获取可用的数据集列表"""
-        system_config = self.get_system_config()
-        return system_config.get("available_datasets", {})
+        system_config = self._read_config(self.system_config_path)
+        return copy.deepcopy(system_config.get("available_datasets", {}))
 
     def add_new_model(self, model_id: str, model_config: Dict[str, Any]):
         """添加新模型到系统配置"""
-        system_config = self.get_system_config()
-        system_config["available_models"][model_id] = model_config
-        self._save_json(self.system_config_path, system_config)
+        with self._locked():
+            system_config = self.get_system_config()
+            system_config["available_models"][model_id] = model_config
+            self._save_json(self.system_config_path, system_config)
 
     def add_new_dataset(self, dataset_id: str, dataset_config: Dict[str, Any]):
         """添加新数据集到系统配置"""
-        system_config = self.get_system_config()
-        system_config["available_datasets"][dataset_id] = dataset_config
-        self._save_json(self.system_config_path, system_config)
+        with self._locked():
+            system_config = self.get_system_config()
+            system_config["available_datasets"][dataset_id] = dataset_config
+            self._save_json(self.system_config_path, system_config)
 
     def get_prediction_weights_path(self) -> Optional[str]:
         """获取预测使用的权重文件路径"""
-        config = self._load_json(self.prediction_config_path)
+        config = self._read_config(self.prediction_config_path)
         return config.get("model_weights_path")
 
+    def get_prediction_max_batch_size(self) -> int:
+        """获取预测时单次前向传播的最大批量大小"""
+        config = self._read_config(self.prediction_config_path)
+        return int(config.get("max_batch_size", 64))
+
+    def get_prediction_render_mode(self) -> str:
+        """获取预测结果的渲染模式（none / return / window）"""
+        config = self._read_config(self.prediction_config_path)
+        return config.get("render_mode", "none")
+
+    def get_prediction_preprocess_backend(self) -> str:
+        """获取字符归一化方式（opencv / torchvision）"""
+        config = self._read_config(self.prediction_config_path)
+        return config.get("preprocess_backend", "opencv")
+
+    def get_micro_batching_config(self) -> Dict[str, Any]:
+        """
+        获取跨请求微批推理配置
+        max_batch_size 为空时跟随预测器当前的 max_batch_size（热切换后自动生效）
+        """
+        config = self._read_config(self.prediction_config_path)
+        micro_batching = config.get("micro_batching", {})
+        return {
+            "enabled": micro_batching.get("enabled", False),
+            "window_ms": micro_batching.get("window_ms", 3),
+            "max_batch_size": micro_batching.get("max_batch_size"),
+            "timeout": micro_batching.get("timeout", 5.0),
+        }
+
+    def get_async_server_config(self) -> Dict[str, Any]:
+        """获取异步预测服务的线程池与并发限制配置"""
+        config = self._read_config(self.prediction_config_path)
+        async_server = config.get("async_server", {})
+        return {
+            "max_workers": async_server.get("max_workers", 4),
+            "max_in_flight": async_server.get("max_in_flight", 32),
+        }
+
+    def get_batch_predict_config(self) -> Dict[str, Any]:
+        """获取批量预测接口的并行度与分组配置"""
+        config = self._read_config(self.prediction_config_path)
+        batch_predict = config.get("batch_predict", {})
+        return {
+            "max_workers": batch_predict.get("max_workers", 4),
+            "images_per_batch": batch_predict.get("images_per_batch", 32),
+            "max_images": batch_predict.get("max_images", 10000),
+            "max_image_bytes": batch_predict.get("max_image_bytes", 10 * 1024 * 1024),
+            "max_archive_bytes": batch_predict.get("max_archive_bytes", 512 * 1024 * 1024),
+            "max_archive_members": batch_predict.get("max_archive_members", 20000),
+        }
+
+    def get_result_cache_config(self) -> Dict[str, Any]:
+        """获取预测结果缓存配置"""
+        config = self._read_config(self.prediction_config_path)
+        result_cache = config.get("result_cache", {})
+        return {
+            "enabled": result_cache.get("enabled", False),
+            "max_entries": result_cache.get("max_entries", 1024),
+            "max_bytes": result_cache.get("max_bytes", 16 * 1024 * 1024),
+            "ttl": result_cache.get("ttl", 300),
+            "shared_dir": result_cache.get("shared_dir"),
+        }
+
+    def get_hot_reload_config(self) -> Dict[str, Any]:
+        """获取模型热切换配置"""
+        config = self._read_config(self.prediction_config_path)
+        hot_reload = config.get("hot_reload", {})
+        return {
+            "enabled": hot_reload.get("enabled", True),
+            "interval": hot_reload.get("interval", 2.0),
+        }
+
+    def get_model_pool_config(self) -> Dict[str, Any]:
+        """获取多模型常驻池配置"""
+        config = self._read_config(self.prediction_config_path)
+        model_pool = config.get("model_pool", {})
+        return {
+            "memory_budget_mb": model_pool.get("memory_budget_mb", 256),
+        }
+
+    def get_profiling_config(self) -> Dict[str, Any]:
+        """
+        获取预测请求性能剖析配置（sample_rate 为持续采样比例，0 表示只按需剖析）
+        debug_endpoint 控制是否开放 /api/debug/profile（无鉴权，默认关闭），max_request_count 为一次最多剖析的请求数
+        """
+        config = self._read_config(self.prediction_config_path)
+        profiling = config.get("profiling", {})
+        return {
+            "sample_rate": profiling.get("sample_rate", 0.0),
+            "output_dir": profiling.get("output_dir", "storage/temp/profiles"),
+            "max_dumps": profiling.get("max_dumps", 50),
+            "debug_endpoint": profiling.get("debug_endpoint", False),
+            "max_request_count": profiling.get("max_request_count", 10),
+        }
+
+    def get_prediction_backend(self) -> str:
+        """获取预测推理后端（eager / torchscript / onnxruntime / int8）"""
+        config = self._read_config(self.prediction_config_path)
+        return config.get("backend", "eager")
+
     def set_prediction_weights_path(self, weights_path: str):
         """设置预测使用的权重文件路径"""
-        config = self._load_json(self.prediction_config_path)
-        config["model_weights_path"] = weights_path
-        config["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self._save_json(self.prediction_config_path, config)
+        with self._locked():
+            config = self._load_json(self.prediction_config_path)
+            config["model_weights_path"] = weights_path
+            config["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._save_json(self.prediction_config_path, config)
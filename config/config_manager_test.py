@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from config.config_manager import ConfigManager
+
+
+@pytest.fixture
+def config_manager(tmp_path):
+    """在临时目录中的配置副本上操作，不修改仓库中的配置文件"""
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in ("prediction_config.json", "train_config.json", "system_config.json"):
+        shutil.copy(os.path.join(source_dir, name), tmp_path / name)
+
+    manager = ConfigManager()
+    manager.config_dir = tmp_path
+    manager.prediction_config_path = str(tmp_path / "prediction_config.json")
+    manager.train_config_path = str(tmp_path / "train_config.json")
+    manager.system_config_path = str(tmp_path / "system_config.json")
+    return manager
+
+
+def _rewrite(path, **changes):
+    """模拟其他进程修改配置（原子替换，签名一定变化）"""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(changes)
+    tmp_path = path + ".new"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    os.replace(tmp_path, path)
+
+
+def test_unchanged_file_is_served_from_cache(config_manager):
+    first = config_manager._read_config(config_manager.prediction_config_path)
+    second = config_manager._read_config(config_manager.prediction_config_path)
+    assert first is second
+
+
+def test_load_json_returns_independent_copy(config_manager):
+    copy = config_manager._load_json(config_manager.prediction_config_path)
+    copy["mobile_prediction_model"] = "changed"
+    assert config_manager._read_config(config_manager.prediction_config_path)["mobile_prediction_model"] != "changed"
+
+
+def test_external_change_is_reloaded_and_notified(config_manager):
+    events = []
+    config_manager.subscribe(lambda path, config: events.append((path, config["mobile_prediction_model"])))
+    assert config_manager.get_mobile_prediction_model() == "cnn_model"
+
+    _rewrite(config_manager.prediction_config_path, mobile_prediction_model="mlp_model")
+    assert config_manager.get_mobile_prediction_model() == "mlp_model"
+    assert events == [(config_manager.prediction_config_path, "mlp_model")]
+
+
+def test_check_for_changes_notifies_without_reads(config_manager):
+    events = []
+    config_manager.subscribe(lambda path, config: events.append(path))
+    config_manager.check_for_changes()
+    assert events == []
+
+    _rewrite(config_manager.system_config_path, extra=True)
+    config_manager.check_for_changes()
+    assert events == [config_manager.system_config_path]
+
+
+def test_setter_saves_atomically_and_notifies(config_manager):
+    events = []
+
+    def callback(path, config):
+        events.append(config["mobile_prediction_model"])
+
+    config_manager.subscribe(callback)
+    config_manager.set_mobile_prediction_model("mlp_model")
+    assert events == ["mlp_model"]
+    with open(config_manager.prediction_config_path, "r", encoding="utf-8") as f:
+        assert json.load(f)["mobile_prediction_model"] == "mlp_model"
+    assert not [name for name in os.listdir(config_manager.config_dir) if name.endswith(".tmp")]
+
+    config_manager.unsubscribe(callback)
+    config_manager.set_mobile_prediction_model("cnn_model")
+    assert events == ["mlp_model"]
+
+
+def test_training_config_defaults(config_manager):
+    training_config = config_manager.create_training_config({
+        "model_architecture": "cnn_model",
+        "dataset_name": "mnist",
+        "val_seed": 3
+    })
+    hyperparameters = training_config["hyperparameters"]
+    assert hyperparameters["val_seed"] == 3
+    # 多进程加载需要显式开启
+    assert hyperparameters["num_workers"] == 0
+    assert not hyperparameters["persistent_workers"]
+    assert not hyperparameters["pin_memory"]
+    assert "lr_gamma" not in hyperparameters
@@ -0,0 +1,146 @@
+import math
+from typing import Dict, Any, Optional, Sequence
+
+import torch
+import torch.nn.functional as F
+
+
+class BatchAugmentation:
+    """
+    整批 Tensor 上的数据增强，在训练设备上执行（GPU 上几乎不占用时间）：
+    1. 随机仿射：旋转 / 平移 / 缩放 / 错切，由 affine_grid 生成采样网格
+    2. 弹性形变：高斯平滑的随机位移场叠加到采样网格上
+    3. 高斯噪声
+    几何变换合并为一次 grid_sample；边界用 border 填充，归一化后的背景值保持不变
+    支持 (N, C, H, W) 与展平的 (N, H*W) 输入（MLP），输出形状与输入一致
+    """
+
+    def __init__(self, rotation: float = 0.0, translate: float = 0.0, scale: Sequence[float] = (1.0, 1.0),
+                 shear: float = 0.0, elastic_alpha: float = 0.0, elastic_sigma: float = 4.0,
+                 noise_std: float = 0.0, p: float = 1.0):
+        """
+        Args:
+            rotation: 最大旋转角度（度）
+            translate: 最大平移比例（相对图片边长）
+            scale: 缩放范围 (min, max)
+            shear: 最大错切角度（度）
+            elastic_alpha: 弹性形变的最大位移（像素），0 表示关闭
+            elastic_sigma: 位移场的高斯平滑标准差（像素）
+            noise_std: 高斯噪声标准差（与输入同一数值尺度）
+            p: 每个样本被增强的概率
+        """
+        self.rotation = rotation
+        self.translate = translate
+        self.scale = tuple(scale)
+        self.shear = shear
+        self.elastic_alpha = elastic_alpha
+        self.elastic_sigma = elastic_sigma
+        self.noise_std = noise_std
+        self.p = p
+        self._kernels: Dict[Any, torch.Tensor] = {}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional["BatchAugmentation"]:
+        """由 hyperparameters['augmentation'] 创建，未配置或全部关闭时返回 None"""
+        if not config:
+            return None
+        augmentation = cls(
+            rotation=config.get("rotation", 0.0),
+            translate=config.get("translate", 0.0),
+            scale=config.get("scale", (1.0, 1.0)),
+            shear=config.get("shear", 0.0),
+            elastic_alpha=config.get("elastic_alpha", 0.0),
+            elastic_sigma=config.get("elastic_sigma", 4.0),
+            noise_std=config.get("noise_std", 0.0),
+            p=config.get("p", 1.0)
+        )
+        return augmentation if augmentation.enabled else None
+
+    @property
+    def _geometric(self) -> bool:
+        return bool(self.rotation or self.translate or self.shear or self.scale != (1.0, 1.0)
+                    or self.elastic_alpha)
+
+    @property
+    def enabled(self) -> bool:
+        return self.p > 0 and (self._geometric or self.noise_std > 0)
+
+    def _affine_matrices(self, n: int, device) -> torch.Tensor:
+        """生成 (N, 2, 3) 的随机仿射矩阵（affine_grid 的归一化坐标）"""
+        def uniform(low, high):
+            return torch.empty(n, device=device).uniform_(low, high)
+
+        angle = uniform(-self.rotation, self.rotation) * (math.pi / 180)
+        shear = uniform(-self.shear, self.shear) * (math.pi / 180)
+        scale = uniform(self.scale[0], self.scale[1])
+        # 归一化坐标范围为 [-1, 1]，平移比例需乘以 2
+        tx = uniform(-self.translate, self.translate) * 2
+        ty = uniform(-self.translate, self.translate) * 2
+
+        # affine_grid 的矩阵把输出坐标映射到输入坐标：角度在对称区间内随机，方向无需区分；
+        # 缩放取倒数，使 scale > 1 表示放大
+        cos, sin = torch.cos(angle), torch.sin(angle)
+        matrices = torch.empty(n, 2, 3, device=device)
+        matrices[:, 0, 0] = cos / scale
+        matrices[:, 0, 1] = (-sin + torch.tan(shear) * cos) / scale
+        matrices[:, 1, 0] = sin / scale
+        matrices[:, 1, 1] = (cos + torch.tan(shear) * sin) / scale
+        matrices[:, 0, 2] = tx
+        matrices[:, 1, 2] = ty
+        return matrices
+
+    def _gaussian_kernel(self, device, dtype) -> torch.Tensor:
+        key = (device, dtype)
+        kernel = self._kernels.get(key)
+        if kernel is None:
+            radius = max(1, int(3 * self.elastic_sigma))
+            x = torch.arange(-radius, radius + 1, device=device, dtype=dtype)
+            kernel = torch.exp(-x ** 2 / (2 * self.elastic_sigma ** 2))
+            kernel = kernel / kernel.sum()
+            self._kernels[key] = kernel
+        return kernel
+
+    def _elastic_displacement(self, n: int, height: int, width: int, device, dtype) -> torch.Tensor:
+        """生成 (N, H, W, 2) 的平滑随机位移（归一化坐标）"""
+        field = torch.empty(n * 2, 1, height, width, device=device, dtype=dtype).uniform_(-1, 1)
+        kernel = self._gaussian_kernel(device, dtype)
+        radius = kernel.numel() // 2
+        # 可分离高斯卷积：先水平再竖直；replicate 填充不要求 radius 小于图片边长（reflect 要求）
+        field = F.conv2d(F.pad(field, (radius, radius, 0, 0), mode="replicate"), kernel.view(1, 1, 1, -1))
+        field = F.conv2d(F.pad(field, (0, 0, radius, radius), mode="replicate"), kernel.view(1, 1, -1, 1))
+        # 平滑后幅度变小，归一化到 [-1, 1] 后再按 alpha 像素缩放
+        field = field / field.abs().amax(dim=(2, 3), keepdim=True).clamp_min(1e-6)
+        field = field.view(n, 2, height, width).permute(0, 2, 3, 1)
+        pixel_to_norm = torch.tensor([2.0 / width, 2.0 / height], device=device, dtype=dtype)
+        return field * self.elastic_alpha * pixel_to_norm
+
+    def __call__(self, images: torch.Tensor) -> torch.Tensor:
+        if not self.enabled:
+            return images
+
+        original_shape = images.shape
+        if images.dim() == 2:
+            side = math.isqrt(images.size(1))
+            if side * side != images.size(1):
+                raise ValueError(f"Cannot augment flattened input of size {images.size(1)}: not a square image")
+            images = images.view(-1, 1, side, side)
+
+        n, _, height, width = images.shape
+        augmented = images
+
+        if self._geometric:
+            grid = F.affine_grid(self._affine_matrices(n, images.device), list(images.shape), align_corners=False)
+            if self.elastic_alpha:
+                grid = grid + self._elastic_displacement(n, height, width, images.device, grid.dtype)
+            augmented = F.grid_sample(images, grid.to(images.dtype), mode="bilinear", padding_mode="border",
+                                      align_corners=False)
+
+        if self.noise_std > 0:
+            augmented = augmented + torch.randn_like(augmented) * self.noise_std
+
+        if self.p < 1.0:
+            # 按概率保留部分原图
+            keep = torch.rand(n, 1, 1, 1, device=images.device) >= self.p
+            augmented = torch.where(keep, images, augmented)
+
+        return augmented.reshape(original_shape)
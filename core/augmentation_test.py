@@ -0,0 +1,53 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from core.augmentation import BatchAugmentation
+
+
+def digit_batch(n=8, side=28):
+    images = torch.zeros(n, 1, side, side)
+    images[:, :, side // 4:side * 3 // 4, side // 2 - 3:side // 2 + 3] = 1.0  # 竖直笔画
+    return images
+
+
+def test_output_shape_matches_input():
+    augmentation = BatchAugmentation(rotation=15, translate=0.1, scale=(0.9, 1.1), shear=10,
+                                     elastic_alpha=2.0, noise_std=0.1)
+    images = digit_batch()
+    assert augmentation(images).shape == images.shape
+
+    flat = images.view(images.size(0), -1)
+    assert augmentation(flat).shape == flat.shape
+
+
+def test_p_zero_is_identity():
+    augmentation = BatchAugmentation(rotation=30, elastic_alpha=3.0, noise_std=0.5, p=0.0)
+    images = digit_batch()
+    assert not augmentation.enabled
+    assert torch.equal(augmentation(images), images)
+
+
+def test_elastic_kernel_larger_than_image():
+    # radius = 3 * sigma = 30，大于 28x28 图片的边长
+    augmentation = BatchAugmentation(elastic_alpha=2.0, elastic_sigma=10.0)
+    images = digit_batch()
+    assert augmentation(images).shape == images.shape
+    assert augmentation(digit_batch(side=8)).shape == (8, 1, 8, 8)
+
+
+def test_mild_augmentation_preserves_the_digit():
+    torch.manual_seed(0)
+    augmentation = BatchAugmentation(rotation=10, translate=0.05, scale=(0.95, 1.05), shear=5,
+                                     elastic_alpha=1.0, elastic_sigma=4.0)
+    images = digit_batch(n=32)
+    augmented = augmentation(images)
+
+    # 无噪声时双线性采样不会超出原始取值范围
+    assert augmented.min() >= images.min() - 1e-6
+    assert augmented.max() <= images.max() + 1e-6
+    # 笔画的大部分仍与原位置重叠，且总亮度变化不大
+    overlap = (augmented * images).sum(dim=(1, 2, 3)) / images.sum(dim=(1, 2, 3))
+    assert overlap.min() > 0.4
+    mass_ratio = augmented.sum(dim=(1, 2, 3)) / images.sum(dim=(1, 2, 3))
+    assert ((mass_ratio > 0.8) & (mass_ratio < 1.25)).all()
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Tuple, Dict, Any
+
+import cv2
+import numpy as np
+
+
+class BatchPredictor:
+    """
+    批量图片识别：
+    1. 按 images_per_batch 张为一组，在线程池中并行解码与分割
+    2. 把一组图片的全部字符合并，按 predictor.max_batch_size 分块做批量推理
+    3. 每组完成后逐张产出结果，同时最多只有一组图片驻留内存
+    """
+
+    def __init__(self, predictor, max_workers: int = 4, images_per_batch: int = 32):
+        self.predictor = predictor
+        self.max_workers = max_workers
+        self.images_per_batch = max(1, images_per_batch)
+
+    def _decode_and_segment(self, item: Tuple[str, bytes]):
+        name, file_bytes = item
+        try:
+            img_np = cv2.imdecode(np.frombuffer(file_bytes, np.uint8), cv2.IMREAD_COLOR)
+            if img_np is None:
+                return name, None, None, "无法解析图片文件"
+            return name, img_np, self.predictor._segment(img_np), None
+        except Exception as e:
+            return name, None, None, str(e)
+
+    def _process_group(self, executor, group) -> Iterator[Dict[str, Any]]:
+        segmented = list(executor.map(self._decode_and_segment, group))
+
+        crops = [item[0] for _, _, border_list, _ in segmented if border_list for item in border_list]
+        try:
+            predictions = self.predictor._classify_crops(crops)
+        except Exception as e:
+            for name, _, _, _ in segmented:
+                yield {"name": name, "success": False, "error": str(e)}
+            return
+
+        offset = 0
+        for name, img_np, border_list, error in segmented:
+            if error is not None:
+                yield {"name": name, "success": False, "error": error}
+                continue
+            count = len(border_list)
+            result = self.predictor._build_result(
+                img_np, border_list, predictions[offset:offset + count], render="none"
+            )
+            offset += count
+            yield {"name": name, "success": True, **result}
+
+    def predict_stream(self, items: Iterable[Tuple[str, bytes]]) -> Iterator[Dict[str, Any]]:
+        """
+        Args:
+            items: (文件名, 图片字节) 的可迭代对象，可以是惰性读取的生成器
+        Returns:
+            逐张图片产出结果字典，带 name 与 success 字段
+        """
+        if not self.predictor.is_ready():
+            raise Exception("Model not initialized")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="batch-predict") as executor:
+            group = []
+            for item in items:
+                group.append(item)
+                if len(group) >= self.images_per_batch:
+                    yield from self._process_group(executor, group)
+                    group = []
+            if group:
+                yield from self._process_group(executor, group)
@@ -0,0 +1,116 @@
+import copy
+import glob
+import os
+import random
+import re
+import tempfile
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import torch
+
+# 检查点文件名：<模型名>_ckpt_e<已完成 epoch 数>.pt，与最终的 <模型名>.pth 放在同一目录
+CHECKPOINT_PATTERN = "{model_name}_ckpt_e{epoch:04d}.pt"
+# 中途停止时的状态单独保存，不参与轮换，也不会覆盖已完成 epoch 的检查点
+INTERRUPTED_PATTERN = "{model_name}_ckpt_interrupted.pt"
+
+
+def atomic_torch_save(obj, path: str):
+    """写入同目录的临时文件并 fsync 后原子替换，进程中途崩溃不会留下写了一半的文件"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            torch.save(obj, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        tmp_path = None
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_rng_state() -> Dict[str, Any]:
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state: Dict[str, Any]):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def list_checkpoints(save_dir: str, model_name: str) -> List[str]:
+    """按 epoch 升序返回某个模型的全部检查点路径"""
+    pattern = re.compile(re.escape(model_name) + r"_ckpt_e(\d+)\.pt$")
+    checkpoints = []
+    for path in glob.glob(os.path.join(glob.escape(save_dir), f"{glob.escape(model_name)}_ckpt_e*.pt")):
+        match = pattern.search(os.path.basename(path))
+        if match:
+            checkpoints.append((int(match.group(1)), path))
+    return [path for _, path in sorted(checkpoints)]
+
+
+def latest_checkpoint(save_dir: str, model_name: str) -> Optional[str]:
+    checkpoints = list_checkpoints(save_dir, model_name)
+    return checkpoints[-1] if checkpoints else None
+
+
+def save_checkpoint(save_dir: str, model_name: str, state: Dict[str, Any], keep: int = 2) -> str:
+    """
+    保存检查点并只保留最近 keep 个（keep <= 0 表示全部保留）
+    state 至少包含 epoch（已完成的 epoch 数）
+    """
+    path = os.path.join(save_dir, CHECKPOINT_PATTERN.format(model_name=model_name, epoch=state["epoch"]))
+    atomic_torch_save(state, path)
+
+    if keep > 0:
+        for old_path in list_checkpoints(save_dir, model_name)[:-keep]:
+            try:
+                os.remove(old_path)
+            except OSError as e:
+                print(f"[WARN] 删除旧检查点失败: {e}")
+    return path
+
+
+def snapshot_state(state):
+    """复制一份检查点内容：张量克隆到 CPU，其余对象深拷贝，之后继续训练不会改变这份快照"""
+    if isinstance(state, torch.Tensor):
+        return state.detach().to("cpu", copy=True)
+    if isinstance(state, dict):
+        return {key: snapshot_state(value) for key, value in state.items()}
+    if isinstance(state, (list, tuple)):
+        return type(state)(snapshot_state(value) for value in state)
+    return copy.deepcopy(state)
+
+
+def save_interrupted_checkpoint(save_dir: str, model_name: str, state: Dict[str, Any]) -> str:
+    """
+    保存中途停止时的状态（覆盖上一次的中断检查点），latest_checkpoint 不会选中它
+    state 应为被中断的 epoch 开始前的快照（见 snapshot_state）：恢复时从头重跑该 epoch，
+    模型、优化器与学习率调度器都回到该 epoch 之前，OneCycle 等按 batch 调度的计数不会越界
+    """
+    path = os.path.join(save_dir, INTERRUPTED_PATTERN.format(model_name=model_name))
+    atomic_torch_save(state, path)
+    return path
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    """
+    加载到 CPU：随机数状态必须是 CPU 上的 ByteTensor；
+    模型与优化器状态在 load_state_dict 时会被复制到参数所在的设备
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Checkpoint not found: {path}")
+    # 检查点包含优化器与随机数状态等非张量对象，需要完整反序列化（只加载本机训练产生的文件）
+    return torch.load(path, map_location="cpu", weights_only=False)
@@ -0,0 +1,34 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from core.checkpoint import (latest_checkpoint, load_checkpoint, save_checkpoint, save_interrupted_checkpoint,
+                             snapshot_state)
+
+
+def test_snapshot_is_not_changed_by_further_training():
+    model = torch.nn.Linear(2, 1)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1, momentum=0.9)
+    scheduler = torch.optim.lr_scheduler.OneCycleLR(optimizer, max_lr=0.1, total_steps=4)
+    state = snapshot_state({
+        "model_state": model.state_dict(),
+        "optimizer_state": optimizer.state_dict(),
+        "scheduler_state": scheduler.state_dict(),
+    })
+    before = state["model_state"]["weight"].clone()
+
+    for _ in range(3):
+        model(torch.randn(4, 2)).sum().backward()
+        optimizer.step()
+        scheduler.step()
+
+    assert torch.equal(state["model_state"]["weight"], before)
+    assert state["scheduler_state"]["last_epoch"] == 0
+
+
+def test_interrupted_checkpoint_is_not_selected_as_latest(tmp_path):
+    save_checkpoint(str(tmp_path), "m", {"epoch": 2})
+    path = save_interrupted_checkpoint(str(tmp_path), "m", {"epoch": 3, "interrupted": True})
+
+    assert latest_checkpoint(str(tmp_path), "m").endswith("m_ckpt_e0002.pt")
+    assert load_checkpoint(path)["interrupted"]
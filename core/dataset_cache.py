@@ -0,0 +1,300 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset, DataLoader, BatchSampler, RandomSampler, SequentialSampler
+from torch.utils.data.distributed import DistributedSampler
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CACHE_VERSION = 1
+SPLITS = ("train", "val")
+
+
+def source_fingerprint(path: str) -> str:
+    """由数据集目录下所有文件的相对路径、大小与修改时间计算指纹，源数据变化时指纹随之变化"""
+    digest = hashlib.sha256()
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8"))
+        return digest.hexdigest()
+
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            stat = os.stat(file_path)
+            rel_path = os.path.relpath(file_path, path).replace(os.sep, "/")
+            digest.update(f"{rel_path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def file_checksum(paths: List[str]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MemmapDataset(Dataset):
+    """
+    基于内存映射 uint8 数组的数据集
+    __getitem__ 接收一组下标（配合 BatchSampler），一次切片整批数据并反量化为 float32，
+    不为单个样本创建 Python 对象
+    序列化时只保存文件路径，DataLoader 工作进程（spawn 方式）中重新映射，不会复制整个数组
+    """
+
+    def __init__(self, images_path: str, labels_path: str, count: int, scale: float, offset: float):
+        self.images_path = images_path
+        self.labels_path = labels_path
+        self.count = count
+        self.scale = scale
+        self.offset = offset
+        self._open()
+
+    def _open(self):
+        self.images = np.load(self.images_path, mmap_mode="r")[:self.count]
+        self.labels = np.load(self.labels_path, mmap_mode="r")[:self.count]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("images", None)
+        state.pop("labels", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, indices) -> Tuple[torch.Tensor, torch.Tensor]:
+        if isinstance(indices, int):
+            indices = [indices]
+            squeeze = True
+        else:
+            squeeze = False
+        # 批内下标排序后读取，随机采样时也尽量顺序访问 mmap（批内顺序不影响训练）
+        indices = np.sort(np.asarray(indices))
+        images = torch.from_numpy(self.images[indices])
+        labels = torch.from_numpy(self.labels[indices])
+        images = images.to(torch.float32).mul_(self.scale).add_(self.offset)
+        if squeeze:
+            return images[0], labels[0]
+        return images, labels
+
+
+class DatasetCache:
+    """
+    数据集预解码缓存：
+    1. 第一次使用时遍历原始 DataLoader，把样本量化为 uint8 写入 <cache_dir>/<数据集名>/ 下的内存映射文件
+    2. manifest.json 记录形状、反量化系数、源数据指纹与校验和
+    3. 源数据目录变化（指纹不一致）时自动重建
+    4. 检查与生成在 <cache_dir>/<数据集名>.lock 上加文件锁串行执行，多个训练任务或 torchrun 进程
+       同时启动时只有一个进程生成缓存，其余进程拿到锁后重新检查并直接加载
+    量化采用整体的线性映射 x = u8 * scale + offset，对由 uint8 像素线性归一化得到的数据（如 MNIST）是无损的
+    """
+
+    def __init__(self, cache_dir: str, verify_checksum: bool = False):
+        self.cache_dir = cache_dir
+        self.verify_checksum = verify_checksum
+
+    def _dataset_dir(self, dataset_name: str) -> str:
+        return os.path.join(self.cache_dir, dataset_name)
+
+    @contextmanager
+    def _locked(self, dataset_name: str):
+        """进程间的数据集缓存锁"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, f"{dataset_name}.lock"), "a+") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def read_manifest(self, dataset_name: str) -> Optional[Dict[str, Any]]:
+        manifest_path = os.path.join(self._dataset_dir(dataset_name), "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] 数据集缓存清单损坏，将重建: {e}")
+            return None
+
+    def is_valid(self, dataset_name: str, source_path: str) -> bool:
+        manifest = self.read_manifest(dataset_name)
+        if manifest is None or manifest.get("version") != CACHE_VERSION:
+            return False
+        if manifest.get("source_fingerprint") != source_fingerprint(source_path):
+            return False
+
+        dataset_dir = self._dataset_dir(dataset_name)
+        paths = []
+        for split in SPLITS:
+            for key in ("images_file", "labels_file"):
+                path = os.path.join(dataset_dir, manifest["splits"][split][key])
+                if not os.path.exists(path):
+                    return False
+                paths.append(path)
+        if self.verify_checksum and file_checksum(paths) != manifest.get("checksum"):
+            print(f"[WARN] 数据集缓存 {dataset_name} 校验和不一致，将重建")
+            return False
+        return True
+
+    def build(self, dataset_name: str, source_path: str, loader_factory: Callable[[], Tuple[Any, Any]]):
+        """
+        遍历原始数据加载器生成缓存（调用方需持有 _locked，见 get_datasets）
+        Args:
+            loader_factory: 返回 (train_loader, val_loader) 的函数
+        """
+        start = time.time()
+        fingerprint = source_fingerprint(source_path)
+        train_loader, val_loader = loader_factory()
+        loaders = {"train": train_loader, "val": val_loader}
+
+        # 第一遍：统计样本数、形状与取值范围
+        stats = {}
+        low, high = float("inf"), float("-inf")
+        for split, loader in loaders.items():
+            count, sample_shape = 0, None
+            for images, labels in loader:
+                sample_shape = tuple(images.shape[1:])
+                count += images.size(0)
+                low = min(low, images.min().item())
+                high = max(high, images.max().item())
+            stats[split] = (count, sample_shape)
+
+        if low == float("inf"):
+            raise ValueError(f"Dataset '{dataset_name}' is empty")
+        scale = (high - low) / 255.0 if high > low else 1.0
+        offset = low
+
+        # 第二遍：量化写入临时目录，全部完成后整体替换旧缓存
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=f".{dataset_name}_")
+        try:
+            manifest = {
+                "version": CACHE_VERSION,
+                "dataset_name": dataset_name,
+                "source_path": os.path.abspath(source_path),
+                "source_fingerprint": fingerprint,
+                "scale": scale,
+                "offset": offset,
+                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "splits": {},
+            }
+            paths = []
+            for split, loader in loaders.items():
+                count, sample_shape = stats[split]
+                images_file, labels_file = f"{split}_images.npy", f"{split}_labels.npy"
+                images_out = np.lib.format.open_memmap(os.path.join(tmp_dir, images_file), mode="w+",
+                                                       dtype=np.uint8, shape=(count,) + sample_shape)
+                labels_out = np.lib.format.open_memmap(os.path.join(tmp_dir, labels_file), mode="w+",
+                                                       dtype=np.int64, shape=(count,))
+                position = 0
+                for images, labels in loader:
+                    n = min(images.size(0), count - position)
+                    quantized = ((images[:n] - offset) / scale).round_().clamp_(0, 255).to(torch.uint8)
+                    images_out[position:position + n] = quantized.numpy()
+                    labels_out[position:position + n] = labels[:n].numpy()
+                    position += n
+                images_out.flush()
+                labels_out.flush()
+                del images_out, labels_out
+
+                manifest["splits"][split] = {
+                    "count": position,
+                    "sample_shape": list(sample_shape),
+                    "images_file": images_file,
+                    "labels_file": labels_file,
+                }
+                paths += [os.path.join(tmp_dir, images_file), os.path.join(tmp_dir, labels_file)]
+
+            manifest["checksum"] = file_checksum(paths)
+            with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=4, ensure_ascii=False)
+
+            dataset_dir = self._dataset_dir(dataset_name)
+            if os.path.exists(dataset_dir):
+                shutil.rmtree(dataset_dir)
+            os.replace(tmp_dir, dataset_dir)
+            tmp_dir = None
+        finally:
+            if tmp_dir is not None and os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+
+        print(f"✅ 数据集缓存已生成: {os.path.abspath(self._dataset_dir(dataset_name))} "
+              f"(train {stats['train'][0]}, val {stats['val'][0]}, 耗时 {time.time() - start:.1f}s)")
+        return manifest
+
+    def load(self, dataset_name: str) -> Dict[str, MemmapDataset]:
+        manifest = self.read_manifest(dataset_name)
+        if manifest is None:
+            raise FileNotFoundError(f"Dataset cache not found: {dataset_name}")
+
+        dataset_dir = self._dataset_dir(dataset_name)
+        datasets = {}
+        for split in SPLITS:
+            info = manifest["splits"][split]
+            datasets[split] = MemmapDataset(
+                os.path.join(dataset_dir, info["images_file"]),
+                os.path.join(dataset_dir, info["labels_file"]),
+                info["count"],
+                manifest["scale"],
+                manifest["offset"]
+            )
+        return datasets
+
+    def get_datasets(self, dataset_name: str, source_path: str,
+                     loader_factory: Callable[[], Tuple[Any, Any]]) -> Dict[str, MemmapDataset]:
+        """缓存有效时直接加载，否则（首次使用或源数据变化）重建"""
+        with self._locked(dataset_name):
+            # 在锁内检查：等待期间其他进程可能已经生成了缓存
+            if not self.is_valid(dataset_name, source_path):
+                print(f"[INFO] 正在生成数据集缓存: {dataset_name}")
+                self.build(dataset_name, source_path, loader_factory)
+            return self.load(dataset_name)
+
+
+def create_memmap_loader(dataset: MemmapDataset, batch_size: int, shuffle: bool, num_replicas: int = 1,
+                         rank: int = 0, **loader_kwargs) -> DataLoader:
+    """
+    按批采样下标，由 MemmapDataset 一次返回整批 Tensor
+    num_replicas > 1 时每个进程只采样自己的分片（DistributedSampler，需每个 epoch 调用 set_epoch）
+    """
+    if num_replicas > 1:
+        sampler = DistributedSampler(dataset, num_replicas=num_replicas, rank=rank, shuffle=shuffle)
+    else:
+        sampler = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+    return DataLoader(
+        dataset,
+        sampler=BatchSampler(sampler, batch_size=batch_size, drop_last=False),
+        batch_size=None,
+        **loader_kwargs
+    )
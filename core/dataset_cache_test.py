@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from core.dataset_cache import DatasetCache, create_memmap_loader
+
+
+def _make_source(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "data.bin").write_bytes(b"v1")
+    return str(source)
+
+
+def _make_loader_factory(calls):
+    """像素由 uint8 线性归一化得到，量化缓存应当无损"""
+    generator = torch.Generator().manual_seed(0)
+    splits = {}
+    for split, count in (("train", 10), ("val", 4)):
+        pixels = torch.randint(0, 256, (count, 1, 28, 28), generator=generator)
+        images = (pixels.float() / 255.0 - 0.1307) / 0.3081
+        labels = torch.randint(0, 10, (count,), generator=generator)
+        splits[split] = [(images[i:i + 3], labels[i:i + 3]) for i in range(0, count, 3)]
+
+    def factory():
+        calls.append(1)
+        return splits["train"], splits["val"]
+
+    return factory, splits
+
+
+def test_build_then_reload_matches_source(tmp_path):
+    calls = []
+    factory, splits = _make_loader_factory(calls)
+    source = _make_source(tmp_path)
+    cache = DatasetCache(str(tmp_path / "cache"))
+
+    datasets = cache.get_datasets("digits", source, factory)
+    assert calls == [1]
+    assert len(datasets["train"]) == 10 and len(datasets["val"]) == 4
+
+    # 第二次直接读取缓存，不再遍历原始数据
+    datasets = DatasetCache(str(tmp_path / "cache")).get_datasets("digits", source, factory)
+    assert calls == [1]
+    expected = torch.cat([images for images, _ in splits["train"]])
+    images, labels = datasets["train"][list(range(10))]
+    assert torch.allclose(images, expected, atol=1e-5)
+    assert torch.equal(labels, torch.cat([labels for _, labels in splits["train"]]))
+
+    loader = create_memmap_loader(datasets["val"], batch_size=3, shuffle=False)
+    assert [batch[0].shape[0] for batch in loader] == [3, 1]
+
+
+def test_source_change_invalidates_cache(tmp_path):
+    calls = []
+    factory, _ = _make_loader_factory(calls)
+    source = _make_source(tmp_path)
+    cache = DatasetCache(str(tmp_path / "cache"))
+    cache.get_datasets("digits", source, factory)
+    assert cache.is_valid("digits", source)
+
+    with open(os.path.join(source, "data.bin"), "wb") as f:
+        f.write(b"version two")
+    assert not cache.is_valid("digits", source)
+    cache.get_datasets("digits", source, factory)
+    assert calls == [1, 1]
+
+
+def test_checksum_mismatch_is_detected(tmp_path):
+    factory, _ = _make_loader_factory([])
+    source = _make_source(tmp_path)
+    cache = DatasetCache(str(tmp_path / "cache"), verify_checksum=True)
+    cache.get_datasets("digits", source, factory)
+
+    with open(tmp_path / "cache" / "digits" / "manifest.json", "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["checksum"] = "0" * 64
+    with open(tmp_path / "cache" / "digits" / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    assert not cache.is_valid("digits", source)
+
+
+def test_concurrent_builders_build_once(tmp_path):
+    calls = []
+    factory, _ = _make_loader_factory(calls)
+    source = _make_source(tmp_path)
+    errors = []
+
+    def worker():
+        try:
+            DatasetCache(str(tmp_path / "cache")).get_datasets("digits", source, factory)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert calls == [1]
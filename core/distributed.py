@@ -0,0 +1,138 @@
+import sys
+import os
+
+# 添加项目根目录到 sys.path，以便能够导入 core 模块
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import argparse
+import json
+import socket
+from datetime import timedelta
+from typing import Dict, Any, Optional
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from config.config_manager import ConfigManager
+from core.model_factory import ModelFactory
+from core.trainer import Trainer
+
+
+def find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("", 0))
+        return s.getsockname()[1]
+
+
+def default_threads_per_process(nproc_per_node: int) -> int:
+    """按本机 CPU 核数平分给各训练进程，避免线程超额订阅"""
+    return max(1, (os.cpu_count() or 1) // max(1, nproc_per_node))
+
+
+def prepare_dataset_cache(config_manager: ConfigManager, training_config: Dict[str, Any]):
+    """在启动训练进程前生成数据集缓存，避免多个进程同时重建"""
+    ModelFactory(config_manager).create_data_loaders(training_config["dataset_name"],
+                                                     training_config["hyperparameters"])
+
+
+def _worker(local_rank: int, node_rank: int, nproc_per_node: int, world_size: int,
+            training_config: Dict[str, Any], threads: int, resume_from: Optional[str],
+            timeout: float, result_path: Optional[str]):
+    rank = node_rank * nproc_per_node + local_rank
+    torch.set_num_threads(threads)
+    # MASTER_ADDR / MASTER_PORT 由启动进程写入环境变量（env:// 初始化）
+    dist.init_process_group("gloo", rank=rank, world_size=world_size, timeout=timedelta(seconds=timeout))
+    try:
+        # 每个进程设置相同的种子，模型初始参数一致（DDP 构造时还会从 rank 0 广播）
+        torch.manual_seed(training_config.get("seed", 0))
+        components = ModelFactory(ConfigManager()).create_training_components(
+            training_config, num_replicas=world_size, rank=rank)
+        result = Trainer(components).train(resume_from=resume_from)
+        if rank == 0 and result_path:
+            with open(result_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=4, ensure_ascii=False)
+    finally:
+        dist.destroy_process_group()
+
+
+def launch(training_config: Dict[str, Any], nproc_per_node: int, nnodes: int = 1, node_rank: int = 0,
+           master_addr: str = "127.0.0.1", master_port: Optional[int] = None, threads_per_process: int = 0,
+           resume_from: Optional[str] = None, timeout: float = 1800.0, result_path: Optional[str] = None):
+    """
+    启动数据并行训练（gloo 后端，纯 CPU）
+    - 单机：nnodes=1，在本机启动 nproc_per_node 个进程
+    - 多机：每台机器各执行一次，node_rank 依次为 0..nnodes-1，master_addr / master_port 指向 node_rank=0 的机器
+    全局 rank = node_rank * nproc_per_node + local_rank，rank 0 负责保存模型与日志
+    resume_from 只需在 rank 0 所在机器上存在，检查点由 rank 0 读取后广播给其余进程
+    """
+    if master_port is None:
+        if nnodes > 1:
+            raise ValueError("master_port is required for multi-node training")
+        master_port = find_free_port()
+    os.environ["MASTER_ADDR"] = master_addr
+    os.environ["MASTER_PORT"] = str(master_port)
+
+    world_size = nnodes * nproc_per_node
+    threads = threads_per_process or default_threads_per_process(nproc_per_node)
+    print(f"[INFO] 分布式训练: node {node_rank}/{nnodes}, 每节点 {nproc_per_node} 个进程, "
+          f"每进程 {threads} 个线程, master {master_addr}:{master_port}")
+
+    mp.spawn(
+        _worker,
+        args=(node_rank, nproc_per_node, world_size, training_config, threads, resume_from, timeout, result_path),
+        nprocs=nproc_per_node,
+        join=True
+    )
+
+
+def run_from_env(training_config: Dict[str, Any], resume_from: Optional[str] = None):
+    """
+    由 torchrun 等外部启动器启动时使用：RANK / WORLD_SIZE / MASTER_ADDR / MASTER_PORT 已在环境变量中
+    """
+    dist.init_process_group("gloo", init_method="env://")
+    try:
+        torch.manual_seed(training_config.get("seed", 0))
+        components = ModelFactory(ConfigManager()).create_training_components(
+            training_config, num_replicas=dist.get_world_size(), rank=dist.get_rank())
+        return Trainer(components).train(resume_from=resume_from)
+    finally:
+        dist.destroy_process_group()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='CPU 数据并行训练（torch.distributed gloo）')
+    parser.add_argument('--config', help='训练配置 JSON，默认使用 config/train_config.json')
+    parser.add_argument('--nproc-per-node', type=int, default=2, help='本机训练进程数')
+    parser.add_argument('--nnodes', type=int, default=1, help='参与训练的机器数')
+    parser.add_argument('--node-rank', type=int, default=0, help='本机序号，0 为主节点')
+    parser.add_argument('--master-addr', default='127.0.0.1', help='主节点地址')
+    parser.add_argument('--master-port', type=int, default=None, help='主节点端口，多机训练时必须指定')
+    parser.add_argument('--threads-per-process', type=int, default=0, help='每个进程的 torch 线程数，默认按核数平分')
+    parser.add_argument('--resume', default=None, help='检查点路径，或 latest')
+    args = parser.parse_args()
+
+    conf = ConfigManager()
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            train_config = json.load(f)
+    else:
+        train_config = conf.get_train_config()
+
+    if "RANK" in os.environ and "WORLD_SIZE" in os.environ:
+        # 已由 torchrun 启动，每个进程直接加入进程组
+        run_from_env(train_config, args.resume)
+    else:
+        prepare_dataset_cache(conf, train_config)
+        launch(
+            train_config,
+            nproc_per_node=args.nproc_per_node,
+            nnodes=args.nnodes,
+            node_rank=args.node_rank,
+            master_addr=args.master_addr,
+            master_port=args.master_port,
+            threads_per_process=args.threads_per_process,
+            resume_from=args.resume
+        )
@@ -0,0 +1,75 @@
+from typing import Dict, Any, Optional
+
+import torch
+
+# 可监控的指标及其改善方向
+MONITOR_MODES = {"val_loss": "min", "val_acc": "max"}
+
+
+class EarlyStopping:
+    """
+    早停与最优权重保留
+    每次验证后调用 step：指标较历史最优改善超过 min_delta 时记录当前权重，
+    否则累计未改善次数，达到 patience（> 0）时 should_stop 为 True
+    """
+
+    def __init__(self, monitor: str = "val_loss", patience: int = 0, min_delta: float = 0.0,
+                 restore_best_weights: bool = True):
+        if monitor not in MONITOR_MODES:
+            raise ValueError(f"Unsupported monitor: {monitor}, expected one of {list(MONITOR_MODES)}")
+        self.monitor = monitor
+        self.mode = MONITOR_MODES[monitor]
+        self.patience = patience
+        self.min_delta = abs(min_delta)
+        self.restore_best_weights = restore_best_weights
+
+        self.best: Optional[float] = None
+        self.best_epoch: Optional[int] = None
+        self.best_state: Optional[Dict[str, torch.Tensor]] = None
+        self.bad_count = 0
+
+    def _improved(self, value: float) -> bool:
+        if self.best is None:
+            return True
+        if self.mode == "min":
+            return value < self.best - self.min_delta
+        return value > self.best + self.min_delta
+
+    def step(self, value: float, epoch: int, model: torch.nn.Module) -> bool:
+        """记录一次验证结果，返回是否为新的最优"""
+        if self._improved(value):
+            self.best = value
+            self.best_epoch = epoch
+            self.bad_count = 0
+            if self.restore_best_weights:
+                # 拷贝到 CPU，不占用显存
+                self.best_state = {k: v.detach().to("cpu", copy=True) for k, v in model.state_dict().items()}
+            return True
+
+        self.bad_count += 1
+        return False
+
+    @property
+    def should_stop(self) -> bool:
+        return self.patience > 0 and self.bad_count >= self.patience
+
+    def restore(self, model: torch.nn.Module) -> bool:
+        """把最优权重载回模型，返回是否发生了替换"""
+        if not self.restore_best_weights or self.best_state is None:
+            return False
+        model.load_state_dict(self.best_state)
+        return True
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {
+            "best": self.best,
+            "best_epoch": self.best_epoch,
+            "best_state": self.best_state,
+            "bad_count": self.bad_count,
+        }
+
+    def load_state_dict(self, state: Dict[str, Any]):
+        self.best = state["best"]
+        self.best_epoch = state["best_epoch"]
+        self.best_state = state["best_state"]
+        self.bad_count = state["bad_count"]
@@ -0,0 +1,57 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from core.early_stopping import EarlyStopping
+
+
+def test_stops_after_patience_without_improvement():
+    model = torch.nn.Linear(2, 1)
+    early_stopping = EarlyStopping("val_loss", patience=2, min_delta=0.01)
+
+    assert early_stopping.step(1.0, 1, model)
+    assert not early_stopping.step(0.995, 2, model)  # 改善不足 min_delta
+    assert not early_stopping.should_stop
+    assert not early_stopping.step(1.2, 3, model)
+    assert early_stopping.should_stop
+    assert early_stopping.best_epoch == 1
+
+
+def test_patience_zero_never_stops():
+    model = torch.nn.Linear(2, 1)
+    early_stopping = EarlyStopping("val_acc", patience=0)
+    early_stopping.step(0.9, 1, model)
+    for epoch in range(2, 10):
+        early_stopping.step(0.1, epoch, model)
+    assert not early_stopping.should_stop
+
+
+def test_restores_best_weights():
+    model = torch.nn.Linear(2, 1)
+    early_stopping = EarlyStopping("val_acc")
+    early_stopping.step(0.9, 1, model)
+    best = {k: v.clone() for k, v in model.state_dict().items()}
+
+    with torch.no_grad():
+        model.weight.add_(1.0)
+    early_stopping.step(0.5, 2, model)
+
+    assert early_stopping.restore(model)
+    for key, value in model.state_dict().items():
+        assert torch.equal(value, best[key])
+
+
+def test_state_dict_round_trip():
+    model = torch.nn.Linear(2, 1)
+    early_stopping = EarlyStopping("val_loss", patience=3)
+    early_stopping.step(0.5, 1, model)
+    early_stopping.step(0.7, 2, model)
+
+    restored = EarlyStopping("val_loss", patience=3)
+    restored.load_state_dict(early_stopping.state_dict())
+    assert (restored.best, restored.best_epoch, restored.bad_count) == (0.5, 1, 1)
+
+
+def test_rejects_unknown_monitor():
+    with pytest.raises(ValueError):
+        EarlyStopping("train_loss")
@@ -0,0 +1,63 @@
+import os
+
+import torch
+
+# 推理后端及其导出文件扩展名（与 .pth 权重文件同目录同名）
+BACKEND_EXTENSIONS = {
+    "torchscript": ".pt",
+    "onnxruntime": ".onnx",
+    "int8": "_int8.pt",  # core/quantization.py 生成的量化 TorchScript 模型
+}
+
+
+def artifact_path_for(weights_path: str, backend: str) -> str:
+    """由 .pth 权重路径得到对应后端的导出文件路径"""
+    return os.path.splitext(weights_path)[0] + BACKEND_EXTENSIONS[backend]
+
+
+def load_torchscript_model(path: str, device) -> torch.nn.Module:
+    """加载 TorchScript 模型，返回值与 eager 模型一样可直接调用"""
+    model = torch.jit.load(path, map_location=device)
+    model.eval()
+    return model
+
+
+class OnnxRuntimeModel:
+    """
+    ONNX Runtime 推理封装，接口与 eager 模型一致：输入 (N, 1, 28, 28) Tensor，输出 logits Tensor
+    仅使用 CPUExecutionProvider，面向纯 CPU 的预测节点
+    """
+
+    def __init__(self, path: str, num_threads: int = 0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.path = path
+        self.memory_bytes = os.path.getsize(path)
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        outputs = self.session.run(None, {self.input_name: batch.detach().cpu().numpy()})[0]
+        return torch.from_numpy(outputs)
+
+    def eval(self):
+        return self
+
+
+def load_backend_model(backend: str, weights_path: str, device):
+    """按后端加载导出后的模型，导出文件不存在时抛出 FileNotFoundError"""
+    path = artifact_path_for(weights_path, backend)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Exported {backend} model not found: {path}")
+
+    if backend == "torchscript":
+        return load_torchscript_model(path, device)
+    if backend == "int8":
+        # 量化算子只有 CPU 实现
+        return load_torchscript_model(path, "cpu")
+    if backend == "onnxruntime":
+        return OnnxRuntimeModel(path, num_threads=torch.get_num_threads())
+    raise ValueError(f"Unsupported inference backend: {backend}")
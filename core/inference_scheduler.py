@@ -0,0 +1,166 @@
+import queue
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class _InferenceJob:
+    """单个请求提交的一组字符图片"""
+
+    def __init__(self, crops):
+        self.crops = crops
+        self.done = threading.Event()
+        self.result: Optional[List[Tuple[str, float]]] = None
+        self.error: Optional[Exception] = None
+        self.cancelled = False
+
+
+class InferenceScheduler:
+    """
+    跨请求的动态微批推理调度器：
+    1. Flask 请求线程只做解码与分割，把字符图片提交到队列后等待
+    2. 后台线程在 window_ms 时间窗内（或凑满 max_batch_size 个字符）收集多个请求的字符
+    3. 合并为一次前向传播，再把结果按请求拆分返回
+    只有调度线程调用模型，避免多个请求争抢 torch 的算子线程
+    未指定 max_batch_size 时每个批次都读取预测器当前的值，模型热切换后立即按新批量合批
+    """
+
+    def __init__(self, predictor, window_ms: float = 3.0, max_batch_size: Optional[int] = None,
+                 timeout: float = 5.0):
+        self.predictor = predictor
+        self.window = window_ms / 1000.0
+        self._max_batch_size = max_batch_size
+        self.timeout = timeout
+
+        self._queue: "queue.Queue[_InferenceJob]" = queue.Queue()
+        self._thread = None
+        self._running = False
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "batches": 0,
+            "batched_crops": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "last_batch_size": 0,
+        }
+
+    @property
+    def max_batch_size(self) -> int:
+        return self._max_batch_size or self.predictor.max_batch_size
+
+    def start(self):
+        """启动调度线程"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止调度线程"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def classify(self, crops, timeout: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        提交字符图片并阻塞等待识别结果
+        超时抛出 TimeoutError，调度线程会跳过已超时的请求
+        """
+        if not crops:
+            return []
+
+        job = _InferenceJob(crops)
+        with self._stats_lock:
+            self._stats["requests"] += 1
+        self._queue.put(job)
+
+        if not job.done.wait(self.timeout if timeout is None else timeout):
+            job.cancelled = True
+            with self._stats_lock:
+                self._stats["timeouts"] += 1
+            raise TimeoutError("Inference request timed out")
+
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def predict(self, img_original, render=None, image_format=None, timeout: Optional[float] = None):
+        """与 Predictor.predict 相同的接口，推理部分经由调度器合批"""
+        if not self.predictor.is_ready():
+            raise Exception("Model not initialized")
+
+        border_list = self.predictor._segment(img_original)
+        predictions = self.classify([item[0] for item in border_list], timeout)
+        return self.predictor._build_result(img_original, border_list, predictions, render, image_format)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """队列深度与批量填充率等指标"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats["batches"]
+        max_batch_size = self.max_batch_size
+        stats["queue_depth"] = self._queue.qsize()
+        stats["window_ms"] = self.window * 1000.0
+        stats["max_batch_size"] = max_batch_size
+        stats["avg_batch_size"] = stats["batched_crops"] / batches if batches else 0.0
+        stats["avg_batch_fill"] = stats["avg_batch_size"] / max_batch_size
+        return stats
+
+    def _collect(self, first: _InferenceJob) -> List[_InferenceJob]:
+        """以第一个请求为起点，在时间窗内继续收集请求直到凑满批量"""
+        jobs = [first]
+        count = len(first.crops)
+        deadline = time.monotonic() + self.window
+        # 每个批次读取一次，跟随热切换后的批量大小
+        max_batch_size = self.max_batch_size
+
+        while count < max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            count += len(job.crops)
+
+        return [job for job in jobs if not job.cancelled]
+
+    def _run(self):
+        while self._running:
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            jobs = self._collect(first)
+            if not jobs:
+                continue
+
+            crops = [crop for job in jobs for crop in job.crops]
+            try:
+                predictions = self.predictor._classify_crops(crops)
+            except Exception as e:
+                print(f"[ERROR] 批量推理失败: {e}")
+                with self._stats_lock:
+                    self._stats["errors"] += 1
+                for job in jobs:
+                    job.error = e
+                    job.done.set()
+                continue
+
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["batched_crops"] += len(crops)
+                self._stats["last_batch_size"] = len(crops)
+
+            # 按提交顺序拆分结果
+            offset = 0
+            for job in jobs:
+                job.result = predictions[offset:offset + len(job.crops)]
+                offset += len(job.crops)
+                job.done.set()
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from core.inference_scheduler import InferenceScheduler
+
+
+class FakePredictor:
+    """按字符内容返回结果，记录每次前向传播的批量大小"""
+
+    max_batch_size = 64
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.batches = []
+
+    def _classify_crops(self, crops):
+        self.batches.append(len(crops))
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [(str(crop), 1.0) for crop in crops]
+
+
+def _run_concurrently(scheduler, requests):
+    results = [None] * len(requests)
+
+    def worker(index):
+        results[index] = scheduler.classify(requests[index])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_requests_are_merged_and_split_in_order():
+    predictor = FakePredictor()
+    scheduler = InferenceScheduler(predictor, window_ms=200, max_batch_size=64)
+    scheduler.start()
+    try:
+        requests = [[f"{i}-{j}" for j in range(i + 1)] for i in range(4)]
+        results = _run_concurrently(scheduler, requests)
+    finally:
+        scheduler.stop()
+
+    for crops, result in zip(requests, results):
+        assert result == [(crop, 1.0) for crop in crops]
+    assert sum(predictor.batches) == 10
+    assert len(predictor.batches) < 4
+    assert scheduler.get_stats()["requests"] == 4
+
+
+def test_batch_closes_when_full():
+    predictor = FakePredictor()
+    scheduler = InferenceScheduler(predictor, window_ms=1000, max_batch_size=2)
+    scheduler.start()
+    try:
+        start = time.monotonic()
+        assert scheduler.classify(["a", "b"]) == [("a", 1.0), ("b", 1.0)]
+        assert time.monotonic() - start < 0.5
+    finally:
+        scheduler.stop()
+
+
+def test_empty_request_skips_model():
+    predictor = FakePredictor()
+    scheduler = InferenceScheduler(predictor)
+    assert scheduler.classify([]) == []
+    assert predictor.batches == []
+
+
+def test_timeout_raises_and_is_counted():
+    predictor = FakePredictor(delay=0.3)
+    scheduler = InferenceScheduler(predictor, window_ms=1)
+    scheduler.start()
+    try:
+        with pytest.raises(TimeoutError):
+            scheduler.classify(["a"], timeout=0.05)
+    finally:
+        scheduler.stop()
+    assert scheduler.get_stats()["timeouts"] == 1
+
+
+def test_model_errors_propagate_to_every_request():
+    predictor = FakePredictor(error=RuntimeError("boom"))
+    scheduler = InferenceScheduler(predictor, window_ms=1)
+    scheduler.start()
+    try:
+        with pytest.raises(RuntimeError, match="boom"):
+            scheduler.classify(["a"])
+    finally:
+        scheduler.stop()
+    assert scheduler.get_stats()["errors"] == 1
+
+
+def test_batch_size_follows_predictor_after_hot_swap():
+    predictor = FakePredictor()
+    predictor.max_batch_size = 64
+    scheduler = InferenceScheduler(predictor, window_ms=1000)
+    assert scheduler.get_stats()["max_batch_size"] == 64
+
+    # 热切换把批量改为 2：下一批凑满 2 个字符即结束，不必等满时间窗
+    predictor.max_batch_size = 2
+    scheduler.start()
+    try:
+        start = time.monotonic()
+        assert scheduler.classify(["a", "b"]) == [("a", 1.0), ("b", 1.0)]
+        assert time.monotonic() - start < 0.5
+    finally:
+        scheduler.stop()
+    assert scheduler.get_stats()["max_batch_size"] == 2
@@ -0,0 +1,373 @@
+import cProfile
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+# 默认延迟分桶（秒），覆盖 0.5ms ~ 10s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, Any]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: Sequence[str], key: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """单调递增计数器"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(snapshots: Sequence[Dict[Tuple[str, ...], float]]) -> Dict[Tuple[str, ...], float]:
+        merged: Dict[Tuple[str, ...], float] = {}
+        for values in snapshots:
+            for key, value in values.items():
+                merged[key] = merged.get(key, 0.0) + value
+        return merged
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], float]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        if values is None:
+            values = self.snapshot()
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """固定分桶直方图，observe 只做一次二分查找和加法"""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # key -> [各桶计数..., +Inf 计数, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], List[float]]:
+        with self._lock:
+            return {key: list(values) for key, values in self._values.items()}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(snapshots: Sequence[Dict[Tuple[str, ...], List[float]]]) -> Dict[Tuple[str, ...], List[float]]:
+        merged: Dict[Tuple[str, ...], List[float]] = {}
+        for values in snapshots:
+            for key, counts in values.items():
+                total = merged.get(key)
+                merged[key] = list(counts) if total is None else [a + b for a, b in zip(total, counts)]
+        return merged
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], List[float]]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        if values is None:
+            values = self.snapshot()
+        for key, counts in sorted(values.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            cumulative += counts[len(self.buckets)]
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {counts[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，render 输出 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  labelnames: Sequence[str] = ()) -> Histogram:
+        return self._register(Histogram(name, documentation, buckets, labelnames))
+
+    def _list(self) -> List[Any]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        """各指标的原始值：指标名 -> {标签值元组: 计数}"""
+        return {metric.name: metric.snapshot() for metric in self._list()}
+
+    def reset(self):
+        """清空全部指标的值（fork 出的工作进程不应继承主进程已记录的值）"""
+        for metric in self._list():
+            metric.reset()
+
+    def render(self, snapshots: Optional[Sequence[Dict[str, Dict[Tuple[str, ...], Any]]]] = None) -> str:
+        """
+        输出 Prometheus 文本格式
+        snapshots 为多个进程的 snapshot()，给出时输出逐项相加后的结果，否则输出本进程的值
+        """
+        lines = []
+        for metric in self._list():
+            if snapshots is None:
+                lines.extend(metric.render())
+            else:
+                lines.extend(metric.render(metric.merge([s.get(metric.name, {}) for s in snapshots])))
+        return "\n".join(lines) + "\n"
+
+
+class MultiprocessMetrics:
+    """
+    多进程（prefork）模式下汇总各工作进程的指标：
+    1. 每个工作进程每隔 interval 秒（以及每次被抓取时）把本进程的 snapshot 写入 directory/<pid>.json
+    2. render 合并目录下所有进程的文件，计数器与直方图逐项相加，其他进程的数据最多滞后 interval 秒
+    3. 已退出进程的文件保留，保证重启工作进程后计数器仍单调递增；由主进程在启动时调用 clear 清空
+    """
+
+    def __init__(self, registry: MetricsRegistry, directory: str, interval: float = 5.0):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def clear(directory: str):
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def flush(self):
+        """把本进程的指标原子写入 <pid>.json"""
+        snapshot = {name: [[list(key), value] for key, value in values.items()]
+                    for name, values in self.registry.snapshot().items()}
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[WARN] 写入进程指标失败: {e}")
+
+    def _load(self) -> List[Dict[str, Dict[Tuple[str, ...], Any]]]:
+        snapshots = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARN] 读取进程指标失败 {name}: {e}")
+                continue
+            snapshots.append({metric: {tuple(key): value for key, value in values}
+                              for metric, values in data.items()})
+        return snapshots
+
+    def render(self) -> str:
+        self.flush()
+        return self.registry.render(self._load())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+REGISTRY = MetricsRegistry()
+
+# 预测链路各阶段：decode / preprocess / contours / transform / inference / serialization
+STAGE_LATENCY = REGISTRY.histogram(
+    "predict_stage_seconds", "Latency of each prediction stage in seconds", labelnames=("stage",))
+REQUEST_LATENCY = REGISTRY.histogram(
+    "predict_request_seconds", "End-to-end latency of /api/predict in seconds")
+DIGITS_PER_IMAGE = REGISTRY.histogram(
+    "predict_digits_per_image", "Number of segmented digits per image",
+    buckets=(0, 1, 2, 3, 5, 8, 12, 20, 30, 50, 100))
+IMAGE_PIXELS = REGISTRY.histogram(
+    "predict_image_pixels", "Decoded image size in pixels",
+    buckets=(1e4, 5e4, 1e5, 3e5, 1e6, 2e6, 4e6, 8e6, 1.6e7))
+PREDICT_REQUESTS = REGISTRY.counter(
+    "predict_requests_total", "Prediction requests by HTTP status", labelnames=("status",))
+PREDICT_ERRORS = REGISTRY.counter(
+    "predict_errors_total", "Prediction errors by stage", labelnames=("stage",))
+
+
+@contextmanager
+def track_stage(stage: str):
+    """记录一个预测阶段的耗时，阶段内抛出异常时同时计入 PREDICT_ERRORS"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        PREDICT_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
+
+
+class SampledProfiler:
+    """
+    按需采样的 cProfile：
+    - request(count) 对接下来 count 次调用做性能剖析
+    - sample_rate 为持续采样比例（0 表示关闭）
+    结果以 .prof 文件（pstats 格式，可用 snakeviz 等工具查看）写入 output_dir
+    """
+
+    def __init__(self, output_dir: str, sample_rate: float = 0.0, max_dumps: int = 50, max_pending: int = 10):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.max_dumps = max_dumps
+        self.max_pending = max_pending
+        self._pending = 0
+        self._active = False
+        self._lock = threading.Lock()
+
+    def request(self, count: int = 1):
+        with self._lock:
+            # 待剖析的请求数不超过 max_pending
+            self._pending = min(self._pending + max(0, count), self.max_pending)
+
+    def _should_profile(self) -> bool:
+        with self._lock:
+            # cProfile 同一时间只能有一个在运行
+            if self._active:
+                return False
+            if self._pending > 0:
+                self._pending -= 1
+                self._active = True
+                return True
+            if self.sample_rate > 0 and random.random() < self.sample_rate:
+                self._active = True
+                return True
+            return False
+
+    @contextmanager
+    def maybe_profile(self, name: str):
+        if not self._should_profile():
+            yield
+            return
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            try:
+                os.makedirs(self.output_dir, exist_ok=True)
+                path = os.path.join(self.output_dir, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+                                                     f"_{threading.get_ident()}.prof")
+                profile.dump_stats(path)
+                self._prune()
+            except OSError as e:
+                print(f"[WARN] 保存性能剖析结果失败: {e}")
+            finally:
+                with self._lock:
+                    self._active = False
+
+    def list_dumps(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.output_dir):
+            return []
+        entries = sorted(
+            (entry for entry in os.scandir(self.output_dir) if entry.name.endswith(".prof")),
+            key=lambda entry: entry.stat().st_mtime, reverse=True)
+        return [{"file": entry.name, "bytes": entry.stat().st_size, "mtime": entry.stat().st_mtime}
+                for entry in entries]
+
+    def _prune(self):
+        dumps = self.list_dumps()
+        for dump in dumps[self.max_dumps:]:
+            try:
+                os.remove(os.path.join(self.output_dir, dump["file"]))
+            except OSError:
+                pass
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "active": self._active,
+                "sample_rate": self.sample_rate,
+                "output_dir": self.output_dir,
+            }
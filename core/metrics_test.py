@@ -0,0 +1,50 @@
+import os
+
+from core.metrics import MetricsRegistry, MultiprocessMetrics
+
+
+def make_registry():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests", labelnames=("status",))
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    return registry, counter, histogram
+
+
+def test_render_sums_all_worker_snapshots(tmp_path, monkeypatch):
+    directory = str(tmp_path / "metrics")
+    MultiprocessMetrics.clear(directory)
+
+    # 两个工作进程各自记录并写入共享目录
+    for pid, statuses, latency in ((1001, (200, 200), 0.05), (1002, (200, 500), 0.5)):
+        registry, counter, histogram = make_registry()
+        for status in statuses:
+            counter.inc(status=status)
+        histogram.observe(latency)
+        monkeypatch.setattr(os, "getpid", lambda pid=pid: pid)
+        MultiprocessMetrics(registry, directory).flush()
+
+    # 第三个进程抓取时，结果包含全部进程的数据
+    registry, counter, _ = make_registry()
+    counter.inc(status=200)
+    monkeypatch.setattr(os, "getpid", lambda: 1003)
+    text = MultiprocessMetrics(registry, directory).render()
+
+    assert 'requests_total{status="200"} 4.0' in text
+    assert 'requests_total{status="500"} 1.0' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1.0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2.0' in text
+    assert "latency_seconds_count 2.0" in text
+    assert sorted(os.listdir(directory)) == ["1001.json", "1002.json", "1003.json"]
+
+
+def test_reset_and_clear(tmp_path):
+    registry, counter, histogram = make_registry()
+    counter.inc(status=200)
+    histogram.observe(0.2)
+    registry.reset()
+    assert registry.snapshot() == {"requests_total": {}, "latency_seconds": {}}
+
+    metrics = MultiprocessMetrics(registry, str(tmp_path))
+    metrics.flush()
+    MultiprocessMetrics.clear(str(tmp_path))
+    assert os.listdir(tmp_path) == []
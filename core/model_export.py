@@ -0,0 +1,128 @@
+import sys
+import os
+
+# 添加项目根目录到 sys.path，以便能够导入 core 模块
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import argparse
+import tempfile
+from typing import Dict, Any, Iterable
+
+import torch
+from config.config_manager import ConfigManager
+from core.model_factory import ModelFactory
+from core.inference_backends import artifact_path_for, load_torchscript_model, OnnxRuntimeModel
+
+
+class ModelExporter:
+    """
+    input:ConfigManager
+    调用export:把 storage/trained_models/*.pth 导出为 TorchScript (.pt) 与 ONNX (.onnx)，
+    并用随机输入与 eager 模型的输出逐一比对
+    """
+
+    def __init__(self, config_manager: ConfigManager, atol: float = 1e-4):
+        self.config_manager = config_manager
+        self.factory = ModelFactory(config_manager)
+        self.atol = atol
+
+    def load_eager_model(self, model_name: str, weights_path: str) -> torch.nn.Module:
+        model = self.factory.create_model(model_name)
+        model.load_state_dict(torch.load(weights_path, map_location="cpu"))
+        model.eval()
+        return model
+
+    @staticmethod
+    def example_input(batch_size: int = 1) -> torch.Tensor:
+        return torch.rand(batch_size, 1, 28, 28)
+
+    def export_torchscript(self, model: torch.nn.Module, path: str) -> str:
+        with torch.no_grad():
+            traced = torch.jit.trace(model, self.example_input())
+        traced = torch.jit.freeze(traced)
+        torch.jit.save(traced, path)
+        return path
+
+    def export_onnx(self, model: torch.nn.Module, path: str) -> str:
+        torch.onnx.export(
+            model,
+            self.example_input(),
+            path,
+            input_names=["input"],
+            output_names=["logits"],
+            dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=13,
+        )
+        return path
+
+    def verify(self, model: torch.nn.Module, exported, batch_sizes: Iterable[int] = (1, 7, 64)) -> float:
+        """比较导出模型与 eager 模型的输出，返回最大绝对误差，超出 atol 时抛出异常"""
+        max_diff = 0.0
+        with torch.no_grad():
+            for batch_size in batch_sizes:
+                batch = self.example_input(batch_size)
+                diff = (model(batch) - exported(batch)).abs().max().item()
+                max_diff = max(max_diff, diff)
+        if max_diff > self.atol:
+            raise ValueError(f"Exported model output differs from eager model: max diff {max_diff} > {self.atol}")
+        return max_diff
+
+    def export(self, model_name: str, weights_path: str, formats=("torchscript", "onnxruntime")) -> Dict[str, Any]:
+        """
+        导出并校验
+        Args:
+            model_name: 模型架构名称
+            weights_path: .pth 权重文件路径
+            formats: 需要导出的后端 torchscript / onnxruntime
+        Returns:
+            dict: 每个后端的导出路径与最大误差
+        """
+        model = self.load_eager_model(model_name, weights_path)
+        report = {"model_name": model_name, "weights_path": weights_path}
+
+        for backend in formats:
+            if backend not in ("torchscript", "onnxruntime"):
+                raise ValueError(f"Unsupported export format: {backend}")
+            path = artifact_path_for(weights_path, backend)
+            # 先导出到同目录的临时文件，校验通过后再原子替换；
+            # 失败或误差超限的导出不会出现在预测服务加载的路径上
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".",
+                                            suffix=os.path.splitext(path)[1])
+            os.close(fd)
+            try:
+                if backend == "torchscript":
+                    self.export_torchscript(model, tmp_path)
+                    exported = load_torchscript_model(tmp_path, "cpu")
+                else:
+                    self.export_onnx(model, tmp_path)
+                    exported = OnnxRuntimeModel(tmp_path)
+
+                max_diff = self.verify(model, exported)
+                del exported
+                os.replace(tmp_path, path)
+                tmp_path = None
+            finally:
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            report[backend] = {"path": path, "max_abs_diff": max_diff}
+            print(f"✅ 已导出 {backend}: {path} (最大误差 {max_diff:.2e})")
+
+        return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='导出训练好的模型为 TorchScript / ONNX')
+    parser.add_argument('--model', help='模型架构名称，默认使用 prediction_config.json 中的配置')
+    parser.add_argument('--weights', help='.pth 权重路径（相对项目根目录），默认使用预测配置中的权重')
+    parser.add_argument('--formats', nargs='+', default=['torchscript', 'onnxruntime'],
+                        choices=['torchscript', 'onnxruntime'])
+    args = parser.parse_args()
+
+    conf = ConfigManager()
+    model_name = args.model or conf.get_mobile_prediction_model()
+    weights = args.weights or conf.get_prediction_weights_path()
+    exporter = ModelExporter(conf)
+    exporter.export(model_name, os.path.join(project_root, weights), args.formats)
@@ -2,27 +2,35 @@ import importlib
 import torch
 import torch.nn as nn
 from typing import Dict, Any, Tuple, Optional
+from torch.utils.data import DataLoader, Subset
+from torch.utils.data.distributed import DistributedSampler
 from config.config_manager import ConfigManager
 from utils.data_loader import create_simple_dataloader
 from models.base_model import BaseModel
+from core.dataset_cache import DatasetCache, MemmapDataset, create_memmap_loader
+from core.augmentation import BatchAugmentation
 
 
 class ModelFactory:
     """
     input:ConfigManager
-    调用create_training_components:返回包括模型、训练与验证的dataloader、优化器、损失函数
+    调用create_training_components:返回包括模型、训练与验证的dataloader、优化器、学习率调度器、损失函数
     """
     def __init__(self, config_manager: ConfigManager):
         self.config_manager = config_manager
         self.system_config = config_manager.get_system_config()
         self.train_config = config_manager.get_train_config()
 
-    def create_training_components(self) -> Dict[str, Any]:
+    def create_training_components(self, training_config: Optional[Dict[str, Any]] = None,
+                                   num_replicas: int = 1, rank: int = 0) -> Dict[str, Any]:
         """
         创建训练所需的所有组件
         返回包含模型、数据加载器、优化器、损失函数的字典
+        Args:
+            training_config: 训练配置（见 ConfigManager.create_training_config），默认使用 train_config.json
+            num_replicas / rank: 分布式训练的进程总数与当前进程序号，数据加载器只读取对应分片
         """
-        training_config = self.train_config
+        training_config = training_config or self.train_config
         components = {}
 
         # 创建模型
@@ -31,7 +39,9 @@ class ModelFactory:
         # 创建数据加载器
         components['data_loaders'] = self.create_data_loaders(
             training_config['dataset_name'],
-            training_config['hyperparameters']
+            training_config['hyperparameters'],
+            num_replicas=num_replicas,
+            rank=rank
         )
 
         # 创建优化器
@@ -40,9 +50,21 @@ class ModelFactory:
             training_config['hyperparameters']
         )
 
+        # 创建学习率调度器（未配置时为 None）
+        components['scheduler'] = self.create_scheduler(
+            components['optimizer'],
+            training_config['hyperparameters'],
+            len(components['data_loaders']['train'])
+        )
+
         # 创建损失函数
         components['criterion'] = self.create_criterion(training_config['hyperparameters'])
 
+        # 创建批量数据增强（未配置时为 None）
+        components['augmentation'] = BatchAugmentation.from_config(
+            training_config['hyperparameters'].get('augmentation')
+        )
+
         # 保存配置信息
         components['training_config'] = training_config
 
@@ -76,9 +98,29 @@ class ModelFactory:
 
         return model
 
-    def create_data_loaders(self, dataset_name: str, hyperparameters: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def get_loader_options(hyperparameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        DataLoader 并行加载参数：num_workers / prefetch_factor / persistent_workers / pin_memory
+        后两者及 prefetch_factor 只在 num_workers > 0 时有效；pin_memory 只在有 GPU 时启用
+        """
+        num_workers = int(hyperparameters.get('num_workers', 0))
+        options = {
+            'num_workers': num_workers,
+            'pin_memory': bool(hyperparameters.get('pin_memory', False)) and torch.cuda.is_available(),
+        }
+        if num_workers > 0:
+            options['prefetch_factor'] = int(hyperparameters.get('prefetch_factor', 2))
+            options['persistent_workers'] = bool(hyperparameters.get('persistent_workers', False))
+        return options
+
+    def create_data_loaders(self, dataset_name: str, hyperparameters: Dict[str, Any],
+                            num_replicas: int = 1, rank: int = 0) -> Dict[str, Any]:
         """
         创建训练和验证数据加载器
+        并行加载参数见 get_loader_options，只对预解码缓存生效（create_simple_dataloader 只接受 batch_size）
+        num_replicas > 1 时按 rank 分片，返回值中的 train_sampler 需在每个 epoch 调用 set_epoch
+        val_fraction < 1 时验证集为按 val_seed 固定的随机子集（见 create_subset_loader）
         """
         available_datasets = self.config_manager.get_available_datasets()
 
@@ -87,19 +129,70 @@ class ModelFactory:
                 f"Dataset '{dataset_name}' not found in available datasets: {list(available_datasets.keys())}")
 
         dataset_config = available_datasets[dataset_name]
-
-
-        # 加载数据集
-        train_loader, val_loader = create_simple_dataloader(
-            dataset_config['path'],
-            batch_size=hyperparameters['batch_size']
-        )
+        batch_size = hyperparameters['batch_size']
+
+        def load_source():
+            return create_simple_dataloader(dataset_config['path'], batch_size=batch_size)
+
+        cache_config = self.config_manager.get_dataset_cache_config()
+        if cache_config['enabled']:
+            # 从预解码的内存映射缓存读取，首次使用或源数据变化时自动重建
+            cache = DatasetCache(cache_config['cache_dir'], cache_config['verify_checksum'])
+            datasets = cache.get_datasets(dataset_name, dataset_config['path'], load_source)
+            loader_options = self.get_loader_options(hyperparameters)
+            train_loader = create_memmap_loader(datasets['train'], batch_size, shuffle=True,
+                                                num_replicas=num_replicas, rank=rank, **loader_options)
+            val_loader = create_memmap_loader(datasets['val'], batch_size, shuffle=False,
+                                              num_replicas=num_replicas, rank=rank, **loader_options)
+            train_sampler = train_loader.batch_sampler.sampler
+        else:
+            loader_options = {}
+            # 加载数据集
+            train_loader, val_loader = load_source()
+            train_sampler = None
+            if num_replicas > 1:
+                # 用分片采样器重新包装原始数据集
+                train_sampler = DistributedSampler(train_loader.dataset, num_replicas=num_replicas, rank=rank,
+                                                   shuffle=True)
+                train_loader = DataLoader(train_loader.dataset, batch_size=batch_size, sampler=train_sampler)
+                val_loader = DataLoader(val_loader.dataset, batch_size=batch_size,
+                                        sampler=DistributedSampler(val_loader.dataset, num_replicas=num_replicas,
+                                                                   rank=rank, shuffle=False))
+
+        val_fraction = min(max(float(hyperparameters.get('val_fraction', 1.0)), 0.0), 1.0)
+        if val_fraction < 1.0:
+            val_size = max(1, int(len(val_loader.dataset) * val_fraction))
+            val_loader = self.create_subset_loader(val_loader, val_size, batch_size,
+                                                   seed=int(hyperparameters.get('val_seed', 0)),
+                                                   num_replicas=num_replicas, rank=rank, **loader_options)
 
         return {
             'train': train_loader,
-            'val': val_loader
+            'val': val_loader,
+            'train_sampler': train_sampler if num_replicas > 1 else None
         }
 
+    @staticmethod
+    def create_subset_loader(loader: DataLoader, size: int, batch_size: int, seed: int = 0,
+                             num_replicas: int = 1, rank: int = 0, **loader_kwargs) -> DataLoader:
+        """
+        用固定种子从 loader 的数据集中随机抽取 size 个样本，按下标顺序组成新的加载器
+        每次调用（各进程、各 epoch、续训）抽到的子集相同；不直接取前 N 个批次，避免按类别排序的数据产生偏差
+        """
+        dataset = loader.dataset
+        generator = torch.Generator().manual_seed(seed)
+        indices = torch.randperm(len(dataset), generator=generator)[:size].sort().values.tolist()
+        subset = Subset(dataset, indices)
+
+        if isinstance(dataset, MemmapDataset):
+            # Subset 把整批下标映射回原数据集，MemmapDataset 仍一次返回整批
+            return create_memmap_loader(subset, batch_size, shuffle=False, num_replicas=num_replicas, rank=rank,
+                                        **loader_kwargs)
+        sampler = None
+        if num_replicas > 1:
+            sampler = DistributedSampler(subset, num_replicas=num_replicas, rank=rank, shuffle=False)
+        return DataLoader(subset, batch_size=batch_size, sampler=sampler, **loader_kwargs)
+
     def create_optimizer(self, model: BaseModel, hyperparameters: Dict[str, Any]) -> torch.optim.Optimizer:
         """
         创建优化器
@@ -128,6 +221,56 @@ class ModelFactory:
 
         return optimizer
 
+    def create_scheduler(self, optimizer: torch.optim.Optimizer, hyperparameters: Dict[str, Any],
+                         steps_per_epoch: int) -> Optional[Any]:
+        """
+        创建学习率调度器
+        - none: 固定学习率
+        - step: 每 lr_step_size 个 epoch 乘以 lr_gamma
+        - cosine: 在 epochs 内余弦退火到 lr_min
+        - plateau: 监控指标（monitor）连续 lr_patience 次验证未改善时乘以 lr_gamma
+        - onecycle: 按 batch 调整，峰值为 lr_max（默认 learning_rate 的 10 倍）
+        """
+        scheduler_name = hyperparameters.get('lr_scheduler', 'none').lower()
+        learning_rate = hyperparameters.get('learning_rate', 0.001)
+        epochs = hyperparameters.get('epochs', 10)
+        gamma = hyperparameters.get('lr_gamma', 0.1)
+
+        if scheduler_name == 'none':
+            return None
+        elif scheduler_name == 'step':
+            scheduler = torch.optim.lr_scheduler.StepLR(
+                optimizer,
+                step_size=hyperparameters.get('lr_step_size', 10),
+                gamma=gamma
+            )
+        elif scheduler_name == 'cosine':
+            scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(
+                optimizer,
+                T_max=epochs,
+                eta_min=hyperparameters.get('lr_min', 0.0)
+            )
+        elif scheduler_name == 'plateau':
+            monitor = hyperparameters.get('monitor', 'val_loss')
+            scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(
+                optimizer,
+                mode='min' if monitor == 'val_loss' else 'max',
+                factor=gamma,
+                patience=hyperparameters.get('lr_patience', 3),
+                min_lr=hyperparameters.get('lr_min', 0.0)
+            )
+        elif scheduler_name == 'onecycle':
+            scheduler = torch.optim.lr_scheduler.OneCycleLR(
+                optimizer,
+                max_lr=hyperparameters.get('lr_max', learning_rate * 10),
+                epochs=epochs,
+                steps_per_epoch=max(1, steps_per_epoch)
+            )
+        else:
+            raise ValueError(f"Unsupported lr scheduler: {scheduler_name}")
+
+        return scheduler
+
     def create_criterion(self, hyperparameters: Dict[str, Any]) -> nn.Module:
         """
         创建损失函数
@@ -0,0 +1,181 @@
+import io
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
+
+import torch
+
+
+def _tensor_bytes(value, seen: set) -> int:
+    """递归统计张量占用的字节数，支持 tuple/list 以及 int8 模型的打包参数（ScriptObject）"""
+    if isinstance(value, torch.Tensor):
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        return value.numel() * value.element_size()
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(item, seen) for item in value)
+    if isinstance(value, torch._C.ScriptObject) and hasattr(value, "__getstate__"):
+        try:
+            return _tensor_bytes(value.__getstate__(), seen)
+        except Exception:
+            return 0
+    return 0
+
+
+def model_memory_bytes(model: torch.nn.Module) -> int:
+    """
+    模型参数、缓冲区与 state_dict 占用的字节数（ONNX Runtime 等非 torch 模型使用其自报的大小）
+    int8 模型的权重在打包参数中，不出现在 parameters() 里；仍统计不到时用 TorchScript 序列化大小估算
+    """
+    if not isinstance(model, torch.nn.Module):
+        return getattr(model, "memory_bytes", 0)
+    seen = set()
+    total = sum(_tensor_bytes(t, seen) for t in list(model.parameters()) + list(model.buffers()))
+    try:
+        total += sum(_tensor_bytes(value, seen) for value in model.state_dict(keep_vars=True).values())
+    except Exception:
+        pass
+    if total == 0 and isinstance(model, torch.jit.ScriptModule):
+        buffer = io.BytesIO()
+        torch.jit.save(model, buffer)
+        total = buffer.tell()
+    return total
+
+
+class ModelPool:
+    """
+    预测服务内的多模型常驻池：
+    1. 以 (模型架构, 权重路径, 推理后端) 为键缓存已加载并预热的模型，模型位于该后端对应的设备上
+    2. 所有常驻模型的总内存不超过 memory_budget_bytes，超出时按 LRU 淘汰
+    3. 模型通过 predictor._build_model 严格加载，并经过冒烟测试后才放入池中
+    被淘汰的模型若仍被进行中的请求引用，会在请求结束后由 Python 回收
+    """
+
+    def __init__(self, predictor, memory_budget_bytes: int = 256 * 1024 * 1024):
+        self.predictor = predictor
+        self.memory_budget_bytes = memory_budget_bytes
+
+        # (model_name, weights_path, backend) -> {"model", "memory_bytes", "loaded_at", "last_used", "hits"}
+        self._models: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        # 只保护 _models / _loading 的读写，不在持有时加载模型
+        self._lock = threading.RLock()
+        # 正在加载的键 -> {"lock", "waiters", "error"}，同一模型的并发请求只加载一次；
+        # 所有等待者都拿到结果后才移除，加载失败时等待中的请求共享同一个错误
+        self._loading: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._evictions = 0
+
+    def get(self, model_name: str, weights_path: str, backend: str = "eager") -> torch.nn.Module:
+        """获取模型，未常驻时加载；加载期间其他模型的请求不受影响，同一模型只加载一次"""
+        key = (model_name, weights_path, backend)
+        with self._lock:
+            model = self._touch(key)
+            if model is not None:
+                return model
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = {"lock": threading.Lock(), "waiters": 0, "error": None}
+            loading["waiters"] += 1
+
+        try:
+            with loading["lock"]:
+                # 等待期间可能已由其他请求加载完成
+                with self._lock:
+                    model = self._touch(key)
+                    if model is not None:
+                        return model
+                if loading["error"] is not None:
+                    # 前一个请求加载失败，本轮等待者不再重复加载
+                    raise loading["error"]
+                try:
+                    entry = self._load(key)
+                except Exception as e:
+                    loading["error"] = e
+                    raise
+                with self._lock:
+                    # 刚加载的模型可能已被并发加载的其他模型淘汰，仍然返回给本次请求
+                    self._touch(key)
+                return entry["model"]
+        finally:
+            with self._lock:
+                loading["waiters"] -= 1
+                if loading["waiters"] == 0:
+                    # 之后的新请求会重新尝试加载
+                    self._loading.pop(key, None)
+
+    def _touch(self, key: Tuple[str, str, str]):
+        """调用方持有 _lock：命中时更新 LRU 顺序与统计并返回模型"""
+        entry = self._models.get(key)
+        if entry is None:
+            return None
+        self._models.move_to_end(key)
+        entry["last_used"] = time.time()
+        entry["hits"] += 1
+        return entry["model"]
+
+    def _load(self, key: Tuple[str, str, str]) -> Dict[str, Any]:
+        model_name, weights_path, backend = key
+        device = self.predictor._backend_device(backend)
+        model = self.predictor._build_model(model_name, weights_path, strict=True, backend=backend, device=device)
+        self.predictor._smoke_test(model, device)
+
+        memory_bytes = model_memory_bytes(model)
+        if memory_bytes > self.memory_budget_bytes:
+            raise MemoryError(
+                f"Model {model_name} ({memory_bytes} bytes) exceeds pool budget {self.memory_budget_bytes} bytes")
+
+        entry = {
+            "model": model,
+            "memory_bytes": memory_bytes,
+            "loaded_at": time.time(),
+            "last_used": time.time(),
+            "hits": 0,
+        }
+        with self._lock:
+            # 淘汰最久未使用的模型直到放得下
+            while self._models and self.memory_bytes() + memory_bytes > self.memory_budget_bytes:
+                evicted_key, _ = self._models.popitem(last=False)
+                self._evictions += 1
+                print(f"[INFO] 模型池淘汰: {evicted_key[0]} ({evicted_key[1]})")
+            self._models[key] = entry
+        print(f"[INFO] 模型池加载: {model_name} ({weights_path}), {memory_bytes / 1024 / 1024:.2f} MB")
+        return entry
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(entry["memory_bytes"] for entry in self._models.values())
+
+    def discard(self, model_name: str, weights_path: str):
+        """移除指定模型的所有后端副本（例如它已成为主模型）"""
+        with self._lock:
+            for key in [key for key in self._models if key[:2] == (model_name, weights_path)]:
+                del self._models[key]
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def list_resident(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "model_name": model_name,
+                    "weights_path": weights_path,
+                    "backend": backend,
+                    "model_type": type(entry["model"]).__name__,
+                    "memory_bytes": entry["memory_bytes"],
+                    "loaded_at": entry["loaded_at"],
+                    "last_used": entry["last_used"],
+                    "hits": entry["hits"],
+                }
+                for (model_name, weights_path, backend), entry in self._models.items()
+            ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "memory_bytes": self.memory_bytes(),
+            "evictions": self._evictions,
+            "models": self.list_resident(),
+        }
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from core.model_pool import ModelPool, model_memory_bytes
+
+
+class SlowPredictor:
+    """_build_model 在 release 之前阻塞，用于检查加载期间其他请求不被阻塞"""
+
+    def __init__(self, error=None):
+        self.release = threading.Event()
+        self.builds = []
+        self.error = error
+
+    @staticmethod
+    def _backend_device(backend):
+        return torch.device("cpu")
+
+    def _build_model(self, model_name, weights_path, strict=True, backend=None, device=None):
+        self.builds.append(model_name)
+        if model_name == "slow":
+            assert self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return torch.nn.Linear(4, 2)
+
+    def _smoke_test(self, model, device=None):
+        pass
+
+
+def test_cached_model_is_served_while_another_loads():
+    predictor = SlowPredictor()
+    pool = ModelPool(predictor)
+    fast = pool.get("fast", "a.pth")
+
+    loader = threading.Thread(target=pool.get, args=("slow", "b.pth"))
+    loader.start()
+    try:
+        assert pool.get("fast", "a.pth") is fast
+    finally:
+        predictor.release.set()
+        loader.join(5)
+    assert [entry["model_name"] for entry in pool.list_resident()] == ["fast", "slow"]
+
+
+def test_concurrent_requests_load_once():
+    predictor = SlowPredictor()
+    pool = ModelPool(predictor)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.get("slow", "b.pth"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    predictor.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert predictor.builds == ["slow"]
+    assert len(results) == 4 and all(model is results[0] for model in results)
+
+
+def test_memory_bytes_counts_int8_packed_weights():
+    model = torch.nn.Sequential(torch.nn.Linear(256, 256))
+    int8_model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    scripted = torch.jit.trace(int8_model, torch.randn(1, 256))
+
+    assert model_memory_bytes(int8_model) >= 256 * 256
+    assert model_memory_bytes(scripted) >= 256 * 256
+
+
+def test_failed_load_is_shared_by_waiting_requests():
+    predictor = SlowPredictor(error=FileNotFoundError("missing"))
+    pool = ModelPool(predictor)
+    errors = []
+
+    def request():
+        try:
+            pool.get("slow", "b.pth")
+        except FileNotFoundError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while pool._loading.get(("slow", "b.pth", "eager"), {}).get("waiters", 0) < 4:
+        time.sleep(0.01)
+    predictor.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert predictor.builds == ["slow"]
+    assert len(errors) == 4
+    assert pool._loading == {}
+
+    # 所有等待者返回后，新的请求会重新加载
+    with pytest.raises(FileNotFoundError):
+        pool.get("slow", "b.pth")
+    assert predictor.builds == ["slow", "slow"]
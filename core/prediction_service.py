@@ -0,0 +1,92 @@
+import base64
+import os
+from typing import Any, Dict, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from core.metrics import track_stage
+from core.result_cache import PredictionCache
+
+
+def model_version(predictor, model_name: str, weights_path_relative: Optional[str]) -> str:
+    """由模型架构与权重文件（相对项目根目录）计算模型版本，权重更新后版本随之变化"""
+    project_root = predictor.config_manager.config_dir.parent
+    weights_path = os.path.join(project_root, weights_path_relative) if weights_path_relative else None
+    return PredictionCache.model_version(model_name, weights_path)
+
+
+def current_model_version(predictor, state=None) -> str:
+    """当前已加载模型的版本，用于缓存失效（热切换完成后自动变化）"""
+    state = state or predictor.state
+    return model_version(predictor, state.model_name, state.weights_path)
+
+
+def cache_variant(predictor, render: str, model_spec: Sequence[str], state=None) -> str:
+    """
+    缓存键中的请求参数部分：包含解析后的主模型与影子模型的架构、权重路径和权重修改时间，
+    模型池中的模型权重更新后不会命中旧结果
+    """
+    model_name, weights, shadow_name, shadow_weights = model_spec
+    parts = [render, model_version(predictor, *predictor.resolve_model_spec(model_name, weights, state))]
+    if shadow_name or shadow_weights:
+        parts.append(model_version(predictor, *predictor.resolve_model_spec(shadow_name, shadow_weights, state)))
+    return '|'.join(parts)
+
+
+def run_prediction(predictor, file_bytes: bytes, render: str = '', model_spec: Sequence[str] = ('', '', '', ''),
+                   scheduler=None, result_cache: Optional[PredictionCache] = None) -> Optional[Dict[str, Any]]:
+    """
+    单张图片预测的完整流程，mobile_api.py 与 mobile_api_async.py 共用：
+    1. 相同内容、相同模型的请求直接返回缓存结果（附带 cached=True）
+    2. 解码 -> 按请求选择模型（未常驻的模型会加载进模型池）-> 分割 -> 推理
+    3. 微批调度器只服务主模型，指定了其他模型的请求直接推理
+    Args:
+        model_spec: (model, weights, shadow_model, shadow_weights)，空字符串表示未指定
+        render: ''、boxes、png 或 jpeg；png / jpeg 的标注图片以 base64 字符串返回
+    Returns:
+        可 JSON 序列化的结果字典，图片无法解析时返回 None
+    Raises:
+        ValueError / FileNotFoundError: 指定的模型或权重无法解析
+    """
+    model_name, weights, shadow_name, shadow_weights = model_spec
+
+    # 缓存版本与键都基于请求开始时的同一份模型状态
+    cache_key = None
+    if result_cache is not None:
+        state = predictor.state
+        result_cache.set_model_version(current_model_version(predictor, state))
+        cache_key = PredictionCache.make_key(file_bytes, cache_variant(predictor, render, model_spec, state))
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return {'cached': True, **cached}
+
+    with track_stage('decode'):
+        img_np = cv2.imdecode(np.frombuffer(file_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if img_np is None:
+        return None
+
+    model = predictor.resolve_model(model_name, weights) if (model_name or weights) else None
+    shadow_model = (predictor.resolve_model(shadow_name, shadow_weights)
+                    if (shadow_name or shadow_weights) else None)
+
+    if model is None and shadow_model is None and scheduler is not None:
+        runner, extra = scheduler, {}
+    else:
+        runner, extra = predictor, {'model': model, 'shadow_model': shadow_model}
+    if render:
+        result = runner.predict(
+            img_np,
+            render='return',
+            image_format=None if render == 'boxes' else render,
+            **extra
+        )
+        if 'image' in result:
+            with track_stage('serialization'):
+                result['image'] = base64.b64encode(result['image']).decode('ascii')
+    else:
+        result = runner.predict(img_np, render='none', **extra)
+
+    if cache_key is not None:
+        result_cache.put(cache_key, result)
+    return result
@@ -0,0 +1,81 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from core.prediction_service import run_prediction
+from core.result_cache import PredictionCache
+
+
+class FakeRunner:
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+
+    def predict(self, img_np, render='none', image_format=None, model=None, shadow_model=None):
+        self.calls.append({"render": render, "model": model, "shadow_model": shadow_model})
+        result = {"digit": "7", "runner": self.name}
+        if image_format:
+            result["image"] = b"\x89PNG"
+        return result
+
+
+class FakePredictor(FakeRunner):
+    def __init__(self, root):
+        super().__init__("predictor")
+        self.config_manager = SimpleNamespace(config_dir=Path(root) / "config")
+        self.state = SimpleNamespace(model_name="cnn_model", weights_path="models/cnn.pth")
+
+    def resolve_model_spec(self, model_name=None, weights_path=None, state=None):
+        state = state or self.state
+        if model_name == "missing":
+            raise ValueError("Model architecture 'missing' not found in available models")
+        return model_name or state.model_name, weights_path or state.weights_path
+
+    def resolve_model(self, model_name=None, weights_path=None):
+        return self.resolve_model_spec(model_name, weights_path)
+
+
+def encode_png():
+    ok, buffer = cv2.imencode(".png", np.zeros((8, 8, 3), dtype=np.uint8))
+    assert ok
+    return buffer.tobytes()
+
+
+def test_main_model_goes_through_scheduler_and_is_cached(tmp_path):
+    predictor, scheduler, cache = FakePredictor(tmp_path), FakeRunner("scheduler"), PredictionCache()
+    file_bytes = encode_png()
+
+    first = run_prediction(predictor, file_bytes, scheduler=scheduler, result_cache=cache)
+    second = run_prediction(predictor, file_bytes, scheduler=scheduler, result_cache=cache)
+
+    assert first == {"digit": "7", "runner": "scheduler"}
+    assert second == {"cached": True, **first}
+    assert len(scheduler.calls) == 1 and not predictor.calls
+
+
+def test_requested_models_bypass_scheduler_and_use_separate_cache_keys(tmp_path):
+    predictor, scheduler, cache = FakePredictor(tmp_path), FakeRunner("scheduler"), PredictionCache()
+    file_bytes = encode_png()
+
+    run_prediction(predictor, file_bytes, scheduler=scheduler, result_cache=cache)
+    result = run_prediction(predictor, file_bytes, 'png', ('mlp_model', 'models/mlp.pth', 'cnn_model', ''),
+                            scheduler=scheduler, result_cache=cache)
+
+    assert "cached" not in result
+    assert result["image"] == "iVBORw=="
+    assert predictor.calls == [{
+        "render": "return",
+        "model": ("mlp_model", "models/mlp.pth"),
+        "shadow_model": ("cnn_model", "models/cnn.pth"),
+    }]
+
+
+def test_undecodable_image_and_unknown_model(tmp_path):
+    predictor = FakePredictor(tmp_path)
+
+    assert run_prediction(predictor, b"not an image") is None
+    with pytest.raises(ValueError):
+        run_prediction(predictor, encode_png(), model_spec=('missing', '', '', ''), result_cache=PredictionCache())
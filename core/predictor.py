@@ -1,5 +1,8 @@
 import sys
 import os
+import threading
+import time
+from typing import Any, NamedTuple, Optional
 
 # 添加项目根目录到 sys.path，以便能够导入 core 模块
 # 假设当前文件在 core/ 目录下，项目根目录是上一级
@@ -13,13 +16,45 @@ import numpy as np
 import torch
 from torchvision import transforms
 from core.model_factory import ModelFactory
+from core.model_pool import ModelPool, model_memory_bytes
+from core.inference_backends import load_backend_model
+from core.metrics import track_stage, DIGITS_PER_IMAGE, IMAGE_PIXELS
+
+# 结果渲染模式
+RENDER_MODES = ("none", "return", "window")
+# 标注图片支持的编码格式
+IMAGE_FORMATS = {"png": ".png", "jpeg": ".jpg", "jpg": ".jpg"}
+
+class ModelState(NamedTuple):
+    """
+    推理所用的模型及其配置，热切换时整体替换为新对象（单次引用赋值）
+    请求开始时读取一次，之后只使用这份快照，不会把旧模型与新设备 / 新批量大小混用
+    """
+    model: Any
+    model_name: Optional[str]
+    weights_path: Optional[str]
+    # 推理后端：eager / torchscript / onnxruntime / int8
+    # （torchscript 与 onnxruntime 由 core/model_export.py 导出，int8 由 core/quantization.py 生成）
+    backend: str
+    device: torch.device
+    # 单次前向传播的最大批量，数字过多时按该大小分块
+    max_batch_size: int
+
 
 class Predictor:
     def __init__(self, config_manager):
         self.config_manager = config_manager
-        self.model = None
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        # 当前模型状态，只通过整体替换更新
+        self.state = ModelState(
+            model=None,
+            model_name=None,
+            weights_path=None,
+            backend="eager",
+            device=self._backend_device("eager"),
+            max_batch_size=64
+        )
         # 转换器：OpenCV图片(numpy) -> PIL -> Gray -> Resize -> Tensor
+        # 仅在 preprocess_backend 为 torchvision 时使用，默认走 _crops_to_tensor 的 OpenCV 路径
         self.transform = transforms.Compose([
             transforms.ToPILImage(),
             transforms.Grayscale(),
@@ -27,20 +62,70 @@ class Predictor:
             transforms.ToTensor(),
         ])
         self.index_to_class = [str(i) for i in range(10)]
+        # 结果渲染模式，服务端默认不绘制
+        self.render_mode = "none"
+        # 字符归一化方式：opencv（批量 cv2.resize）或 torchvision（逐个 PIL 转换）
+        self.preprocess_backend = "opencv"
+        self.reload_status = None
+        self._reload_lock = threading.Lock()
+        self._reload_thread = None
+        # 由 _reload_lock 保护：是否有切换线程在运行，以及运行期间是否又收到了切换请求
+        self._reloading = False
+        self._reload_pending = False
+        self._watch_thread = None
+        # 按请求选择的其他模型常驻池
+        self.model_pool = None
+
+    # 以下只读属性均取自当前 state；同一请求中需要多个字段时应先读取 self.state 再使用
+    @property
+    def model(self):
+        return self.state.model
+
+    @property
+    def model_name(self):
+        return self.state.model_name
+
+    @property
+    def weights_path(self):
+        return self.state.weights_path
+
+    @property
+    def backend(self):
+        return self.state.backend
+
+    @property
+    def device(self):
+        return self.state.device
+
+    @property
+    def max_batch_size(self):
+        return self.state.max_batch_size
+
+    @staticmethod
+    def _backend_device(backend):
+        """量化模型与 ONNX Runtime 封装只在 CPU 上推理，其他后端优先使用 GPU"""
+        if backend in ("int8", "onnxruntime"):
+            return torch.device("cpu")
+        return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    def _build_model(self, model_name, weights_path_relative, strict=False, backend=None, device=None):
+        """
+        创建模型实例并加载权重
+        strict=True 时权重缺失或加载失败直接抛出异常（热切换时用于回滚）
+        backend 不是 eager 时加载导出文件，失败时总是抛出异常（回退由 load_model 处理，以便记录实际后端）
+        backend / device 默认使用当前值，热切换时传入新配置对应的值
+        """
+        state = self.state
+        backend = backend or state.backend
+        device = device or state.device
+        if backend != "eager" and weights_path_relative:
+            project_root = self.config_manager.config_dir.parent
+            model = load_backend_model(backend, os.path.join(project_root, weights_path_relative), device)
+            print(f"已加载 {backend} 模型: {weights_path_relative}")
+            return model
 
-    def load_model(self):
-        """加载模型"""
         factory = ModelFactory(self.config_manager)
-        
-        # 1. 从配置中获取模型架构名称
-        model_name = self.config_manager.get_mobile_prediction_model()
-        print(f"使用模型架构: {model_name}")
-        
-        # 2. 创建模型实例
-        self.model = factory.create_model(model_name)
-        
-        # 3. 从配置中获取权重路径
-        weights_path_relative = self.config_manager.get_prediction_weights_path()
+        model = factory.create_model(model_name)
         
         if weights_path_relative:
             # 构建绝对路径
@@ -49,26 +134,265 @@ class Predictor:
             
             if os.path.exists(weights_path):
                 try:
-                    self.model.load_state_dict(torch.load(weights_path, map_location=self.device))
+                    model.load_state_dict(torch.load(weights_path, map_location=device))
                     print(f"已加载预训练权重: {weights_path}")
                 except Exception as e:
+                    if strict:
+                        raise
                     print(f"加载权重失败: {e}")
             else:
+                if strict:
+                    raise FileNotFoundError(f"Weights file not found: {weights_path}")
                 print(f"警告: 权重文件不存在: {weights_path}")
         else:
+            if strict:
+                raise ValueError("model_weights_path is not configured")
             print("警告: 未配置预训练权重路径 (model_weights_path)")
 
-        self.model.to(self.device)
-        self.model.eval()
+        model.to(device)
+        model.eval()
+        return model
+
+    def load_model(self):
+        """加载模型"""
+        # 1. 从配置中获取模型架构名称与推理后端
+        model_name = self.config_manager.get_mobile_prediction_model()
+        backend = self.config_manager.get_prediction_backend()
+        device = self._backend_device(backend)
+        print(f"使用模型架构: {model_name} (后端: {backend})")
+        
+        # 2. 从配置中获取权重路径
+        weights_path_relative = self.config_manager.get_prediction_weights_path()
+
+        # 3. 创建模型实例并加载权重；导出文件加载失败时回退到 eager，状态中记录实际使用的后端
+        model = None
+        if backend != "eager":
+            try:
+                if not weights_path_relative:
+                    raise ValueError("model_weights_path is not configured")
+                model = self._build_model(model_name, weights_path_relative, backend=backend, device=device)
+            except Exception as e:
+                print(f"警告: 加载 {backend} 模型失败，回退到 eager: {e}")
+                backend = "eager"
+                device = self._backend_device(backend)
+        if model is None:
+            model = self._build_model(model_name, weights_path_relative, backend=backend, device=device)
+        self.state = ModelState(
+            model=model,
+            model_name=model_name,
+            weights_path=weights_path_relative,
+            backend=backend,
+            device=device,
+            max_batch_size=max(1, self.config_manager.get_prediction_max_batch_size())
+        )
+
+        self.render_mode = self.config_manager.get_prediction_render_mode()
+        self.preprocess_backend = self.config_manager.get_prediction_preprocess_backend()
+
+        pool_config = self.config_manager.get_model_pool_config()
+        self.model_pool = ModelPool(self, memory_budget_bytes=int(pool_config["memory_budget_mb"] * 1024 * 1024))
+
+    def _check_weights_path(self, weights_path_relative):
+        """请求指定的权重必须位于模型存储目录内"""
+        project_root = self.config_manager.config_dir.parent
+        storage_path = self.config_manager.get_system_config()["system_settings"]["model_storage_path"]
+        storage_dir = os.path.realpath(os.path.join(project_root, storage_path))
+        weights_path = os.path.realpath(os.path.join(project_root, weights_path_relative))
+        if os.path.commonpath([storage_dir, weights_path]) != storage_dir:
+            raise ValueError(f"Weights path must be inside {storage_path}: {weights_path_relative}")
+
+    def resolve_model_spec(self, model_name=None, weights_path=None, state=None):
+        """
+        解析请求实际使用的模型架构与权重路径（不加载模型），参数含义同 resolve_model
+        state 为请求开始时读取的模型状态，默认取当前状态
+        Returns:
+            (model_name, weights_path_relative)
+        """
+        state = state or self.state
+        if not model_name and not weights_path:
+            return state.model_name, state.weights_path
+
+        model_name = model_name or state.model_name
+        if not weights_path:
+            if model_name == state.model_name:
+                weights_path = state.weights_path
+            else:
+                available_models = self.config_manager.get_available_models()
+                if model_name not in available_models:
+                    raise ValueError(f"Model architecture '{model_name}' not found in available models")
+                weights_path = available_models[model_name].get("model_path")
+                if not weights_path:
+                    raise ValueError(f"No weights specified for model '{model_name}'")
+        self._check_weights_path(weights_path)
+        return model_name, weights_path
+
+    def resolve_model(self, model_name=None, weights_path=None):
+        """
+        按请求选择模型：未指定或与当前模型一致时返回主模型状态，否则从模型池获取
+        池中模型按当前后端加载，返回的 ModelState 中设备与批量大小与之匹配
+        Args:
+            model_name: 模型架构名称（system_config.json 中的 available_models）
+            weights_path: 相对项目根目录的权重路径，为空时使用该架构配置的 model_path
+        Returns:
+            ModelState，可直接传给 predict 的 model / shadow_model
+        """
+        state = self.state
+        model_name, weights_path = self.resolve_model_spec(model_name, weights_path, state)
+        if (model_name, weights_path) == (state.model_name, state.weights_path):
+            return state
+        model = self.model_pool.get(model_name, weights_path, state.backend)
+        return state._replace(model=model, model_name=model_name, weights_path=weights_path)
+
+    def _smoke_test(self, model, device=None):
+        """用空白字符跑一次推理，确认新模型可用"""
+        blank = self._crops_to_tensor([np.zeros((28, 28), dtype=np.uint8)]).to(device or self.device)
+        with torch.no_grad():
+            outputs = model(blank)
+        if outputs.shape != (1, len(self.index_to_class)):
+            raise ValueError(f"Unexpected output shape from smoke test: {tuple(outputs.shape)}")
+        if not torch.isfinite(outputs).all():
+            raise ValueError("Smoke test produced non-finite outputs")
+
+    def reload_model(self, wait=False):
+        """
+        零停机热切换模型：
+        1. 后台线程按当前配置创建新模型、加载权重并预热
+        2. 冒烟测试通过后原子替换 self.state，正在处理的请求继续使用旧模型完成
+        3. 任一步骤失败则保留旧模型（自动回滚），并记录错误
+        4. 切换进行中又收到请求时不丢弃：当前切换结束后按最新配置再切换一次
+           （例如先后修改模型架构与权重路径，第一次切换会失败，第二次使用完整的新配置）
+        Returns:
+            bool: 是否发起了新的切换（已有切换进行中时记为待处理并返回 False）
+        """
+        with self._reload_lock:
+            started = not self._reloading
+            if started:
+                self._reloading = True
+                self._reload_pending = False
+                self._reload_thread = threading.Thread(target=self._reload_loop, name="model-reload", daemon=True)
+                self._reload_thread.start()
+            else:
+                self._reload_pending = True
+            thread = self._reload_thread
+
+        if wait:
+            # 待处理的切换在同一线程中执行，join 会等到它也完成
+            thread.join()
+        return started
+
+    def _reload_loop(self):
+        while True:
+            try:
+                self._reload_worker()
+            except Exception as e:
+                print(f"[ERROR] 模型热切换异常: {e}")
+            with self._reload_lock:
+                if not self._reload_pending:
+                    self._reloading = False
+                    return
+                self._reload_pending = False
+
+    def _reload_worker(self):
+        model_name = self.config_manager.get_mobile_prediction_model()
+        weights_path_relative = self.config_manager.get_prediction_weights_path()
+        backend = self.config_manager.get_prediction_backend()
+        device = self._backend_device(backend)
+        max_batch_size = max(1, self.config_manager.get_prediction_max_batch_size())
+        started_at = time.time()
+        try:
+            new_model = self._build_model(model_name, weights_path_relative, strict=True,
+                                          backend=backend, device=device)
+            self._smoke_test(new_model, device)
+            new_state = ModelState(
+                model=new_model,
+                model_name=model_name,
+                weights_path=weights_path_relative,
+                backend=backend,
+                device=device,
+                max_batch_size=max_batch_size
+            )
+        except Exception as e:
+            print(f"[ERROR] 模型热切换失败，继续使用 {self.model_name}: {e}")
+            self.reload_status = {
+                "success": False,
+                "model_name": model_name,
+                "weights_path": weights_path_relative,
+                "error": str(e),
+                "time": started_at,
+            }
+            return
+
+        backend_changed = backend != self.state.backend
+        # 引用赋值是原子的：新请求拿到新状态（模型、后端、设备、批量大小一起切换），
+        # 进行中的请求仍持有旧状态
+        self.state = new_state
+        if self.model_pool is not None:
+            if backend_changed:
+                # 池中模型按旧后端加载，不会再被使用，释放内存
+                self.model_pool.clear()
+            else:
+                # 主模型已切换，池中同键的副本不再需要
+                self.model_pool.discard(model_name, weights_path_relative)
+        self.reload_status = {
+            "success": True,
+            "model_name": model_name,
+            "weights_path": weights_path_relative,
+            "backend": backend,
+            "max_batch_size": max_batch_size,
+            "error": None,
+            "time": started_at,
+            "duration": time.time() - started_at,
+        }
+        print(f"[INFO] 模型已热切换为 {model_name} ({weights_path_relative}, 后端: {backend})")
+
+    def _on_config_change(self, file_path, config):
+        """prediction_config.json 中模型、权重、推理后端或最大批量变化时触发热切换"""
+        if os.path.abspath(file_path) != os.path.abspath(self.config_manager.prediction_config_path):
+            return
+        model_name = config.get("mobile_prediction_model", "mlp_model")
+        weights_path_relative = config.get("model_weights_path")
+        backend = config.get("backend", "eager")
+        max_batch_size = max(1, int(config.get("max_batch_size", 64)))
+        state = self.state
+        if (model_name, weights_path_relative, backend, max_batch_size) != \
+                (state.model_name, state.weights_path, state.backend, state.max_batch_size):
+            print(f"[INFO] 检测到预测配置变化: {model_name} ({weights_path_relative}, 后端: {backend})")
+            self.reload_model()
+
+    def start_config_watch(self, interval=2.0):
+        """订阅配置变化，并在后台线程中定期检查配置文件是否被外部修改"""
+        if self._watch_thread is not None:
+            return
+        self.config_manager.subscribe(self._on_config_change)
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.config_manager.check_for_changes()
+                except Exception as e:
+                    print(f"[WARN] 检查配置变化失败: {e}")
+
+        self._watch_thread = threading.Thread(target=watch, name="config-watch", daemon=True)
+        self._watch_thread.start()
 
     def is_ready(self):
         return self.model is not None
 
     def get_model_info(self):
-        if self.model:
+        state = self.state
+        if state.model is not None:
             return {
-                "device": str(self.device),
-                "model_type": type(self.model).__name__
+                "device": str(state.device),
+                "model_type": type(state.model).__name__,
+                "backend": state.backend,
+                "model_name": state.model_name,
+                "weights_path": state.weights_path,
+                "max_batch_size": state.max_batch_size,
+                "memory_bytes": model_memory_bytes(state.model),
+                "reloading": self._reloading,
+                "last_reload": self.reload_status,
+                "model_pool": self.model_pool.get_stats() if self.model_pool else None
             }
         return {}
 
@@ -151,28 +475,69 @@ class Predictor:
         border_list.sort(key=lambda x: x[1])
         return border_list
 
-    def predict(self, img_original):
+    def _crops_to_tensor(self, crops):
         """
-        执行多数字识别
+        将字符图片批量归一化为 (N, 1, 28, 28) 的 float32 Tensor
+        与 self.transform 等价：灰度 -> 缩放到 28x28 -> 除以 255，
+        但直接在预分配的 numpy 缓冲区上完成，最后零拷贝转换为 Tensor
+        """
+        resized = np.empty((len(crops), 28, 28), dtype=np.uint8)
+        for i, img in enumerate(crops):
+            if img.ndim == 3:
+                img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            # 字符块均大于 28x28，INTER_AREA 与 PIL 的抗锯齿缩小最接近
+            resized[i] = cv2.resize(img, (28, 28), interpolation=cv2.INTER_AREA)
+
+        batch = np.empty((len(crops), 1, 28, 28), dtype=np.float32)
+        np.divide(resized, np.float32(255.0), out=batch[:, 0])
+        return torch.from_numpy(batch)
+
+    def _classify_crops(self, crops, state=None):
+        """
+        批量识别分割后的字符
         Args:
-            img_original: OpenCV格式的原始图片 (BGR)
+            crops: 单通道字符图片列表
+            state: 使用的模型状态（见 resolve_model），默认取调用时刻的 self.state；
+                   模型、设备与批量大小都来自这一份快照，热切换期间不会混用新旧配置
         Returns:
-            dict: 包含识别结果字符串和置信度
+            list: 与 crops 一一对应的 (digit, confidence)
         """
-        if self.model is None:
-            raise Exception("Model not initialized")
+        if state is None:
+            state = self.state
+        model, device, max_batch_size = state.model, state.device, state.max_batch_size
+        predictions = []
+        for start in range(0, len(crops), max_batch_size):
+            chunk = crops[start:start + max_batch_size]
+            # 转换为 Tensor 并堆叠为 (N, 1, 28, 28)
+            with track_stage("transform"):
+                if self.preprocess_backend == "torchvision":
+                    batch = torch.stack([self.transform(img) for img in chunk])
+                else:
+                    batch = self._crops_to_tensor(chunk)
+                batch = batch.to(device)
+
+            with track_stage("inference"), torch.no_grad():
+                outputs = model(batch)
+                probs = torch.softmax(outputs, dim=1)
+                conf, predicted = torch.max(probs, 1)
+                # 每个分块只同步一次（tolist 计入推理耗时，GPU 上才能测到真实时间）
+                indices, confidences = predicted.tolist(), conf.tolist()
+
+            for index, confidence in zip(indices, confidences):
+                predictions.append((self.index_to_class[index], confidence))
+        return predictions
+
+    def _segment(self, img_original):
+        """预处理并分割字符，未检测到轮廓时退化为整图识别"""
+        IMAGE_PIXELS.observe(img_original.shape[0] * img_original.shape[1])
 
         # 1. 预处理
-        img_process = self._pre_processing(img_original)
+        with track_stage("preprocess"):
+            img_process = self._pre_processing(img_original)
         
         # 2. 获取轮廓和分割后的图片
-        border_list = self._get_contours(img_process)
-        
-        results = []
-        confidences = []
-        
-        # 用于显示的图片副本
-        img_display = img_original.copy()
+        with track_stage("contours"):
+            border_list = self._get_contours(img_process)
         
         # 如果没有检测到轮廓，尝试直接识别整张图（fallback）
         if not border_list:
@@ -186,51 +551,109 @@ class Predictor:
             except Exception:
                 pass
 
-        for img_res, x, y, s in border_list:
-            # 3. 转换为 Tensor
-            try:
-                img_tensor = self.transform(img_res)
-                img_tensor = torch.unsqueeze(img_tensor, dim=0).to(self.device)
-                
-                # 4. 预测
-                with torch.no_grad():
-                    outputs = self.model(img_tensor)
-                    probs = torch.softmax(outputs, dim=1)
-                    conf, predicted = torch.max(probs, 1)
-                    
-                    digit = self.index_to_class[predicted.item()]
-                    confidence = conf.item()
-                    
-                    results.append(digit)
-                    confidences.append(confidence)
-                    
-                    # 在原图上绘制矩形框和识别结果
-                    if s > 0: # 确保有有效的坐标
-                        cv2.rectangle(img_display, (x, y), (x + s, y + s), (0, 255, 0), 2)
-                        cv2.putText(img_display, f"{digit}", (x, y - 10), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-            except Exception as e:
-                print(f"Error predicting digit: {e}")
-                continue
-        
-        # 显示结果图片
-        try:
-            cv2.imshow("Prediction Result", img_display)
-            cv2.waitKey(0)
-            cv2.destroyAllWindows()
-        except Exception as e:
-            print(f"无法显示图片 (可能在无头环境中运行): {e}")
-        
+        return border_list
+
+    def _draw_boxes(self, img_original, boxes):
+        """在原图副本上绘制矩形框和识别结果"""
+        img_display = img_original.copy()
+        for box in boxes:
+            x, y, s = box["x"], box["y"], box["size"]
+            cv2.rectangle(img_display, (x, y), (x + s, y + s), (0, 255, 0), 2)
+            cv2.putText(img_display, f"{box['digit']}", (x, y - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+        return img_display
+
+    def _build_result(self, img_original, border_list, predictions, render=None, image_format=None):
+        """
+        汇总识别结果，并按渲染模式附加标注信息
+        Args:
+            render: none（默认，不复制不绘制）/ return（返回框坐标，可附带编码图片）/ window（本地调试弹窗）
+            image_format: render=return 时标注图片的编码格式 png / jpeg，为空则只返回框坐标
+        """
+        render = render or self.render_mode
+        if render not in RENDER_MODES:
+            raise ValueError(f"Unsupported render mode: {render}")
+
+        results = [digit for digit, _ in predictions]
+        confidences = [confidence for _, confidence in predictions]
+
         final_string = "".join(results)
         # 计算平均置信度
         avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
         
-        return {
+        result = {
             "digit": final_string,
             "confidence": avg_confidence,
             "probabilities": confidences  # 返回每个字符的置信度列表
         }
 
+        if render == "none":
+            return result
+
+        boxes = [
+            {"x": x, "y": y, "size": s, "digit": digit, "confidence": confidence}
+            for (_, x, y, s), (digit, confidence) in zip(border_list, predictions)
+            if s > 0  # 确保有有效的坐标
+        ]
+
+        if render == "return":
+            result["boxes"] = boxes
+            if image_format:
+                ext = IMAGE_FORMATS.get(image_format.lower())
+                if ext is None:
+                    raise ValueError(f"Unsupported image format: {image_format}")
+                ok, encoded = cv2.imencode(ext, self._draw_boxes(img_original, boxes))
+                if not ok:
+                    raise Exception("Failed to encode result image")
+                result["image"] = encoded.tobytes()
+        else:
+            # 显示结果图片
+            try:
+                cv2.imshow("Prediction Result", self._draw_boxes(img_original, boxes))
+                cv2.waitKey(0)
+                cv2.destroyAllWindows()
+            except Exception as e:
+                print(f"无法显示图片 (可能在无头环境中运行): {e}")
+
+        return result
+
+    def predict(self, img_original, render=None, image_format=None, model=None, shadow_model=None):
+        """
+        执行多数字识别
+        Args:
+            img_original: OpenCV格式的原始图片 (BGR)
+            render: 结果渲染模式 none / return / window，为空时使用配置中的 render_mode
+            image_format: render=return 时返回标注图片的编码格式 png / jpeg
+            model: 指定使用的模型状态（resolve_model 的返回值），默认使用调用时刻的主模型状态
+            shadow_model: 影子模型状态，对相同字符再识别一次，结果放在 shadow 字段中用于对比
+        Returns:
+            dict: 包含识别结果字符串和置信度；render=return 时附带 boxes（及 image 字节）
+        """
+        if model is None:
+            model = self.state
+        if model.model is None:
+            raise Exception("Model not initialized")
+
+        border_list = self._segment(img_original)
+        crops = [item[0] for item in border_list]
+        DIGITS_PER_IMAGE.observe(len(crops))
+
+        # 3. 所有字符一次性组成批量进行识别
+        predictions = self._classify_crops(crops, model)
+
+        result = self._build_result(img_original, border_list, predictions, render, image_format)
+
+        if shadow_model is not None:
+            shadow_predictions = self._classify_crops(crops, shadow_model)
+            shadow_confidences = [confidence for _, confidence in shadow_predictions]
+            result["shadow"] = {
+                "digit": "".join(digit for digit, _ in shadow_predictions),
+                "confidence": sum(shadow_confidences) / len(shadow_confidences) if shadow_confidences else 0.0,
+                "probabilities": shadow_confidences
+            }
+
+        return result
+
 if __name__ == '__main__':
     import sys
     import os
@@ -263,7 +686,7 @@ if __name__ == '__main__':
             else:
                 # 3. 预测
                 print("开始预测...")
-                result = predictor.predict(test_img)
+                result = predictor.predict(test_img, render="window")
                 print("-" * 30)
                 print(f"预测结果: {result}")
                 print("-" * 30)
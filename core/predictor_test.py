@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+
+from config.config_manager import ConfigManager
+from core.model_factory import ModelFactory
+from core.predictor import Predictor
+
+
+def _make_digit_image(text="3805"):
+    """白底黑字的多数字测试图片"""
+    img = np.full((120, 60 + 90 * len(text), 3), 255, dtype=np.uint8)
+    cv2.putText(img, text, (20, 90), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 8)
+    return img
+
+
+def _make_crops(predictor):
+    crops = []
+    for text in ("3805", "1279", "46"):
+        crops.extend(item[0] for item in predictor._segment(_make_digit_image(text)))
+    return crops
+
+
+def test_opencv_preprocess_matches_torchvision_transform():
+    predictor = Predictor(ConfigManager())
+    crops = _make_crops(predictor)
+    assert len(crops) >= 8
+
+    native = predictor._crops_to_tensor(crops)
+    reference = torch.stack([predictor.transform(img) for img in crops])
+
+    assert native.shape == reference.shape == (len(crops), 1, 28, 28)
+    assert native.dtype == reference.dtype == torch.float32
+
+    # INTER_AREA 与 PIL 双线性抗锯齿只在笔画边缘相差个别灰度级
+    diff = (native - reference).abs()
+    assert diff.mean().item() < 0.015
+    assert diff.max().item() < 0.2
+
+
+def test_opencv_preprocess_gives_same_predictions():
+    predictor = Predictor(ConfigManager())
+    crops = _make_crops(predictor)
+
+    torch.manual_seed(0)
+    model = ModelFactory(ConfigManager()).create_model("cnn_model").eval()
+    with torch.no_grad():
+        native = model(predictor._crops_to_tensor(crops)).argmax(1)
+        reference = model(torch.stack([predictor.transform(img) for img in crops])).argmax(1)
+
+    assert native.tolist() == reference.tolist()
+
+
+def test_reload_requested_during_reload_runs_again():
+    predictor = Predictor(ConfigManager())
+    release = threading.Event()
+    calls = []
+
+    def fake_worker():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            assert release.wait(5)
+
+    predictor._reload_worker = fake_worker
+    assert predictor.reload_model()
+    # 第一次切换进行中，后续请求合并为一次待处理的切换
+    assert not predictor.reload_model()
+    assert not predictor.reload_model()
+    release.set()
+    predictor._reload_thread.join(5)
+
+    assert calls == [0, 1]
+    assert not predictor._reloading
+    assert predictor.reload_model(wait=True)
+    assert calls == [0, 1, 2]
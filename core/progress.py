@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable, Optional
+
+
+class ProgressPublisher:
+    """
+    训练进度的后台发布线程：
+    1. 训练循环只把事件放入有界缓冲区后立即返回，回调（如 socket 推送）在发布线程中执行
+    2. 可丢弃事件（step 进度）在缓冲区满时丢弃最旧的一条，只保留最新进度
+    3. 不可丢弃事件（每个 epoch 的日志）不受容量限制，保证按顺序送达
+    回调慢于训练时，step 进度被合并，训练速度不受影响
+    """
+
+    def __init__(self, callback: Callable[[str, Dict[str, Any]], None], max_pending: int = 16):
+        """
+        Args:
+            callback: callback(event_type, data)，在发布线程中调用
+            max_pending: 缓冲区中可丢弃事件的最大数量
+        """
+        self.callback = callback
+        self.max_pending = max(1, max_pending)
+        self.published = 0
+        self.dropped = 0
+        self._pending = deque()
+        self._droppable = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="progress-publisher", daemon=True)
+        self._thread.start()
+
+    def publish(self, event_type: str, data: Dict[str, Any], droppable: bool = True):
+        with self._cond:
+            if self._closed:
+                return
+            if droppable:
+                if self._droppable >= self.max_pending:
+                    # 丢弃最旧的可丢弃事件
+                    for i, (_, _, is_droppable) in enumerate(self._pending):
+                        if is_droppable:
+                            del self._pending[i]
+                            break
+                    self._droppable -= 1
+                    self.dropped += 1
+                self._droppable += 1
+            self._pending.append((event_type, data, droppable))
+            self._cond.notify()
+
+    def close(self, timeout: Optional[float] = 30.0):
+        """发送完缓冲区中剩余的事件后结束发布线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"published": self.published, "dropped": self.dropped, "pending": len(self._pending)}
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                event_type, data, droppable = self._pending.popleft()
+                if droppable:
+                    self._droppable -= 1
+            try:
+                self.callback(event_type, data)
+                self.published += 1
+            except Exception as e:
+                print(f"[WARN] 训练进度回调失败: {e}")
+
+
+class StepMeter:
+    """
+    统计一个上报区间内的训练速度与耗时分布：
+    - data_time：等待 DataLoader 返回 batch 的时间
+    - compute_time：区间墙钟时间减去 data_time（GPU 异步执行的耗时在上报时的同步中计入）
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._start = time.perf_counter()
+        self._mark = self._start
+        self.batches = 0
+        self.samples = 0
+        self.data_time = 0.0
+
+    def data_ready(self):
+        """取到 batch 时调用"""
+        now = time.perf_counter()
+        self.data_time += now - self._mark
+        self._mark = now
+
+    def step_done(self, batch_size: int):
+        """一个 batch 训练完成时调用"""
+        self.batches += 1
+        self.samples += batch_size
+        self._mark = time.perf_counter()
+
+    def snapshot(self) -> Dict[str, float]:
+        elapsed = max(time.perf_counter() - self._start, 1e-9)
+        return {
+            "batches_per_sec": round(self.batches / elapsed, 2),
+            "samples_per_sec": round(self.samples / elapsed, 1),
+            "data_time": round(self.data_time, 4),
+            "compute_time": round(max(elapsed - self.data_time, 0.0), 4),
+            "data_wait_ratio": round(self.data_time / elapsed, 4),
+        }
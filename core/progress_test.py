@@ -0,0 +1,80 @@
+import threading
+import time
+
+from core.progress import ProgressPublisher, StepMeter
+
+
+def test_events_are_delivered_in_order():
+    received = []
+    publisher = ProgressPublisher(lambda event_type, data: received.append((event_type, data["i"])))
+    for i in range(5):
+        publisher.publish("step", {"i": i})
+    publisher.publish("epoch", {"i": 5}, droppable=False)
+    publisher.close()
+
+    assert received == [("step", 0), ("step", 1), ("step", 2), ("step", 3), ("step", 4), ("epoch", 5)]
+    assert publisher.get_stats() == {"published": 6, "dropped": 0, "pending": 0}
+
+
+def test_slow_callback_drops_oldest_steps_but_keeps_epochs():
+    release = threading.Event()
+    received = []
+
+    def callback(event_type, data):
+        release.wait()
+        received.append((event_type, data["i"]))
+
+    publisher = ProgressPublisher(callback, max_pending=2)
+    start = time.monotonic()
+    for i in range(100):
+        publisher.publish("step", {"i": i})
+        if i % 25 == 24:
+            publisher.publish("epoch", {"i": i}, droppable=False)
+    # 发布不会被慢回调阻塞
+    assert time.monotonic() - start < 1.0
+
+    release.set()
+    publisher.close()
+
+    assert [i for event_type, i in received if event_type == "epoch"] == [24, 49, 74, 99]
+    steps = [i for event_type, i in received if event_type == "step"]
+    assert steps[-2:] == [98, 99]
+    assert len(steps) <= 3  # 回调阻塞时正在处理的一条 + 缓冲区中的最新两条
+    assert publisher.dropped == 100 - len(steps)
+
+
+def test_callback_errors_do_not_stop_publisher():
+    received = []
+
+    def callback(event_type, data):
+        if data["i"] == 0:
+            raise RuntimeError("boom")
+        received.append(data["i"])
+
+    publisher = ProgressPublisher(callback)
+    publisher.publish("step", {"i": 0})
+    publisher.publish("step", {"i": 1})
+    publisher.close()
+    assert received == [1]
+
+
+def test_publish_after_close_is_ignored():
+    received = []
+    publisher = ProgressPublisher(lambda event_type, data: received.append(data))
+    publisher.close()
+    publisher.publish("epoch", {"i": 0}, droppable=False)
+    assert received == []
+
+
+def test_step_meter_splits_data_wait_and_compute():
+    meter = StepMeter()
+    time.sleep(0.05)  # 等待数据
+    meter.data_ready()
+    time.sleep(0.02)  # 计算
+    meter.step_done(32)
+
+    snapshot = meter.snapshot()
+    assert snapshot["data_time"] >= 0.04
+    assert snapshot["compute_time"] >= 0.015
+    assert snapshot["samples_per_sec"] > 0
+    assert 0.5 < snapshot["data_wait_ratio"] < 1.0
@@ -0,0 +1,177 @@
+import sys
+import os
+
+# 添加项目根目录到 sys.path，以便能够导入 core 模块
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Dict, Any, List
+
+import torch
+import torch.nn as nn
+from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+from config.config_manager import ConfigManager
+from core.model_factory import ModelFactory
+from core.inference_backends import artifact_path_for
+
+
+class ModelQuantizer:
+    """
+    input:ConfigManager
+    调用quantize:把训练好的 CNN/MLP 转为 int8 模型
+    1. 含卷积层的模型：卷积层使用 FX 静态量化，用数据集样本校准激活范围
+    2. 全连接层：动态量化（权重 int8，激活运行时量化）
+    3. 保存为 TorchScript (<权重名>_int8.pt) 与元数据/对比报告 (<权重名>_int8.json)
+    """
+
+    def __init__(self, config_manager: ConfigManager):
+        self.config_manager = config_manager
+        self.factory = ModelFactory(config_manager)
+        self.engine = torch.backends.quantized.engine
+
+    def load_eager_model(self, model_name: str, weights_path: str) -> nn.Module:
+        model = self.factory.create_model(model_name)
+        model.load_state_dict(torch.load(weights_path, map_location="cpu"))
+        model.eval()
+        return model
+
+    def sample_batches(self, dataset_name: str, num_batches: int, batch_size: int = 64) -> List:
+        """从配置的数据集验证集中按固定种子随机抽取 num_batches 个批次，用于校准与评估"""
+        loaders = self.factory.create_data_loaders(dataset_name, {"batch_size": batch_size})
+        val_loader = self.factory.create_subset_loader(
+            loaders["val"], min(num_batches * batch_size, len(loaders["val"].dataset)), batch_size)
+        return list(val_loader)
+
+    @staticmethod
+    def split_batches(batches: List, calibration_batches: int):
+        """
+        划分互不重叠的校准集与评估集，评估准确率不能用校准过的样本
+        验证集不足 calibration_batches + 1 个批次时缩减校准批次数，至少保留一个评估批次
+        """
+        if len(batches) < 2:
+            raise ValueError(f"Need at least 2 validation batches to split calibration and evaluation, "
+                             f"got {len(batches)}")
+        num_calibration = min(calibration_batches, len(batches) - 1)
+        if num_calibration < calibration_batches:
+            print(f"[WARN] 验证集只有 {len(batches)} 个批次，校准批次数从 {calibration_batches} 减少为 {num_calibration}")
+        return batches[:num_calibration], batches[num_calibration:]
+
+    @staticmethod
+    def has_conv(model: nn.Module) -> bool:
+        return any(isinstance(m, (nn.Conv1d, nn.Conv2d, nn.Conv3d)) for m in model.modules())
+
+    def quantize_model(self, model: nn.Module, calibration_batches: List) -> nn.Module:
+        if self.has_conv(model):
+            # 卷积层静态量化，全连接层留给后续的动态量化
+            qconfig_mapping = get_default_qconfig_mapping(self.engine).set_object_type(nn.Linear, None)
+            example_inputs = (calibration_batches[0][0][:1],)
+            prepared = prepare_fx(model, qconfig_mapping, example_inputs)
+            with torch.no_grad():
+                for images, _ in calibration_batches:
+                    prepared(images)
+            model = convert_fx(prepared)
+
+        return quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+    @staticmethod
+    def measure(model, batches: List, repeats: int = 20) -> Dict[str, Any]:
+        """测量准确率与单张 / 整批的推理延迟"""
+        correct, total = 0, 0
+        with torch.no_grad():
+            for images, labels in batches:
+                correct += model(images).argmax(dim=1).eq(labels).sum().item()
+                total += labels.size(0)
+
+            single = batches[0][0][:1]
+            full = batches[0][0]
+            latencies = {}
+            for name, batch in (("batch_1", single), (f"batch_{full.size(0)}", full)):
+                model(batch)  # 预热
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    model(batch)
+                latencies[name] = (time.perf_counter() - start) / repeats * 1000
+
+        return {
+            "accuracy": correct / total if total else 0.0,
+            "eval_samples": total,
+            "latency_ms": latencies,
+        }
+
+    def quantize(self, model_name: str, weights_path: str, dataset_name: str,
+                 calibration_batches: int = 10, eval_batches: int = 20) -> Dict[str, Any]:
+        """
+        量化并保存
+        Args:
+            model_name: 模型架构名称
+            weights_path: .pth 权重文件路径
+            dataset_name: 用于校准与评估的数据集名称
+        Returns:
+            dict: 元数据与 fp32 / int8 的延迟、准确率对比报告
+        """
+        torch.backends.quantized.engine = self.engine
+        fp32_model = self.load_eager_model(model_name, weights_path)
+        batches = self.sample_batches(dataset_name, calibration_batches + eval_batches)
+        calibration, evaluation = self.split_batches(batches, calibration_batches)
+
+        int8_model = self.quantize_model(self.load_eager_model(model_name, weights_path), calibration)
+
+        artifact_path = artifact_path_for(weights_path, "int8")
+        with torch.no_grad():
+            traced = torch.jit.trace(int8_model, evaluation[0][0][:1])
+        torch.jit.save(traced, artifact_path)
+
+        fp32_report = self.measure(fp32_model, evaluation)
+        int8_report = self.measure(torch.jit.load(artifact_path), evaluation)
+        fp32_report["size_bytes"] = os.path.getsize(weights_path)
+        int8_report["size_bytes"] = os.path.getsize(artifact_path)
+
+        metadata = {
+            "model_name": model_name,
+            "source_weights": weights_path,
+            "artifact": artifact_path,
+            "mode": "static_conv+dynamic_linear" if self.has_conv(fp32_model) else "dynamic_linear",
+            "engine": self.engine,
+            "dataset": dataset_name,
+            "calibration_samples": sum(images.size(0) for images, _ in calibration),
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "report": {
+                "fp32": fp32_report,
+                "int8": int8_report,
+                "accuracy_delta": int8_report["accuracy"] - fp32_report["accuracy"],
+            },
+        }
+
+        metadata_path = os.path.splitext(artifact_path)[0] + ".json"
+        with open(metadata_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=4, ensure_ascii=False)
+
+        print(f"✅ int8 模型已保存到: {artifact_path}")
+        print(f"📘 量化报告已保存到: {metadata_path}")
+        print(f"准确率: fp32 {fp32_report['accuracy']:.4f} -> int8 {int8_report['accuracy']:.4f}, "
+              f"延迟(ms): fp32 {fp32_report['latency_ms']} -> int8 {int8_report['latency_ms']}")
+        return metadata
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='训练后 int8 量化')
+    parser.add_argument('--model', help='模型架构名称，默认使用 prediction_config.json 中的配置')
+    parser.add_argument('--weights', help='.pth 权重路径（相对项目根目录），默认使用预测配置中的权重')
+    parser.add_argument('--dataset', default='mnist', help='用于校准与评估的数据集')
+    parser.add_argument('--calibration-batches', type=int, default=10)
+    parser.add_argument('--eval-batches', type=int, default=20)
+    args = parser.parse_args()
+
+    conf = ConfigManager()
+    model_name = args.model or conf.get_mobile_prediction_model()
+    weights = args.weights or conf.get_prediction_weights_path()
+    quantizer = ModelQuantizer(conf)
+    quantizer.quantize(model_name, os.path.join(project_root, weights), args.dataset,
+                       args.calibration_batches, args.eval_batches)
@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip("torch")
+
+from core.quantization import ModelQuantizer
+
+
+def test_calibration_and_evaluation_batches_do_not_overlap():
+    calibration, evaluation = ModelQuantizer.split_batches(list(range(30)), 10)
+    assert calibration == list(range(10))
+    assert evaluation == list(range(10, 30))
+
+
+def test_small_validation_set_keeps_one_evaluation_batch():
+    calibration, evaluation = ModelQuantizer.split_batches([0, 1, 2], 10)
+    assert calibration == [0, 1]
+    assert evaluation == [2]
+
+    with pytest.raises(ValueError):
+        ModelQuantizer.split_batches([0], 10)
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class PredictionCache:
+    """
+    按内容寻址的预测结果缓存：
+    1. 键 = 上传字节的 sha256 + 渲染参数，值为可 JSON 序列化的结果字典
+    2. 内存中为有容量（条数与字节数）和 TTL 限制的 LRU
+    3. 可选的磁盘共享目录，供多进程服务的各工作进程共用
+    4. 模型版本（架构名 + 权重路径 + 权重文件修改时间）变化时自动清空
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl: float = 300.0,
+                 shared_dir: Optional[str] = None, max_shared_entries: int = 10000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared_dir = shared_dir
+        self.max_shared_entries = max_shared_entries
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, size, result)
+        self._bytes = 0
+        self._model_version = None
+        self._shared_writes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    @staticmethod
+    def make_key(file_bytes: bytes, variant: str = "") -> str:
+        """根据上传内容与渲染参数生成缓存键"""
+        digest = hashlib.sha256(file_bytes)
+        digest.update(variant.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def model_version(model_name: str, weights_path: Optional[str]) -> str:
+        """模型版本标识：架构名 + 权重路径 + 权重文件修改时间"""
+        mtime = 0
+        if weights_path and os.path.exists(weights_path):
+            mtime = os.stat(weights_path).st_mtime_ns
+        raw = f"{model_name}|{weights_path}|{mtime}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    def set_model_version(self, version: str):
+        """模型版本变化时清空内存缓存和共享目录中旧版本的条目"""
+        with self._lock:
+            if version == self._model_version:
+                return
+            if self._model_version is not None:
+                self._stats["invalidations"] += 1
+            self._model_version = version
+            self._entries.clear()
+            self._bytes = 0
+
+        if self.shared_dir and os.path.isdir(self.shared_dir):
+            for name in os.listdir(self.shared_dir):
+                if name != version:
+                    shutil.rmtree(os.path.join(self.shared_dir, name), ignore_errors=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, size, result = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return result
+                del self._entries[key]
+                self._bytes -= size
+                self._stats["expirations"] += 1
+
+        result = self._read_shared(key, now)
+        with self._lock:
+            if result is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["shared_hits"] += 1
+        self._put_memory(key, result, len(json.dumps(result)), now)
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        now = time.time()
+        payload = json.dumps(result)
+        if len(payload) > self.max_bytes:
+            return
+        self._put_memory(key, result, len(payload), now)
+        self._write_shared(key, payload, now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.shared_dir:
+            shutil.rmtree(self.shared_dir, ignore_errors=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["model_version"] = self._model_version
+        lookups = stats["hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["shared_hits"]) / lookups if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["max_bytes"] = self.max_bytes
+        stats["ttl"] = self.ttl
+        stats["shared_dir"] = self.shared_dir
+        return stats
+
+    def _put_memory(self, key: str, result: Dict[str, Any], size: int, now: float):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (now + self.ttl, size, result)
+            self._bytes += size
+
+            # 超出条数或字节数上限时淘汰最久未使用的条目
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def _shared_path(self, key: str) -> Optional[str]:
+        if not self.shared_dir or self._model_version is None:
+            return None
+        return os.path.join(self.shared_dir, self._model_version, f"{key}.json")
+
+    def _read_shared(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        path = self._shared_path(key)
+        if path is None:
+            return None
+        try:
+            if os.stat(path).st_mtime + self.ttl <= now:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_shared(self, key: str, payload: str, now: float):
+        path = self._shared_path(key)
+        if path is None:
+            return
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # 先写临时文件再原子替换，其他进程不会读到半个文件
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+            self._shared_writes += 1
+            if self._shared_writes % 100 == 0:
+                self._prune_shared(directory)
+        except OSError as e:
+            print(f"[WARN] 写入共享缓存失败: {e}")
+
+    def _prune_shared(self, directory: str):
+        """共享目录超出条数上限时删除最旧的条目"""
+        entries = [entry for entry in os.scandir(directory) if entry.name.endswith(".json")]
+        overflow = len(entries) - self.max_shared_entries
+        if overflow <= 0:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:overflow]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        with self._lock:
+            self._stats["evictions"] += overflow
@@ -0,0 +1,66 @@
+import time
+
+from core.result_cache import PredictionCache
+
+
+def test_make_key_depends_on_content_and_variant():
+    assert PredictionCache.make_key(b"abc", "png") == PredictionCache.make_key(b"abc", "png")
+    assert PredictionCache.make_key(b"abc", "png") != PredictionCache.make_key(b"abc", "jpeg")
+    assert PredictionCache.make_key(b"abc") != PredictionCache.make_key(b"abd")
+
+
+def test_lru_eviction_by_entry_count():
+    cache = PredictionCache(max_entries=2)
+    cache.put("a", {"digit": "1"})
+    cache.put("b", {"digit": "2"})
+    assert cache.get("a") == {"digit": "1"}  # a 变为最近使用
+    cache.put("c", {"digit": "3"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"digit": "1"}
+    assert cache.get("c") == {"digit": "3"}
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = PredictionCache(ttl=0.05)
+    cache.put("a", {"digit": "1"})
+    assert cache.get("a") is not None
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.get_stats()["expirations"] == 1
+
+
+def test_results_larger_than_budget_are_not_cached():
+    cache = PredictionCache(max_bytes=10)
+    cache.put("a", {"digit": "1234567890"})
+    assert cache.get("a") is None
+
+
+def test_model_version_change_invalidates(tmp_path):
+    weights = tmp_path / "model.pth"
+    weights.write_bytes(b"v1")
+    version = PredictionCache.model_version("cnn_model", str(weights))
+    assert version == PredictionCache.model_version("cnn_model", str(weights))
+    assert version != PredictionCache.model_version("mlp_model", str(weights))
+
+    cache = PredictionCache()
+    cache.set_model_version(version)
+    cache.put("a", {"digit": "1"})
+    cache.set_model_version(version)
+    assert cache.get("a") is not None
+
+    cache.set_model_version("other")
+    assert cache.get("a") is None
+    assert cache.get_stats()["invalidations"] == 1
+
+
+def test_shared_dir_is_visible_to_other_instances(tmp_path):
+    writer = PredictionCache(shared_dir=str(tmp_path))
+    reader = PredictionCache(shared_dir=str(tmp_path))
+    writer.set_model_version("v1")
+    reader.set_model_version("v1")
+
+    writer.put("a", {"digit": "7"})
+    assert reader.get("a") == {"digit": "7"}
+    assert reader.get_stats()["shared_hits"] == 1
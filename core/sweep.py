@@ -0,0 +1,328 @@
+"""
+超参数搜索
+
+搜索配置（JSON）示例：
+{
+    "strategy": "asha",                  // grid / random / asha
+    "metric": "val_acc",                 // val_acc（越大越好）或 val_loss（越小越好）
+    "num_trials": 20,                    // random / asha 的试验次数，grid 为全部组合
+    "max_workers": 4,                    // 同时运行的试验进程数
+    "threads_per_trial": 0,              // 每个试验的 torch 线程数，0 表示按 CPU 核数平分
+    "fixed": {"dataset_name": "mnist", "epochs": 9},
+    "space": {
+        "model_architecture": ["cnn_model", "mlp_model"],
+        "batch_size": [32, 64, 128],
+        "learning_rate": {"low": 0.0001, "high": 0.01, "log": true},
+        "optimizer": ["adam", "sgd"]
+    },
+    "pruning": {"enabled": true, "warmup_epochs": 2, "min_trials": 3},   // grid / random 的中位数剪枝
+    "asha": {"min_epochs": 1, "reduction_factor": 3}
+}
+
+用法：python core/sweep.py --spec storage/sweeps/mnist_sweep.json
+"""
+
+import sys
+import os
+
+# 添加项目根目录到 sys.path，以便能够导入 core 模块
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import statistics
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from config.config_manager import ConfigManager
+
+STRATEGIES = ("grid", "random", "asha")
+
+
+def expand_grid(space: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """网格搜索：每个参数取值列表的笛卡尔积（区间参数不支持网格展开）"""
+    for name, values in space.items():
+        if not isinstance(values, list):
+            raise ValueError(f"Grid search requires a list of values for '{name}'")
+    names = list(space)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(space[n] for n in names))]
+
+
+def sample_random(space: Dict[str, Any], num_trials: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """随机搜索：列表参数随机取值，{"low", "high", "log"} 参数在区间内（对数）均匀采样"""
+    trials = []
+    for _ in range(num_trials):
+        params = {}
+        for name, spec in space.items():
+            if isinstance(spec, list):
+                params[name] = rng.choice(spec)
+            elif isinstance(spec, dict) and "low" in spec and "high" in spec:
+                low, high = spec["low"], spec["high"]
+                if spec.get("log"):
+                    value = math.exp(rng.uniform(math.log(low), math.log(high)))
+                else:
+                    value = rng.uniform(low, high)
+                params[name] = int(round(value)) if spec.get("integer") else value
+            else:
+                params[name] = spec
+        trials.append(params)
+    return trials
+
+
+class TrialPruner:
+    """
+    跨进程共享的剪枝器，在各试验的 progress_callback 中调用 should_prune
+    - median：warmup_epochs 之后，指标差于同一 epoch 其他试验的中位数时剪枝（至少 min_trials 个试验已报告）
+    - asha：在第 min_epochs * reduction_factor^k 个 epoch（rung）记录指标，
+      不在该 rung 已报告试验的前 1/reduction_factor 时剪枝
+    状态保存在 multiprocessing.Manager 中，试验进程通过代理对象访问
+    """
+
+    def __init__(self, manager, mode: str, metric: str, warmup_epochs: int = 2, min_trials: int = 3,
+                 min_epochs: int = 1, reduction_factor: int = 3):
+        self.mode = mode
+        self.metric = metric
+        self.maximize = metric != "val_loss"
+        self.warmup_epochs = warmup_epochs
+        self.min_trials = min_trials
+        self.min_epochs = max(1, min_epochs)
+        self.reduction_factor = max(2, reduction_factor)
+        self.history = manager.dict()  # epoch -> [指标, ...]
+        self.lock = manager.Lock()
+
+    def _record(self, epoch: int, value: float) -> List[float]:
+        with self.lock:
+            values = list(self.history.get(epoch, [])) + [value]
+            self.history[epoch] = values
+            return values
+
+    def _is_rung(self, epoch: int) -> bool:
+        rung = self.min_epochs
+        while rung < epoch:
+            rung *= self.reduction_factor
+        return rung == epoch
+
+    def should_prune(self, log: Dict[str, Any]) -> bool:
+        value = log.get(self.metric)
+        if value is None:
+            # 本 epoch 未验证
+            return False
+        epoch = log["epoch"]
+        score = value if self.maximize else -value
+
+        if self.mode == "asha":
+            if not self._is_rung(epoch):
+                return False
+            scores = sorted(self._record(epoch, score), reverse=True)
+            keep = max(1, len(scores) // self.reduction_factor)
+            return score < scores[keep - 1]
+
+        scores = self._record(epoch, score)
+        if epoch <= self.warmup_epochs or len(scores) < self.min_trials:
+            return False
+        return score < statistics.median(scores[:-1])
+
+
+def run_trial(trial: Dict[str, Any], threads: int, pruner: Optional[TrialPruner]) -> Dict[str, Any]:
+    """在试验进程中执行一次训练，返回试验结果（不抛出异常）"""
+    import torch
+    from core.model_factory import ModelFactory
+    from core.trainer import Trainer
+
+    torch.set_num_threads(threads)
+    start = time.time()
+    result = {
+        "trial_id": trial["trial_id"],
+        "params": trial["params"],
+        "status": "failed",
+    }
+    pruned = {"value": False}
+
+    try:
+        components = ModelFactory(ConfigManager()).create_training_components(trial["training_config"])
+        trainer = None
+
+        def progress(log):
+            if pruner is not None and pruner.should_prune(log):
+                pruned["value"] = True
+                trainer.request_stop()
+
+        trainer = Trainer(components, progress_callback=progress)
+        outcome = trainer.train()
+        logs = trainer.logs
+
+        metric = pruner.metric if pruner is not None else trial["metric"]
+        values = [log[metric] for log in logs if log.get(metric) is not None]
+        best = (max(values) if metric != "val_loss" else min(values)) if values else None
+        result.update({
+            "status": "pruned" if pruned["value"] else outcome["stop_reason"],
+            "best_metric": best,
+            "final_val_acc": outcome["final_val_acc"],
+            "epochs_completed": outcome["epochs_completed"],
+            "model_path": os.path.abspath(outcome["model_path"]),
+        })
+    except Exception as e:
+        result["error"] = str(e)
+        result["traceback"] = traceback.format_exc()
+
+    result["duration"] = round(time.time() - start, 2)
+    return result
+
+
+class SweepRunner:
+    """
+    input:ConfigManager
+    调用run:按搜索配置生成训练配置（ConfigManager.create_training_config），
+    在进程池中并发训练，剪枝明显落后的试验，返回按指标排序的排行榜
+    """
+
+    def __init__(self, config_manager: ConfigManager, spec: Dict[str, Any]):
+        self.config_manager = config_manager
+        self.spec = spec
+        self.strategy = spec.get("strategy", "grid")
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Unsupported sweep strategy: {self.strategy}")
+        self.metric = spec.get("metric", "val_acc")
+        if self.metric not in ("val_acc", "val_loss"):
+            raise ValueError(f"Unsupported sweep metric: {self.metric}")
+        self.max_workers = max(1, int(spec.get("max_workers", 2)))
+        self.threads_per_trial = int(spec.get("threads_per_trial", 0)) or max(
+            1, (os.cpu_count() or 1) // self.max_workers)
+        self.sweep_id = spec.get("sweep_id") or f"sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.output_dir = os.path.join(project_root, "storage/sweeps", self.sweep_id)
+
+    def build_trials(self) -> List[Dict[str, Any]]:
+        """展开搜索空间，并通过 create_training_config 生成每个试验的训练配置"""
+        space = self.spec.get("space", {})
+        fixed = self.spec.get("fixed", {})
+        if self.strategy == "grid":
+            param_sets = expand_grid(space)
+        else:
+            rng = random.Random(self.spec.get("seed", 0))
+            param_sets = sample_random(space, int(self.spec.get("num_trials", 10)), rng)
+
+        trials = []
+        for index, params in enumerate(param_sets):
+            trial_id = f"{self.sweep_id}_t{index:03d}"
+            request = {
+                # 试验默认不写检查点，DataLoader 不额外开进程，线程预算全部留给训练
+                "checkpoint_interval": 0,
+                "num_workers": 0,
+                **fixed,
+                **params,
+                "save_model_name": trial_id,
+            }
+            training_config = self.config_manager.create_training_config(request)
+            training_config["training_id"] = trial_id
+            trials.append({
+                "trial_id": trial_id,
+                "params": params,
+                "metric": self.metric,
+                "training_config": training_config,
+            })
+        return trials
+
+    def _prepare_datasets(self, trials: List[Dict[str, Any]]):
+        """启动试验前生成各数据集的缓存，避免多个试验进程同时重建"""
+        from core.model_factory import ModelFactory
+
+        factory = ModelFactory(self.config_manager)
+        for dataset_name in sorted({t["training_config"]["dataset_name"] for t in trials}):
+            factory.create_data_loaders(dataset_name, {"batch_size": 64})
+
+    def leaderboard(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """有指标的试验按指标排序在前，失败的试验排在最后"""
+        maximize = self.metric != "val_loss"
+
+        def sort_key(result):
+            best = result.get("best_metric")
+            if best is None:
+                return (1, 0.0)
+            return (0, -best if maximize else best)
+
+        board = sorted(results, key=sort_key)
+        for rank, result in enumerate(board, start=1):
+            result["rank"] = rank
+        return board
+
+    def run(self) -> Dict[str, Any]:
+        trials = self.build_trials()
+        if not trials:
+            raise ValueError("Search space is empty")
+        self._prepare_datasets(trials)
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        print(f"[INFO] 超参数搜索 {self.sweep_id}: {self.strategy}, {len(trials)} 个试验, "
+              f"{self.max_workers} 个并发进程, 每个 {self.threads_per_trial} 线程")
+
+        # torch 不支持在已初始化线程池的进程中 fork，试验进程使用 spawn
+        context = multiprocessing.get_context("spawn")
+        manager = context.Manager()
+        pruner = None
+        pruning = self.spec.get("pruning", {})
+        if self.strategy == "asha":
+            asha = self.spec.get("asha", {})
+            pruner = TrialPruner(manager, "asha", self.metric,
+                                 min_epochs=asha.get("min_epochs", 1),
+                                 reduction_factor=asha.get("reduction_factor", 3))
+        elif pruning.get("enabled", False):
+            pruner = TrialPruner(manager, "median", self.metric,
+                                 warmup_epochs=pruning.get("warmup_epochs", 2),
+                                 min_trials=pruning.get("min_trials", 3))
+
+        start = time.time()
+        results = []
+        try:
+            with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as executor:
+                futures = {executor.submit(run_trial, trial, self.threads_per_trial, pruner): trial
+                           for trial in trials}
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    print(f"[INFO] 试验 {result['trial_id']} {result['status']}: "
+                          f"{self.metric}={result.get('best_metric')} ({len(results)}/{len(trials)})")
+        finally:
+            manager.shutdown()
+
+        board = self.leaderboard(results)
+        summary = {
+            "sweep_id": self.sweep_id,
+            "strategy": self.strategy,
+            "metric": self.metric,
+            "num_trials": len(trials),
+            "pruned": sum(1 for r in results if r["status"] == "pruned"),
+            "failed": sum(1 for r in results if r["status"] == "failed"),
+            "duration": round(time.time() - start, 2),
+            "spec": self.spec,
+            "leaderboard": board,
+        }
+
+        leaderboard_path = os.path.join(self.output_dir, "leaderboard.json")
+        with open(leaderboard_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
+        print(f"📘 排行榜已保存到: {leaderboard_path}")
+        for result in board[:10]:
+            print(f"  #{result['rank']:<3} {result['trial_id']:<32} {result['status']:<14} "
+                  f"{self.metric}={result.get('best_metric')}  {result.get('model_path', '')}")
+        return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='超参数搜索（grid / random / asha）')
+    parser.add_argument('--spec', required=True, help='搜索配置 JSON 文件')
+    args = parser.parse_args()
+
+    with open(args.spec, 'r', encoding='utf-8') as f:
+        sweep_spec = json.load(f)
+
+    SweepRunner(ConfigManager(), sweep_spec).run()
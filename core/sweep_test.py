@@ -0,0 +1,44 @@
+import threading
+from types import SimpleNamespace
+
+from core.sweep import TrialPruner
+
+# TrialPruner 只用到 Manager 的 dict() 与 Lock()，单进程测试用本地对象代替
+LOCAL_MANAGER = SimpleNamespace(dict=dict, Lock=threading.Lock)
+
+
+def _log(epoch, val_acc):
+    return {"epoch": epoch, "val_acc": val_acc, "val_loss": 1 - val_acc}
+
+
+def test_asha_prunes_outside_top_fraction_at_rungs():
+    pruner = TrialPruner(LOCAL_MANAGER, "asha", "val_acc", min_epochs=1, reduction_factor=3)
+    # rung 为第 1、3、9 个 epoch
+    assert [epoch for epoch in range(1, 10) if pruner._is_rung(epoch)] == [1, 3, 9]
+
+    assert not pruner.should_prune(_log(1, 0.9))
+    assert not pruner.should_prune(_log(1, 0.95))
+    assert pruner.should_prune(_log(1, 0.5))
+    # 不在 rung 上的 epoch 不剪枝
+    assert not pruner.should_prune(_log(2, 0.1))
+
+
+def test_asha_respects_loss_direction():
+    pruner = TrialPruner(LOCAL_MANAGER, "asha", "val_loss", min_epochs=1, reduction_factor=2)
+    assert not pruner.should_prune(_log(1, 0.9))  # val_loss 0.1
+    assert pruner.should_prune(_log(1, 0.2))  # val_loss 0.8
+
+
+def test_median_waits_for_warmup_and_min_trials():
+    pruner = TrialPruner(LOCAL_MANAGER, "median", "val_acc", warmup_epochs=1, min_trials=3)
+    assert not pruner.should_prune(_log(1, 0.1))  # warmup
+
+    assert not pruner.should_prune(_log(2, 0.9))
+    assert not pruner.should_prune(_log(2, 0.8))  # 只有 2 个试验
+    assert pruner.should_prune(_log(2, 0.5))
+    assert not pruner.should_prune(_log(2, 0.95))
+
+
+def test_skipped_validation_is_never_pruned():
+    pruner = TrialPruner(LOCAL_MANAGER, "median", "val_acc", warmup_epochs=0, min_trials=1)
+    assert not pruner.should_prune({"epoch": 1, "val_acc": None})
@@ -1,9 +1,17 @@
 # handwriting_recognition_system/core/trainer.py
 import json
 import os
+import threading
 import time
 import torch
-from typing import Dict, Any, Callable
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from core.checkpoint import (save_checkpoint, save_interrupted_checkpoint, load_checkpoint, latest_checkpoint,
+                             atomic_torch_save, get_rng_state, set_rng_state, snapshot_state)
+from core.early_stopping import EarlyStopping
+from core.progress import ProgressPublisher, StepMeter
+from core.training_log import TrainingLogWriter, training_log_path, truncate_training_log
 
 
 class Trainer:
@@ -13,103 +21,423 @@ class Trainer:
     2. 执行训练与验证循环
     3. 实时输出训练日志，并支持外部回调函数推送训练进度
     4. 保存训练完成的模型到 storage/trained_models/
+    5. 按 checkpoint_interval 定期保存检查点，可通过 train(resume_from=...) 断点续训
+    6. request_stop() 可在任意线程调用，训练在下一个 batch 边界结束并保存模型
+       （分布式训练时每 stop_check_interval 个 batch 同步一次，最多延迟这么多个 batch）
+    7. 按 hyperparameters 早停、调整学习率，并默认保存验证指标最优的 epoch 的权重
+    8. 已初始化 torch.distributed 时（见 core/distributed.py）以 DDP 数据并行训练：
+       梯度与指标在各进程间归约，只有 rank 0 打印、推送进度和保存文件
+    9. 每 progress_step_interval 个 batch 通过 step_callback 上报速度、滑动损失/准确率与 ETA；
+       回调在后台发布线程中执行，不阻塞训练循环
+    10. 训练过程中逐条追加写入 {model_name}_log.jsonl（见 core/training_log.py），结束时仍保存 _log.json；
+        续训时截掉检查点之后的记录，异常退出时也会关闭日志文件
     """
 
-    def __init__(self, components, progress_callback: Callable[[Dict[str, Any]], None] = None):
+    def __init__(self, components, progress_callback: Callable[[Dict[str, Any]], None] = None,
+                 step_callback: Callable[[Dict[str, Any]], None] = None):
         self.components = components
-        self.progress_callback = progress_callback  # 用于web_server实时推送训练状态
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.progress_callback = progress_callback  # 用于web_server实时推送训练状态（每个 epoch 一次）
+        self.step_callback = step_callback  # epoch 内的 step 进度，缓冲区满时可能被合并丢弃
+        self.distributed = dist.is_available() and dist.is_initialized()
+        self.rank = dist.get_rank() if self.distributed else 0
+        self.world_size = dist.get_world_size() if self.distributed else 1
+        self.is_main = self.rank == 0
+        if self.distributed and dist.get_backend() == "gloo":
+            # gloo 只支持 CPU 张量
+            self.device = torch.device("cpu")
+        else:
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.logs = []  # 用于记录所有epoch的日志
+        self._stop_event = threading.Event()
 
-    def train(self):
+    def request_stop(self):
+        """请求停止训练（线程安全），当前 batch 完成后结束训练并保存模型"""
+        self._stop_event.set()
+
+    @property
+    def stop_requested(self) -> bool:
+        return self._stop_event.is_set()
+
+    def _sync_stop(self) -> bool:
+        """分布式训练时任一进程收到停止请求，所有进程在同一个 batch 边界停止"""
+        if not self.distributed:
+            return self.stop_requested
+        flag = torch.tensor([1 if self.stop_requested else 0])
+        dist.all_reduce(flag, op=dist.ReduceOp.MAX)
+        if flag.item():
+            self._stop_event.set()
+        return self.stop_requested
+
+    def _reduce_sums(self, *values) -> List[float]:
+        """把各项累加值合并为一个张量，分布式时在各进程间求和，只同步一次"""
+        sums = torch.stack([torch.as_tensor(v, device=self.device).to(torch.float64) for v in values])
+        if self.distributed:
+            dist.all_reduce(sums, op=dist.ReduceOp.SUM)
+        return sums.tolist()
+
+    def _publish_progress(self, event_type: str, data: Dict[str, Any]):
+        """ProgressPublisher 的回调，在发布线程中执行"""
+        if event_type == "epoch" and self.progress_callback:
+            self.progress_callback(data)
+        elif event_type == "step" and self.step_callback:
+            self.step_callback(data)
+
+    def _info(self, message: str):
+        """只在主进程打印"""
+        if self.is_main:
+            print(message)
+
+    def _evaluate(self, model, val_loader, criterion) -> Tuple[float, float]:
+        """
+        在验证集上评估
+        损失与正确数在设备上累加，结束时只同步一次
+        """
+        model.eval()
+        val_loss = torch.zeros((), device=self.device)
+        val_correct = torch.zeros((), dtype=torch.long, device=self.device)
+        val_total = 0
+        with torch.no_grad():
+            for images, labels in val_loader:
+                images, labels = images.to(self.device), labels.to(self.device)
+                outputs = model(images)
+                loss = criterion(outputs, labels)
+                val_loss += loss * images.size(0)
+                _, predicted = outputs.max(1)
+                val_total += labels.size(0)
+                val_correct += predicted.eq(labels).sum()
+
+        val_loss, val_correct, val_total = self._reduce_sums(val_loss, val_correct, val_total)
+        val_total = max(val_total, 1)
+        return val_loss / val_total, val_correct / val_total
+
+    @staticmethod
+    def _should_validate(epoch: int, num_epochs: int, val_interval: int) -> bool:
+        """每 val_interval 个 epoch 验证一次，最后一个 epoch 总是验证"""
+        return (epoch + 1) % val_interval == 0 or epoch + 1 == num_epochs
+
+    def train(self, resume_from: Optional[str] = None):
+        """
+        执行训练
+        Args:
+            resume_from: 检查点路径，或 "latest" 表示该模型最近的检查点；为空则从头训练
+        """
         # === 初始化组件 ===
         model = self.components["model"].to(self.device)
         data_loaders = self.components["data_loaders"]
+        train_sampler = data_loaders.get("train_sampler")
         optimizer = self.components["optimizer"]
         criterion = self.components["criterion"]
+        scheduler = self.components.get("scheduler")
+        augmentation = self.components.get("augmentation")
         training_config = self.components["training_config"]
 
         train_loader = data_loaders["train"]
         val_loader = data_loaders["val"]
 
-        num_epochs = training_config["hyperparameters"].get("epochs", 10)
+        hyperparameters = training_config["hyperparameters"]
+        num_epochs = hyperparameters.get("epochs", 10)
+        # 验证频率（val_fraction 的固定随机子集由 ModelFactory.create_data_loaders 构建，各次验证使用同一子集）
+        val_interval = max(1, int(hyperparameters.get("val_interval", 1)))
+        # 检查点频率（epoch，0 表示不保存）与保留个数
+        checkpoint_interval = int(hyperparameters.get("checkpoint_interval", 1))
+        checkpoint_keep = int(hyperparameters.get("checkpoint_keep", 2))
+        # 早停（patience 为 0 时只记录最优权重，不提前结束）
+        early_stopping = EarlyStopping(
+            monitor=hyperparameters.get("monitor", "val_loss"),
+            patience=int(hyperparameters.get("early_stopping_patience", 0)),
+            min_delta=float(hyperparameters.get("early_stopping_min_delta", 0.0)),
+            restore_best_weights=hyperparameters.get("restore_best_weights", True)
+        )
+        # OneCycle 按 batch 调整，plateau 按验证指标调整，其余按 epoch 调整
+        step_per_batch = isinstance(scheduler, torch.optim.lr_scheduler.OneCycleLR)
+        plateau = isinstance(scheduler, torch.optim.lr_scheduler.ReduceLROnPlateau)
+        # 分布式训练时每隔多少个 batch 同步一次停止请求（每次同步是一次 all_reduce，跨机时有网络往返）
+        stop_check_interval = max(1, int(hyperparameters.get("stop_check_interval", 20))) if self.distributed else 1
+        # step 进度上报间隔（batch，0 表示只在 epoch 结束时上报）
+        step_interval = int(hyperparameters.get("progress_step_interval", 0))
+        steps_per_epoch = len(train_loader)
         model_name = training_config["save_model_name"]
         # 确保存储目录存在
         save_dir = os.path.join(os.path.dirname(__file__), '../storage/trained_models')
         os.makedirs(save_dir, exist_ok=True)
 
-        print(f"开始训练模型: {model_name}")
-        print(f"保存路径: {os.path.abspath(save_dir)}")
+        train_loss, train_acc = None, None
+        val_loss, val_acc = None, None
+        start_epoch = 0
+        stop_reason = "completed"
 
-        # === 训练循环 ===
-        for epoch in range(num_epochs):
-            model.train()
-            running_loss, correct, total = 0.0, 0, 0
+        # === 断点续训 ===
+        # 只有 rank 0 读取检查点（其他机器上不一定有该路径），分布式时广播给其余进程
+        checkpoint = None
+        if resume_from and self.is_main:
+            if resume_from == "latest":
+                resume_from = latest_checkpoint(save_dir, model_name)
+                if resume_from is None:
+                    print(f"[WARN] 未找到 {model_name} 的检查点，从头开始训练")
+            if resume_from:
+                checkpoint = load_checkpoint(resume_from)
+                print(f"[INFO] 从检查点恢复训练: {os.path.abspath(resume_from)}")
+        if resume_from and self.distributed:
+            holder = [checkpoint]
+            dist.broadcast_object_list(holder, src=0)
+            checkpoint = holder[0]
+        if checkpoint is not None:
+            model.load_state_dict(checkpoint["model_state"])
+            optimizer.load_state_dict(checkpoint["optimizer_state"])
+            set_rng_state(checkpoint["rng_state"])
+            if scheduler is not None and checkpoint.get("scheduler_state") is not None:
+                scheduler.load_state_dict(checkpoint["scheduler_state"])
+            if checkpoint.get("early_stopping") is not None:
+                early_stopping.load_state_dict(checkpoint["early_stopping"])
+            self.logs = checkpoint["logs"]
+            start_epoch = checkpoint["epoch"]
+            self._info(f"[INFO] 已完成 {start_epoch} 个 epoch，从第 {start_epoch + 1} 个 epoch 继续")
 
-            for images, labels in train_loader:
-                images, labels = images.to(self.device), labels.to(self.device)
+        # 保存与早停都使用未包装的模型，state_dict 的键与单进程训练一致
+        raw_model = model
+        if self.distributed:
+            # 构造时从 rank 0 广播参数，反向传播时自动 all-reduce 梯度
+            model = DistributedDataParallel(raw_model)
+            self._info(f"[INFO] 分布式训练: {self.world_size} 个进程, backend={dist.get_backend()}")
 
-                optimizer.zero_grad()
-                outputs = model(images)
-                loss = criterion(outputs, labels)
-                loss.backward()
-                optimizer.step()
+        self._info(f"开始训练模型: {model_name}")
+        self._info(f"保存路径: {os.path.abspath(save_dir)}")
 
-                running_loss += loss.item() * images.size(0)
-                _, predicted = outputs.max(1)
-                total += labels.size(0)
-                correct += predicted.eq(labels).sum().item()
-
-            train_loss = running_loss / total
-            train_acc = correct / total
-
-            # === 验证 ===
-            model.eval()
-            val_loss, val_correct, val_total = 0.0, 0, 0
-            with torch.no_grad():
-                for images, labels in val_loader:
-                    images, labels = images.to(self.device), labels.to(self.device)
+        # 进度发布线程与日志文件在异常或停止时也要关闭
+        publisher = None
+        log_writer = None
+        try:
+            # 进度回调在后台线程中执行，慢回调不会拖慢训练
+            if self.is_main and (self.progress_callback or self.step_callback):
+                publisher = ProgressPublisher(self._publish_progress)
+            publish_steps = publisher is not None and self.step_callback is not None
+            report_steps = self.is_main and step_interval > 0
+            meter = StepMeter()
+
+            # 逐条写入的训练日志，中途停止或崩溃时也能保留已完成的部分；
+            # 续训时先丢弃检查点之后的记录（中断的 epoch 会重跑）再追加
+            if self.is_main:
+                jsonl_path = training_log_path(save_dir, model_name)
+                if (checkpoint is not None and os.path.exists(jsonl_path)
+                        and not truncate_training_log(jsonl_path, start_epoch)):
+                    print(f"[WARN] 训练日志中没有第 {start_epoch} 个 epoch 的记录，续训日志直接追加")
+                log_writer = TrainingLogWriter(jsonl_path, append=checkpoint is not None)
+                log_writer.write("start", {
+                    "model_name": model_name,
+                    "start_epoch": start_epoch,
+                    "num_epochs": num_epochs,
+                    "steps_per_epoch": steps_per_epoch,
+                    "world_size": self.world_size,
+                    "hyperparameters": hyperparameters
+                })
+
+            def make_checkpoint(completed_epochs: int, interrupted: bool = False):
+                return {
+                    "epoch": completed_epochs,
+                    "model_state": raw_model.state_dict(),
+                    "optimizer_state": optimizer.state_dict(),
+                    "scheduler_state": scheduler.state_dict() if scheduler is not None else None,
+                    "early_stopping": early_stopping.state_dict(),
+                    "rng_state": get_rng_state(),
+                    "logs": self.logs,
+                    "training_config": training_config,
+                    "interrupted": interrupted,
+                }
+
+            # === 训练循环 ===
+            for epoch in range(start_epoch, num_epochs):
+                if self._sync_stop():
+                    stop_reason = "user_stop"
+                    break
+                if train_sampler is not None:
+                    # 各进程以相同的种子重新划分分片
+                    train_sampler.set_epoch(epoch)
+                # 本 epoch 开始前的状态（含随机数状态，恢复后按相同顺序重跑），中途停止时保存这份快照
+                epoch_start_state = snapshot_state(make_checkpoint(epoch, interrupted=True)) if self.is_main else None
+                model.train()
+                # 指标在设备上累加，避免每个 batch 调用 .item() 引起同步
+                running_loss = torch.zeros((), device=self.device)
+                correct = torch.zeros((), dtype=torch.long, device=self.device)
+                total = 0
+                meter.reset()
+
+                stopped_mid_epoch = False
+                for step, (images, labels) in enumerate(train_loader, 1):
+                    meter.data_ready()
+                    # 在 batch 边界响应停止请求；各进程 batch 数相同，在同一批次上同步
+                    if (step - 1) % stop_check_interval == 0 and self._sync_stop():
+                        stopped_mid_epoch = True
+                        break
+                    # 锁页内存时异步拷贝到 GPU
+                    images = images.to(self.device, non_blocking=True)
+                    labels = labels.to(self.device, non_blocking=True)
+                    if augmentation is not None:
+                        images = augmentation(images)
+
+                    optimizer.zero_grad()
                     outputs = model(images)
                     loss = criterion(outputs, labels)
-                    val_loss += loss.item() * images.size(0)
+                    loss.backward()
+                    optimizer.step()
+                    if step_per_batch:
+                        scheduler.step()
+
+                    running_loss += loss.detach() * images.size(0)
                     _, predicted = outputs.max(1)
-                    val_total += labels.size(0)
-                    val_correct += predicted.eq(labels).sum().item()
-
-            val_loss /= val_total
-            val_acc = val_correct / val_total
-
-            log = {
-                "epoch": epoch + 1,
-                "train_loss": round(train_loss, 4),
-                "train_acc": round(train_acc, 4),
-                "val_loss": round(val_loss, 4),
-                "val_acc": round(val_acc, 4)
+                    total += labels.size(0)
+                    correct += predicted.eq(labels).sum()
+                    meter.step_done(labels.size(0))
+
+                    if report_steps and step % step_interval == 0:
+                        # 每个上报区间只同步一次（先同步再计时，GPU 上的计算耗时计入 compute_time）；
+                        # 滑动指标为本进程本 epoch 至今的数据
+                        running = (round(running_loss.item() / total, 4), round(correct.item() / total, 4))
+                        speed = meter.snapshot()
+                        remaining = (steps_per_epoch - step) + (num_epochs - epoch - 1) * steps_per_epoch
+                        step_event = {
+                            "epoch": epoch + 1,
+                            "step": step,
+                            "steps_per_epoch": steps_per_epoch,
+                            "global_step": epoch * steps_per_epoch + step,
+                            "running_loss": running[0],
+                            "running_acc": running[1],
+                            "lr": optimizer.param_groups[0]["lr"],
+                            **speed,
+                            # 分布式时按各进程速度相同估算全局吞吐
+                            "samples_per_sec": round(speed["samples_per_sec"] * self.world_size, 1),
+                            "eta_seconds": round(remaining / speed["batches_per_sec"], 1)
+                            if speed["batches_per_sec"] > 0 else None,
+                        }
+                        log_writer.write("step", step_event)
+                        if publish_steps:
+                            publisher.publish("step", step_event)
+                        meter.reset()
+
+                if stopped_mid_epoch:
+                    # 中途停止的 epoch 指标不完整，不写入日志；检查点是该 epoch 开始前的状态，恢复时从头重跑该 epoch
+                    # （已训练的 batch 不计入权重与学习率调度，OneCycle 的 step 数不会越过 total_steps）
+                    if self.is_main:
+                        # 单独保存，不覆盖上一个完整 epoch 的检查点（resume_from="latest" 仍从完整 epoch 恢复）
+                        path = save_interrupted_checkpoint(save_dir, model_name, epoch_start_state)
+                        print(f"💾 中断检查点已保存到: {os.path.abspath(path)}")
+                    self._info(f"[INFO] 收到停止请求，训练在第 {epoch+1} 个 epoch 中途结束")
+                    stop_reason = "user_stop"
+                    break
+
+                # epoch 结束时才同步读取（分布式时汇总所有进程）
+                running_loss, correct, total = self._reduce_sums(running_loss, correct, total)
+                train_loss = running_loss / total
+                train_acc = correct / total
+
+                # === 验证（未到验证间隔的 epoch 记为 None） ===
+                validated = self._should_validate(epoch, num_epochs, val_interval)
+                if validated:
+                    val_loss, val_acc = self._evaluate(model, val_loader, criterion)
+                    monitored = val_loss if early_stopping.monitor == "val_loss" else val_acc
+                    early_stopping.step(monitored, epoch + 1, raw_model)
+
+                # 记录本 epoch 使用的学习率，再按 epoch 调整
+                lr = optimizer.param_groups[0]["lr"]
+                if plateau:
+                    if validated:
+                        scheduler.step(monitored)
+                elif scheduler is not None and not step_per_batch:
+                    scheduler.step()
+
+                log = {
+                    "epoch": epoch + 1,
+                    "train_loss": round(train_loss, 4),
+                    "train_acc": round(train_acc, 4),
+                    "val_loss": round(val_loss, 4) if validated else None,
+                    "val_acc": round(val_acc, 4) if validated else None,
+                    "lr": lr
+                }
+                # === 保存日志到内存并追加写入文件 ===
+                self.logs.append(log)
+                if log_writer is not None:
+                    log_writer.write("epoch", log)
+                # === 实时打印与推送 ===
+                val_text = f"Val Loss: {val_loss:.4f}, Val Acc: {val_acc:.4f}" if validated else "Val: skipped"
+                self._info(f"[Epoch {epoch+1}/{num_epochs}] "
+                           f"Train Loss: {train_loss:.4f}, Train Acc: {train_acc:.4f}, {val_text}")
+
+                if publisher is not None:
+                    # epoch 日志不会被丢弃
+                    publisher.publish("epoch", log, droppable=False)
+
+                # === 定期保存检查点 ===
+                if (self.is_main and checkpoint_interval > 0
+                        and ((epoch + 1) % checkpoint_interval == 0 or epoch + 1 == num_epochs)):
+                    path = save_checkpoint(save_dir, model_name, make_checkpoint(epoch + 1), checkpoint_keep)
+                    print(f"💾 检查点已保存到: {os.path.abspath(path)}")
+
+                # === 早停（指标已在各进程间归约，所有进程的判断一致） ===
+                if early_stopping.should_stop:
+                    stop_reason = "early_stopping"
+                    self._info(f"[INFO] {early_stopping.monitor} 连续 {early_stopping.bad_count} 次验证未改善，"
+                               f"提前结束训练（节省 {num_epochs - epoch - 1} 个 epoch）")
+                    if self.is_main and checkpoint_interval > 0 and (epoch + 1) % checkpoint_interval != 0:
+                        save_checkpoint(save_dir, model_name, make_checkpoint(epoch + 1), checkpoint_keep)
+                    break
+
+            if publisher is not None:
+                # 送达剩余的进度事件后再返回结果
+                publisher.close()
+
+            epochs_completed = len(self.logs)
+            summary = {
+                "stop_reason": stop_reason,
+                "epochs_completed": epochs_completed,
+                "epochs_saved": num_epochs - epochs_completed if stop_reason == "early_stopping" else 0,
+                "monitor": early_stopping.monitor,
+                "best_epoch": early_stopping.best_epoch,
+                f"best_{early_stopping.monitor}": early_stopping.best,
+                "restored_best_weights": False
             }
-            # === 保存日志到内存 ===
-            self.logs.append(log)
-            # === 实时打印与推送 ===
-            print(f"[Epoch {epoch+1}/{num_epochs}] "
-                  f"Train Loss: {train_loss:.4f}, Train Acc: {train_acc:.4f}, "
-                  f"Val Loss: {val_loss:.4f}, Val Acc: {val_acc:.4f}, ")
 
-            if self.progress_callback:
-                self.progress_callback(log)
+            # === 保存模型（默认为最优 epoch 的权重） ===
+            if early_stopping.restore(raw_model):
+                summary["restored_best_weights"] = True
+                self._info(f"[INFO] 使用第 {early_stopping.best_epoch} 个 epoch 的最优权重 "
+                           f"({early_stopping.monitor}={early_stopping.best:.4f})")
+            save_path = os.path.join(save_dir, f"{model_name}.pth")
+
+            # 只有 rank 0 写文件
+            if self.is_main:
+                atomic_torch_save(raw_model.state_dict(), save_path)
+                if self.stop_requested:
+                    print(f"⏹ 训练已停止，模型已保存到: {os.path.abspath(save_path)}")
+                else:
+                    print(f"✅ 训练完成，模型已保存到: {os.path.abspath(save_path)}")
+
+                # === 保存训练日志 ===
+                log_path = os.path.join(save_dir, f"{model_name}_log.json")
+                with open(log_path, "w", encoding="utf-8") as f:
+                    json.dump(self.logs, f, indent=4, ensure_ascii=False)
+                print(f"📘 训练日志已保存到: {os.path.abspath(log_path)}")
 
-        # === 保存模型 ===
-        save_path = os.path.join(save_dir, f"{model_name}.pth")
-        torch.save(model.state_dict(), save_path)
-        print(f"✅ 训练完成，模型已保存到: {os.path.abspath(save_path)}")
+                log_writer.write("end", {"model_path": save_path, **summary})
 
-        # === 保存训练日志 ===
-        log_path = os.path.join(save_dir, f"{model_name}_log.json")
-        with open(log_path, "w", encoding="utf-8") as f:
-            json.dump(self.logs, f, indent=4, ensure_ascii=False)
-        print(f"📘 训练日志已保存到: {os.path.abspath(log_path)}")
+                # === 保存训练摘要（结束原因、节省的 epoch 数、最优 epoch） ===
+                summary_path = os.path.join(save_dir, f"{model_name}_summary.json")
+                with open(summary_path, "w", encoding="utf-8") as f:
+                    json.dump(summary, f, indent=4, ensure_ascii=False)
+        finally:
+            if publisher is not None:
+                # 送达剩余的进度事件（正常结束时已关闭，重复调用无副作用）
+                publisher.close()
+            if log_writer is not None:
+                log_writer.close()
 
+        if self.distributed:
+            # 等待 rank 0 写完文件再返回
+            dist.barrier()
 
         return {
             "model_path": save_path,
             "final_train_acc": train_acc,
-            "final_val_acc": val_acc
+            "final_val_acc": val_acc,
+            "stopped": self.stop_requested,
+            "world_size": self.world_size,
+            **summary
         }
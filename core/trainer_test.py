@@ -3,7 +3,7 @@ from config.config_manager import ConfigManager
 from core.model_factory import ModelFactory
 
 
-def handle_train_request():
+def handle_train_request(resume_from=None):
     config_manager = ConfigManager()
     model_factory = ModelFactory(config_manager)
 
@@ -12,7 +12,7 @@ def handle_train_request():
         print("Progress:", log)
 
     trainer = Trainer(model_factory.create_training_components(), progress_callback=progress_update)
-    result = trainer.train()
+    result = trainer.train(resume_from=resume_from)
     return result
 
 
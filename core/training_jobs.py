@@ -0,0 +1,339 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional
+
+from config.config_manager import ConfigManager
+
+# 任务状态
+QUEUED, RUNNING, COMPLETED, FAILED, STOPPED = "queued", "running", "completed", "failed", "stopped"
+FINISHED_STATES = (COMPLETED, FAILED, STOPPED)
+
+
+def _job_process(training_config: Dict[str, Any], events, stop_event, threads: int,
+                 resume_from: Optional[str]):
+    """
+    训练子进程入口：进度事件写入跨进程队列（put 不阻塞训练循环），
+    stop_event 被设置时调用 Trainer.request_stop()
+    """
+    training_id = training_config["training_id"]
+
+    def emit(event: str, data, coalesce: bool = False):
+        events.put({"training_id": training_id, "event": event, "data": data, "coalesce": coalesce})
+
+    try:
+        import torch
+        from core.model_factory import ModelFactory
+        from core.trainer import Trainer
+
+        torch.set_num_threads(threads)
+        components = ModelFactory(ConfigManager()).create_training_components(training_config)
+        trainer = Trainer(components,
+                          progress_callback=lambda log: emit("training_progress", log),
+                          step_callback=lambda stats: emit("training_step", stats, coalesce=True))
+
+        def watch_stop():
+            stop_event.wait()
+            trainer.request_stop()
+
+        threading.Thread(target=watch_stop, daemon=True).start()
+        result = trainer.train(resume_from=resume_from)
+        if result["stopped"]:
+            emit("training_stopped", result)
+        else:
+            emit("training_complete", result)
+    except Exception as e:
+        emit("training_error", {"error": str(e), "traceback": traceback.format_exc()})
+
+
+class ProgressForwarder:
+    """
+    进度事件转发：
+    - 训练进程写入跨进程队列，转发线程读取后按任务分别缓存
+    - 可合并事件（coalesce=True）同一任务只保留最新一条；其余事件（每个 epoch 的日志、开始 / 结束）按顺序保留
+    - 每个任务最多每 min_interval 秒发送一次，结束类事件到达时立即发送
+    发送在转发线程中完成，客户端再慢也不会影响训练进程
+    """
+
+    def __init__(self, emit: Callable[[str, Any, str], None], min_interval: float = 0.5):
+        self.emit = emit  # emit(event, data, training_id)
+        self.min_interval = min_interval
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._last_sent: Dict[str, float] = {}
+
+    def add(self, message: Dict[str, Any]):
+        pending = self._pending.setdefault(message["training_id"], [])
+        if message.get("coalesce"):
+            # 替换同类的旧事件
+            pending[:] = [m for m in pending if m["event"] != message["event"] or not m.get("coalesce")]
+        pending.append(message)
+
+    def flush(self, force: bool = False):
+        now = time.monotonic()
+        for training_id in list(self._pending):
+            messages = self._pending[training_id]
+            if not messages:
+                continue
+            urgent = any(m["event"] in ("training_complete", "training_error", "training_stopped")
+                         for m in messages)
+            if not (force or urgent or now - self._last_sent.get(training_id, 0.0) >= self.min_interval):
+                continue
+            self._pending[training_id] = []
+            self._last_sent[training_id] = now
+            for message in messages:
+                try:
+                    self.emit(message["event"], message["data"], training_id)
+                except Exception as e:
+                    print(f"[WARN] 推送训练进度失败: {e}")
+
+    def discard(self, training_id: str):
+        self._pending.pop(training_id, None)
+        self._last_sent.pop(training_id, None)
+
+
+class TrainingJobManager:
+    """
+    input:ConfigManager
+    训练任务队列：
+    1. submit 根据训练请求生成训练配置并排队，最多同时运行 max_concurrent 个任务
+    2. 每个任务在独立的 spawn 子进程中训练，服务进程始终可以响应
+    3. stop 通知子进程在下一个 batch 边界停止并保存模型；排队中的任务直接取消
+    4. 进度事件经 ProgressForwarder 合并、限速后通过 emit 回调推送
+    """
+
+    def __init__(self, config_manager: ConfigManager, emit: Callable[[str, Any, str], None],
+                 max_concurrent: int = 1, progress_interval: float = 0.5, max_history: int = 100):
+        self.config_manager = config_manager
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_history = max_history
+        self.threads_per_job = max(1, (os.cpu_count() or 1) // self.max_concurrent)
+
+        # torch 不支持在已初始化线程池的进程中 fork，子进程统一使用 spawn
+        self._context = multiprocessing.get_context("spawn")
+        self._events = self._context.Queue()
+        self._forwarder = ProgressForwarder(emit, progress_interval)
+        self._emit = emit
+
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._processes: Dict[str, Any] = {}
+        self._stop_events: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="training-jobs", daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout: float = 30.0):
+        """停止所有任务并等待子进程退出，超时仍未退出的子进程强制结束"""
+        with self._lock:
+            for training_id in list(self._jobs):
+                self.stop(training_id)
+            processes = dict(self._processes)
+        deadline = time.monotonic() + timeout
+        for training_id, process in processes.items():
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"[WARN] 训练任务 {training_id} 未在 {timeout:.0f} 秒内退出，强制结束")
+                process.terminate()
+                process.join(timeout=5)
+        self._running = False
+
+    # ==================== 任务操作 ====================
+
+    def submit(self, training_request: Dict[str, Any], owner: Optional[str] = None) -> Dict[str, Any]:
+        """提交训练任务，返回任务信息（含 training_id 与排队位置）"""
+        training_config = self.config_manager.create_training_config(training_request)
+        if not training_config["model_architecture"] or not training_config["dataset_name"]:
+            raise ValueError("model_architecture and dataset_name are required")
+        if not training_config["save_model_name"]:
+            training_config["save_model_name"] = training_config["training_id"]
+
+        with self._lock:
+            # create_training_config 的 training_id 精确到秒，同一秒内提交的任务需要区分
+            base_id, suffix = training_config["training_id"], 1
+            while training_config["training_id"] in self._jobs:
+                suffix += 1
+                training_config["training_id"] = f"{base_id}_{suffix}"
+
+            training_id = training_config["training_id"]
+            self._jobs[training_id] = {
+                "training_id": training_id,
+                "status": QUEUED,
+                "owner": owner,
+                "training_config": training_config,
+                "resume_from": training_request.get("resume_from"),
+                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "started_at": None,
+                "finished_at": None,
+                "latest_log": None,
+                "latest_step": None,
+                "epochs_reported": 0,
+                "result": None,
+                "error": None,
+            }
+            self._dispatch()
+            return self.get_job(training_id)
+
+    def stop(self, training_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(training_id)
+            if job is None or job["status"] in FINISHED_STATES:
+                return False
+            if job["status"] == QUEUED:
+                self._finish(job, STOPPED)
+                self._emit("training_stopped", "任务已取消", training_id)
+                return True
+            self._stop_events[training_id].set()
+            return True
+
+    def get_job(self, training_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(training_id)
+            if job is None:
+                return None
+            info = {k: v for k, v in job.items() if k != "training_config"}
+            info["model_architecture"] = job["training_config"]["model_architecture"]
+            info["dataset_name"] = job["training_config"]["dataset_name"]
+            info["save_model_name"] = job["training_config"]["save_model_name"]
+            info["hyperparameters"] = job["training_config"]["hyperparameters"]
+            if job["status"] == QUEUED:
+                queued = [j for j in self._jobs.values() if j["status"] == QUEUED]
+                info["queue_position"] = queued.index(job) + 1
+            return info
+
+    def list_jobs(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self.get_job(training_id) for training_id, job in self._jobs.items()
+                    if status is None or job["status"] == status]
+
+    def jobs_for_owner(self, owner: str) -> List[str]:
+        with self._lock:
+            return [training_id for training_id, job in self._jobs.items()
+                    if job["owner"] == owner and job["status"] not in FINISHED_STATES]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING, COMPLETED, FAILED, STOPPED)}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            return {"max_concurrent": self.max_concurrent, "threads_per_job": self.threads_per_job, **counts}
+
+    # ==================== 内部调度 ====================
+
+    def _dispatch(self):
+        """在并发上限内启动排队中的任务（调用方持有锁）"""
+        running = sum(1 for job in self._jobs.values() if job["status"] == RUNNING)
+        for job in self._jobs.values():
+            if running >= self.max_concurrent:
+                break
+            if job["status"] != QUEUED:
+                continue
+
+            training_id = job["training_id"]
+            stop_event = self._context.Event()
+            process = self._context.Process(
+                target=_job_process,
+                args=(job["training_config"], self._events, stop_event, self.threads_per_job, job["resume_from"]),
+                name=f"train-{training_id}",
+                # 非守护进程：DataLoader 开启 num_workers 时需要在训练进程中再创建子进程
+                daemon=False
+            )
+            process.start()
+            self._processes[training_id] = process
+            self._stop_events[training_id] = stop_event
+            job["status"] = RUNNING
+            job["started_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            job["pid"] = process.pid
+            running += 1
+            self._emit("training_started", {"training_id": training_id}, training_id)
+            print(f"[INFO] 训练任务已启动: {training_id} (pid {process.pid})")
+
+    def _finish(self, job: Dict[str, Any], status: str, result=None, error: Optional[str] = None):
+        job["status"] = status
+        job["finished_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        job["result"] = result
+        job["error"] = error
+        # 子进程句柄保留到进程退出后由 _check_processes 回收
+        self._stop_events.pop(job["training_id"], None)
+
+        # 只保留最近 max_history 个已结束的任务
+        finished = [training_id for training_id, j in self._jobs.items() if j["status"] in FINISHED_STATES]
+        for training_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[training_id]
+
+    def _handle(self, message: Dict[str, Any]):
+        training_id, event, data = message["training_id"], message["event"], message["data"]
+        with self._lock:
+            job = self._jobs.get(training_id)
+            if job is None:
+                return
+            if event == "training_progress":
+                job["latest_log"] = data
+                job["epochs_reported"] += 1
+            elif event == "training_step":
+                job["latest_step"] = data
+            elif event == "training_complete":
+                self._finish(job, COMPLETED, result=data)
+            elif event == "training_stopped":
+                self._finish(job, STOPPED, result=data)
+                # 前端只接收提示信息字符串
+                message = {**message, "data": f"训练已停止，模型已保存: {data['model_path']}"}
+            elif event == "training_error":
+                self._finish(job, FAILED, error=data["error"])
+                print(f"[ERROR] 训练任务 {training_id} 失败: {data['error']}")
+                # 前端只接收错误信息字符串
+                message = {**message, "data": data["error"]}
+
+        self._forwarder.add(message)
+
+    def _drain(self, timeout: float = 0.0):
+        """处理队列中积压的全部事件"""
+        try:
+            message = self._events.get(timeout=timeout) if timeout > 0 else self._events.get_nowait()
+            while True:
+                self._handle(message)
+                message = self._events.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _check_processes(self):
+        """回收已退出的子进程；异常退出（未发送结束事件）的任务标记为失败"""
+        with self._lock:
+            exited = {training_id: process for training_id, process in self._processes.items()
+                      if not process.is_alive()}
+        if not exited:
+            return
+
+        # 子进程退出前已把事件写入队列，先处理完再判断
+        self._drain()
+        with self._lock:
+            for training_id, process in exited.items():
+                process.join(timeout=0)
+                self._processes.pop(training_id, None)
+                job = self._jobs.get(training_id)
+                if job is not None and job["status"] == RUNNING:
+                    error = f"Training process exited unexpectedly (exit code {process.exitcode})"
+                    self._finish(job, FAILED, error=error)
+                    self._forwarder.add({"training_id": training_id, "event": "training_error", "data": error})
+
+    def _loop(self):
+        while self._running:
+            try:
+                self._drain(timeout=0.1)
+            except Exception as e:
+                print(f"[ERROR] 处理训练事件失败: {e}")
+
+            self._check_processes()
+            with self._lock:
+                self._dispatch()
+            self._forwarder.flush()
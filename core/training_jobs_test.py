@@ -0,0 +1,66 @@
+import time
+
+from core.training_jobs import ProgressForwarder
+
+
+def _message(event, data, coalesce=False, training_id="job"):
+    return {"training_id": training_id, "event": event, "data": data, "coalesce": coalesce}
+
+
+def test_coalescible_events_keep_only_latest():
+    sent = []
+    forwarder = ProgressForwarder(lambda event, data, training_id: sent.append((event, data)), min_interval=60)
+    forwarder.add(_message("training_progress", {"epoch": 1}))
+    for step in range(10):
+        forwarder.add(_message("training_step", {"step": step}, coalesce=True))
+    forwarder.add(_message("training_progress", {"epoch": 2}))
+    forwarder.flush()
+
+    assert sent == [
+        ("training_progress", {"epoch": 1}),
+        ("training_step", {"step": 9}),
+        ("training_progress", {"epoch": 2}),
+    ]
+
+
+def test_rate_limit_per_job():
+    sent = []
+    forwarder = ProgressForwarder(lambda event, data, training_id: sent.append(training_id), min_interval=60)
+    forwarder.add(_message("training_progress", {}, training_id="a"))
+    forwarder.flush()
+    forwarder.add(_message("training_progress", {}, training_id="a"))
+    forwarder.add(_message("training_progress", {}, training_id="b"))
+    forwarder.flush()
+    # a 在限速间隔内，只有 b 被发送
+    assert sent == ["a", "b"]
+
+    forwarder.flush(force=True)
+    assert sent == ["a", "b", "a"]
+
+
+def test_terminal_events_flush_immediately():
+    sent = []
+    forwarder = ProgressForwarder(lambda event, data, training_id: sent.append(event), min_interval=60)
+    forwarder.add(_message("training_progress", {}))
+    forwarder.flush()
+    forwarder.add(_message("training_step", {}, coalesce=True))
+    forwarder.add(_message("training_complete", {}))
+    forwarder.flush()
+    assert sent == ["training_progress", "training_step", "training_complete"]
+
+
+def test_emit_errors_are_swallowed():
+    forwarder = ProgressForwarder(lambda event, data, training_id: 1 / 0, min_interval=0)
+    forwarder.add(_message("training_progress", {}))
+    forwarder.flush()
+
+
+def test_interval_elapsed_allows_next_send():
+    sent = []
+    forwarder = ProgressForwarder(lambda event, data, training_id: sent.append(event), min_interval=0.05)
+    forwarder.add(_message("training_progress", {}))
+    forwarder.flush()
+    forwarder.add(_message("training_progress", {}))
+    time.sleep(0.06)
+    forwarder.flush()
+    assert len(sent) == 2
@@ -0,0 +1,192 @@
+import json
+import os
+import time
+from typing import Dict, Any, List, Optional
+
+LOG_PATTERN = "{model_name}_log.jsonl"
+
+
+def training_log_path(save_dir: str, model_name: str) -> str:
+    return os.path.join(save_dir, LOG_PATTERN.format(model_name=model_name))
+
+
+def truncate_training_log(path: str, completed_epochs: int) -> bool:
+    """
+    断点续训前截断日志：保留到第 completed_epochs 个 epoch 的 epoch 记录为止，
+    之后的记录（中断 epoch 的 step 进度、上次运行的 end 等）全部丢弃，重跑的 epoch 不会记录两次
+    Returns:
+        是否截断；日志不存在或找不到对应的 epoch 记录时不修改文件
+    """
+    if not os.path.exists(path):
+        return False
+    if completed_epochs <= 0:
+        open(path, "w", encoding="utf-8").close()
+        return True
+
+    cut = None
+    with open(path, "rb+") as f:
+        offset = 0
+        for line in f:
+            offset += len(line)
+            if not line.endswith(b"\n"):
+                break
+            record = TrainingLogReader._parse(line, "epoch")
+            if record is not None and record.get("epoch") == completed_epochs:
+                cut = offset
+        if cut is None:
+            return False
+        f.truncate(cut)
+    return True
+
+
+class TrainingLogWriter:
+    """
+    追加写入的 JSONL 训练日志，每个事件一行：{"type": "epoch", "time": ..., ...}
+    每行写入后立即 flush（其他进程可以实时读取），fsync 按条数 / 时间间隔批量执行，
+    训练异常中断时已写入的日志仍然保留
+    """
+
+    def __init__(self, path: str, append: bool = False, fsync_every: int = 50, fsync_interval: float = 5.0):
+        """
+        Args:
+            path: 日志文件路径
+            append: True 时在已有日志后追加（断点续训），否则覆盖
+            fsync_every: 每写入多少行 fsync 一次
+            fsync_interval: 距上次 fsync 超过多少秒时 fsync
+        """
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def write(self, event_type: str, data: Dict[str, Any]):
+        record = {"type": event_type, "time": round(time.time(), 3), **data}
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TrainingLogReader:
+    """
+    按需读取 JSONL 训练日志，不把整个文件读入内存：
+    - read：从字节偏移 offset 开始分页读取，返回 next_offset 供下一页 / 实时跟踪继续读取
+    - tail：从文件末尾倒序读取最近 n 条
+    - downsample：单次遍历，按步长抽样为不超过 max_points 条（总是包含最后一条）
+    正在写入的最后一行（没有换行符）不会被返回
+    """
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Training log not found: {path}")
+        self.path = path
+
+    @staticmethod
+    def _parse(line: bytes, event_type: Optional[str]) -> Optional[Dict[str, Any]]:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        if event_type is not None and record.get("type") != event_type:
+            return None
+        return record
+
+    def read(self, offset: int = 0, limit: int = 100, event_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Returns:
+            {"events": [...], "next_offset": int, "eof": bool}
+        """
+        events = []
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while len(events) < limit:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    # 文件末尾或尚未写完的行
+                    break
+                offset += len(line)
+                record = self._parse(line, event_type)
+                if record is not None:
+                    events.append(record)
+            eof = offset >= os.fstat(f.fileno()).st_size
+        return {"events": events, "next_offset": offset, "eof": eof}
+
+    def tail(self, n: int = 20, event_type: Optional[str] = None, block_size: int = 64 * 1024) -> Dict[str, Any]:
+        """
+        Returns:
+            {"events": [...], "next_offset": int}，next_offset 为文件中最后一个完整行的结束位置
+        """
+        events = []
+        with open(self.path, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            position, remainder, next_offset = end, b"", None
+            while position > 0 and len(events) < n:
+                read_size = min(block_size, position)
+                position -= read_size
+                f.seek(position)
+                lines = (f.read(read_size) + remainder).split(b"\n")
+                if next_offset is None:
+                    if len(lines) == 1 and position > 0:
+                        # 这一块里还没有换行符
+                        remainder = lines[0]
+                        continue
+                    # 最后一个换行符之后是空串或尚未写完的行
+                    next_offset = end - len(lines.pop())
+                # 第一段可能不是完整行，留到下一块拼接
+                remainder = lines.pop(0) if position > 0 else b""
+                for line in reversed(lines):
+                    record = self._parse(line, event_type) if line else None
+                    if record is not None:
+                        events.append(record)
+                        if len(events) >= n:
+                            break
+        events.reverse()
+        return {"events": events, "next_offset": next_offset if next_offset is not None else 0}
+
+    def downsample(self, max_points: int = 500, event_type: Optional[str] = "epoch") -> List[Dict[str, Any]]:
+        """缓冲区超过 2 * max_points 时丢弃一半并加倍步长，内存占用与文件长度无关"""
+        max_points = max(2, max_points)
+        kept, stride, index, last = [], 1, 0, None
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                record = self._parse(line, event_type)
+                if record is None:
+                    continue
+                if index % stride == 0:
+                    kept.append(record)
+                    if len(kept) >= 2 * max_points:
+                        kept = kept[::2]
+                        stride *= 2
+                last = record
+                index += 1
+        if len(kept) > max_points:
+            kept = kept[::2]
+        if last is not None and kept[-1] is not last:
+            if len(kept) >= max_points:
+                kept[-1] = last
+            else:
+                kept.append(last)
+        return kept
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from core.training_log import TrainingLogReader, TrainingLogWriter, training_log_path, truncate_training_log
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = training_log_path(str(tmp_path), "model")
+    with TrainingLogWriter(path, fsync_every=7) as writer:
+        writer.write("start", {"model_name": "model"})
+        for i in range(200):
+            writer.write("step", {"i": i, "padding": "x" * (i % 13)})
+            if i % 20 == 19:
+                writer.write("epoch", {"epoch": i // 20 + 1})
+    return path
+
+
+def test_writer_produces_one_json_object_per_line(log_path):
+    with open(log_path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 211
+    assert records[0]["type"] == "start"
+    assert all("time" in record for record in records)
+
+
+def test_append_mode_keeps_existing_lines(log_path):
+    with TrainingLogWriter(log_path, append=True) as writer:
+        writer.write("end", {})
+    assert TrainingLogReader(log_path).tail(1)["events"][0]["type"] == "end"
+
+
+def test_paging_covers_file_exactly_once(log_path):
+    reader = TrainingLogReader(log_path)
+    offset, events, eof = 0, [], False
+    while not eof:
+        page = reader.read(offset, limit=17)
+        events.extend(page["events"])
+        offset, eof = page["next_offset"], page["eof"]
+    assert len(events) == 211
+    assert [e["i"] for e in events if e["type"] == "step"] == list(range(200))
+
+
+def test_partial_last_line_is_not_returned(log_path):
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write('{"type": "epoch", "epoch": 11')
+    reader = TrainingLogReader(log_path)
+
+    tail = reader.tail(1)
+    assert tail["events"][0]["epoch"] == 10
+    page = reader.read(tail["next_offset"])
+    assert page["events"] == []
+    assert page["next_offset"] == tail["next_offset"]
+
+    # 写完后从 next_offset 继续读取即可跟上
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write("}\n")
+    assert reader.read(tail["next_offset"])["events"] == [{"type": "epoch", "epoch": 11}]
+
+
+@pytest.mark.parametrize("block_size", [5, 64, 1 << 16])
+def test_tail_with_any_block_size(log_path, block_size):
+    reader = TrainingLogReader(log_path)
+    assert [e["i"] for e in reader.tail(3, "step", block_size)["events"]] == [197, 198, 199]
+    assert [e["epoch"] for e in reader.tail(2, "epoch", block_size)["events"]] == [9, 10]
+    assert len(reader.tail(1000, block_size=block_size)["events"]) == 211
+
+
+def test_downsample_is_bounded_and_keeps_last(log_path):
+    reader = TrainingLogReader(log_path)
+    sampled = reader.downsample(max_points=9, event_type="step")
+    indices = [e["i"] for e in sampled]
+    assert len(indices) <= 9
+    assert indices[0] == 0 and indices[-1] == 199
+    assert indices == sorted(indices)
+
+    assert len(reader.downsample(max_points=500, event_type="epoch")) == 10
+
+
+def test_missing_log_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        TrainingLogReader(str(tmp_path / "missing.jsonl"))
+
+
+def test_truncate_drops_records_after_checkpoint_epoch(log_path):
+    with TrainingLogWriter(log_path, append=True) as writer:
+        writer.write("end", {"stop_reason": "user_stop"})
+
+    assert truncate_training_log(log_path, 3)
+    events = TrainingLogReader(log_path).tail(n=2)["events"]
+    assert events[-1] == {**events[-1], "type": "epoch", "epoch": 3}
+    assert events[0]["type"] == "step" and events[0]["i"] == 59
+
+
+def test_truncate_without_matching_epoch_keeps_file(log_path):
+    size = len(open(log_path, "rb").read())
+    assert not truncate_training_log(log_path, 42)
+    assert len(open(log_path, "rb").read()) == size
@@ -0,0 +1,228 @@
+"""
+本地训练任务服务
+提供前端 src/services/trainingSocket.ts 使用的 Socket.IO 接口，以及任务状态 HTTP 接口
+
+Socket.IO 事件：
+- start_training（客户端 -> 服务）提交训练任务，超出并发上限时排队
+- stop_training（客户端 -> 服务）停止指定任务；不带 training_id 时停止该连接提交的全部任务
+- subscribe（客户端 -> 服务）订阅指定任务的进度（断线重连后使用）
+- training_queued / training_started / training_progress / training_step / training_complete / training_stopped /
+  training_error（服务 -> 客户端）只推送给提交或订阅了该任务的连接；
+  training_step 为 epoch 内的速度与 ETA，同一任务只推送最新一条
+
+HTTP 接口：
+- GET  /api/training/jobs?status=running - 任务列表
+- GET  /api/training/jobs/<training_id>  - 任务详情（最新 epoch 日志、结果、排队位置）
+- POST /api/training/jobs                - 提交训练任务（请求体同 start_training）
+- POST /api/training/jobs/<training_id>/stop - 停止任务
+- GET  /api/training/stats               - 各状态任务数与并发配置
+- GET  /api/training/logs/<model_name>?offset=0&limit=100&type=epoch - 从字节偏移分页读取 JSONL 训练日志，
+  返回 next_offset，轮询时带上即可跟踪进行中的训练
+- GET  /api/training/logs/<model_name>/tail?n=20&type=step - 最近 n 条日志
+- GET  /api/training/logs/<model_name>/downsample?max_points=500&type=epoch - 抽样后的日志（绘制长曲线）
+
+启动方式：
+- python core/training_server.py [--port 5897] [--max-concurrent 2]
+"""
+
+import sys
+import os
+
+# 添加项目根目录到 sys.path，以便能够导入 core 模块
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import argparse
+from flask import Flask, request, jsonify
+from flask_cors import CORS
+from flask_socketio import SocketIO, emit, join_room
+
+from config.config_manager import ConfigManager
+from core.training_jobs import TrainingJobManager
+from core.training_log import TrainingLogReader, training_log_path
+
+app = Flask(__name__)
+CORS(app)
+# 训练在子进程中进行，服务进程只做转发，threading 模式即可
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
+
+# 全局变量：训练任务管理器（启动时创建）
+manager = None
+# 模型与训练日志目录（与 Trainer 一致）
+save_dir = os.path.join(project_root, 'storage/trained_models')
+
+
+def push_event(event: str, data, training_id: str):
+    """ProgressForwarder 的发送回调：推送到该任务的房间"""
+    socketio.emit(event, data, to=training_id)
+
+
+def create_manager(config_manager: ConfigManager, max_concurrent: int = 0) -> TrainingJobManager:
+    server_config = config_manager.get_training_server_config()
+    job_manager = TrainingJobManager(
+        config_manager,
+        push_event,
+        max_concurrent=max_concurrent or server_config["max_concurrent_jobs"],
+        progress_interval=server_config["progress_interval"],
+        max_history=server_config["max_history"]
+    )
+    job_manager.start()
+    return job_manager
+
+
+# ==================== Socket.IO 事件 ====================
+
+@socketio.on('start_training')
+def on_start_training(data):
+    try:
+        job = manager.submit(data or {}, owner=request.sid)
+    except Exception as e:
+        print(f"[ERROR] 提交训练任务失败: {e}")
+        emit('training_error', str(e))
+        return
+
+    training_id = job["training_id"]
+    join_room(training_id)
+    print(f"[INFO] 训练任务已提交: {training_id} ({job['status']})")
+    # 任务可能在提交时已经启动，training_started 早于加入房间，需要补发
+    if job["status"] == "running":
+        emit('training_started', {"training_id": training_id})
+    else:
+        emit('training_queued', {"training_id": training_id, "queue_position": job.get("queue_position")})
+
+
+@socketio.on('stop_training')
+def on_stop_training(data=None):
+    training_id = (data or {}).get("training_id") if isinstance(data, dict) else None
+    training_ids = [training_id] if training_id else manager.jobs_for_owner(request.sid)
+    if not training_ids:
+        emit('training_stopped', "没有正在进行的训练任务")
+        return
+    for training_id in training_ids:
+        if manager.stop(training_id):
+            print(f"[INFO] 已请求停止训练任务: {training_id}")
+
+
+@socketio.on('subscribe')
+def on_subscribe(data):
+    training_id = (data or {}).get("training_id")
+    job = manager.get_job(training_id) if training_id else None
+    if job is None:
+        emit('training_error', f"Training job not found: {training_id}")
+        return
+    join_room(training_id)
+    emit('job_status', job)
+
+
+@socketio.on('list_jobs')
+def on_list_jobs(data=None):
+    status = (data or {}).get("status") if isinstance(data, dict) else None
+    emit('job_list', manager.list_jobs(status))
+
+
+# ==================== HTTP 接口 ====================
+
+@app.route('/api/training/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify({"success": True, "jobs": manager.list_jobs(request.args.get("status"))})
+
+
+@app.route('/api/training/jobs/<training_id>', methods=['GET'])
+def get_job(training_id):
+    job = manager.get_job(training_id)
+    if job is None:
+        return jsonify({"success": False, "error": "任务不存在"}), 404
+    return jsonify({"success": True, "job": job})
+
+
+@app.route('/api/training/jobs', methods=['POST'])
+def submit_job():
+    try:
+        job = manager.submit(request.get_json(silent=True) or {})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, "job": job})
+
+
+@app.route('/api/training/jobs/<training_id>/stop', methods=['POST'])
+def stop_job(training_id):
+    if not manager.stop(training_id):
+        return jsonify({"success": False, "error": "任务不存在或已结束"}), 404
+    return jsonify({"success": True, "job": manager.get_job(training_id)})
+
+
+@app.route('/api/training/stats', methods=['GET'])
+def training_stats():
+    return jsonify({"success": True, "stats": manager.get_stats()})
+
+
+def open_training_log(model_name: str) -> TrainingLogReader:
+    if os.path.basename(model_name) != model_name:
+        raise ValueError(f"Invalid model name: {model_name}")
+    return TrainingLogReader(training_log_path(save_dir, model_name))
+
+
+@app.route('/api/training/logs/<model_name>', methods=['GET'])
+def read_training_log(model_name):
+    try:
+        page = open_training_log(model_name).read(
+            offset=request.args.get("offset", 0, type=int),
+            limit=min(request.args.get("limit", 100, type=int), 1000),
+            event_type=request.args.get("type")
+        )
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, **page})
+
+
+@app.route('/api/training/logs/<model_name>/tail', methods=['GET'])
+def tail_training_log(model_name):
+    try:
+        result = open_training_log(model_name).tail(
+            n=min(request.args.get("n", 20, type=int), 1000),
+            event_type=request.args.get("type")
+        )
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, **result})
+
+
+@app.route('/api/training/logs/<model_name>/downsample', methods=['GET'])
+def downsample_training_log(model_name):
+    try:
+        events = open_training_log(model_name).downsample(
+            max_points=min(request.args.get("max_points", 500, type=int), 5000),
+            event_type=request.args.get("type", "epoch")
+        )
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, "events": events})
+
+
+# ==================== 启动服务 ====================
+
+if __name__ == '__main__':
+    conf = ConfigManager()
+    server_config = conf.get_training_server_config()
+
+    parser = argparse.ArgumentParser(description='本地训练任务服务（Socket.IO）')
+    parser.add_argument('--host', default=server_config["host"])
+    parser.add_argument('--port', type=int, default=server_config["port"])
+    parser.add_argument('--max-concurrent', type=int, default=0,
+                        help='同时运行的训练任务数，默认读取 system_config.json')
+    args = parser.parse_args()
+
+    manager = create_manager(conf, args.max_concurrent)
+    print(f"[INFO] 训练服务启动 - http://localhost:{args.port} (最多同时训练 {manager.max_concurrent} 个任务)")
+    try:
+        socketio.run(app, host=args.host, port=args.port, allow_unsafe_werkzeug=True)
+    finally:
+        manager.shutdown()
@@ -11,15 +11,31 @@
 
 API端点：
 - POST /api/predict - 上传图片进行预测
+- POST /api/predict/batch - 批量上传图片（多文件或 zip/tar 压缩包），以 NDJSON 流式返回
 - GET /api/health - 健康检查
+- GET /api/cache/stats - 预测结果缓存命中/未命中/淘汰统计
+- GET /api/metrics - Prometheus 文本格式的各阶段延迟、请求数与错误数（多进程模式下为全部工作进程的汇总）
+- POST /api/debug/profile?count=N - 对接下来 N 次预测请求做 cProfile 剖析；GET 列出已保存的结果
+  （无鉴权，默认关闭，需在 prediction_config.json 的 profiling.debug_endpoint 中开启）
+- POST /api/model/reload - 按当前配置在后台热切换模型（失败自动回滚）
+
+启动方式：
+- python mobile_api.py                 开发模式（单进程 Flask debug）
+- python mobile_api.py --workers 4     生产模式（预派生多进程，共享内存中的模型权重）
+
+prediction_config.json 中开启 micro_batching 后，并发请求的字符会经由
+InferenceScheduler 在几毫秒的时间窗内合并为一次前向传播
 """
 
 import os
 import sys
-from flask import Flask, request, jsonify
+import argparse
+import json
+import tarfile
+import time
+import zipfile
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import numpy as np
-import cv2
 
 # 动态添加项目根目录到 sys.path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -27,6 +43,11 @@ sys.path.insert(0, project_root)
 
 from config.config_manager import ConfigManager
 from core.predictor import Predictor
+from core.inference_scheduler import InferenceScheduler
+from core.batch_predictor import BatchPredictor
+from core.result_cache import PredictionCache
+from core.prediction_service import run_prediction, current_model_version
+from core.metrics import (REGISTRY, REQUEST_LATENCY, PREDICT_REQUESTS, MultiprocessMetrics, SampledProfiler)
 
 # 创建Flask应用
 app = Flask(__name__)
@@ -34,9 +55,21 @@ CORS(app)  # 允许跨域请求（微信小程序需要）
 
 # 全局变量：预测器实例
 predictor = None
+# 全局变量：跨请求微批调度器（未开启时为 None）
+scheduler = None
+# 全局变量：多进程模式下的工作进程状态表（单进程模式为 None）
+worker_registry = None
+# 全局变量：预测结果缓存（未开启时为 None）
+result_cache = None
+# 全局变量：多进程模式下的跨进程指标汇总（单进程模式为 None）
+multiprocess_metrics = None
+# 全局变量：预测请求性能剖析器（默认只按需剖析，load_predictor 时按配置更新）
+profiler = SampledProfiler(os.path.join(project_root, 'storage/temp/profiles'))
+# 全局变量：是否开放 /api/debug/profile（load_predictor 时按配置更新）
+profile_endpoint_enabled = False
 
 
-def load_predictor():
+def load_predictor(start_threads=True):
     """
     初始化预测器
     从配置中读取模型并加载
@@ -47,20 +80,108 @@ def load_predictor():
         config_manager = ConfigManager()
         predictor = Predictor(config_manager)
         predictor.load_model()
+        init_result_cache(config_manager)
+        init_profiler(config_manager)
+
+        if start_threads:
+            start_background_threads()
         
     except Exception as e:
         print(f"[ERROR] 预测器加载失败: {str(e)}")
 
 
+def init_result_cache(config_manager):
+    """按配置创建预测结果缓存"""
+    global result_cache
+
+    cache_config = config_manager.get_result_cache_config()
+    if not cache_config["enabled"]:
+        return
+
+    shared_dir = cache_config["shared_dir"]
+    if shared_dir:
+        shared_dir = os.path.join(project_root, shared_dir)
+    result_cache = PredictionCache(
+        max_entries=cache_config["max_entries"],
+        max_bytes=cache_config["max_bytes"],
+        ttl=cache_config["ttl"],
+        shared_dir=shared_dir
+    )
+    result_cache.set_model_version(current_model_version(predictor))
+    print(f"[INFO] 已开启预测结果缓存: {cache_config}")
+
+
+def init_profiler(config_manager):
+    """按配置设置性能剖析的采样比例与输出目录"""
+    global profile_endpoint_enabled
+
+    profiling = config_manager.get_profiling_config()
+    profile_endpoint_enabled = profiling["debug_endpoint"]
+    profiler.max_pending = profiling["max_request_count"]
+    profiler.sample_rate = profiling["sample_rate"]
+    profiler.output_dir = os.path.join(project_root, profiling["output_dir"])
+    profiler.max_dumps = profiling["max_dumps"]
+
+
+def start_background_threads():
+    """
+    启动微批调度与配置监听等后台线程
+    多进程模式下线程无法跨 fork 继承，需在每个工作进程中单独调用
+    """
+    start_scheduler()
+
+    if predictor is not None:
+        hot_reload = predictor.config_manager.get_hot_reload_config()
+        if hot_reload["enabled"]:
+            predictor.start_config_watch(hot_reload["interval"])
+            print(f"[INFO] 已开启模型热切换监听: {hot_reload}")
+
+
+def start_worker_metrics(metrics_dir):
+    """
+    多进程模式下在每个工作进程中调用：丢弃从主进程继承的指标，
+    并定期把本进程的指标写入共享目录，供 /api/metrics 汇总
+    """
+    global multiprocess_metrics
+
+    REGISTRY.reset()
+    multiprocess_metrics = MultiprocessMetrics(REGISTRY, metrics_dir)
+    multiprocess_metrics.start()
+
+
+def start_scheduler():
+    """按配置启动微批调度线程"""
+    global scheduler
+
+    if predictor is None:
+        return
+
+    micro_batching = predictor.config_manager.get_micro_batching_config()
+    if micro_batching["enabled"]:
+        scheduler = InferenceScheduler(
+            predictor,
+            window_ms=micro_batching["window_ms"],
+            max_batch_size=micro_batching["max_batch_size"],
+            timeout=micro_batching["timeout"]
+        )
+        scheduler.start()
+        print(f"[INFO] 已开启微批推理: {micro_batching}")
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """健康检查接口"""
     predictor_ready = predictor is not None and predictor.is_ready()
-    return jsonify({
+    health = {
         'status': 'ok',
         'predictor_ready': predictor_ready,
         'device': str(predictor.device) if predictor else 'unknown'
-    })
+    }
+    if scheduler is not None:
+        health['scheduler'] = scheduler.get_stats()
+    if worker_registry is not None:
+        health['workers'] = worker_registry.get_status()
+    return jsonify(health)
 
 
 @app.route('/api/predict', methods=['POST'])
@@ -70,15 +191,31 @@ def predict():
     
     接收参数：
     - image: 图片文件（multipart/form-data）
+    - render: 可选，boxes 返回框坐标；png / jpeg 额外返回base64编码的标注图片
+    - model / weights: 可选，指定模型架构与权重（相对项目根目录，须位于模型存储目录），用于 A/B 测试
+    - shadow_model / shadow_weights: 可选，影子模型，结果放在 shadow 字段中，不影响主结果
     
     返回：
     {
         "success": true,
         "digit": "12345",
         "confidence": 0.98,
-        "probabilities": [...]
+        "probabilities": [...],
+        "boxes": [...],   // 仅 render 参数存在时
+        "image": "...",   // 仅 render=png/jpeg 时
+        "shadow": {...}   // 仅指定影子模型时
     }
     """
+    start = time.perf_counter()
+    with profiler.maybe_profile('predict'):
+        response = app.make_response(_predict())
+    REQUEST_LATENCY.observe(time.perf_counter() - start)
+    PREDICT_REQUESTS.inc(status=response.status_code)
+    return response
+
+
+def _predict():
+    """预测接口的实际处理逻辑，返回值交给 predict 统一记录请求指标"""
     try:
         # 检查是否有图片上传
         if 'image' not in request.files:
@@ -96,31 +233,51 @@ def predict():
                 'error': '文件名为空'
             }), 400
         
-        # 读取图片内容并转换为OpenCV格式
+        if predictor is None:
+            return jsonify({
+                'success': False,
+                'error': '预测器未初始化'
+            }), 500
+
+        render = request.form.get('render', '').lower()
+        if render not in ('', 'boxes', 'png', 'jpeg'):
+            return jsonify({
+                'success': False,
+                'error': f'不支持的render参数: {render}'
+            }), 400
+
+        model_spec = tuple(request.form.get(name, '') for name in
+                           ('model', 'weights', 'shadow_model', 'shadow_weights'))
         file_bytes = file.read()
-        nparr = np.frombuffer(file_bytes, np.uint8)
-        img_np = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if img_np is None:
+
+        # 预测（服务端从不弹窗，仅按需返回框坐标或标注图片），缓存与模型选择见 core/prediction_service.py
+        try:
+            result = run_prediction(predictor, file_bytes, render, model_spec,
+                                    scheduler=scheduler, result_cache=result_cache)
+        except (ValueError, FileNotFoundError) as e:
             return jsonify({
                 'success': False,
-                'error': '无法解析图片文件'
+                'error': f'无法加载指定模型: {str(e)}'
             }), 400
-        
-        if predictor is None:
+
+        if result is None:
             return jsonify({
                 'success': False,
-                'error': '预测器未初始化'
-            }), 500
+                'error': '无法解析图片文件'
+            }), 400
 
-        # 预测
-        result = predictor.predict(img_np)
-        
         # 返回结果
         return jsonify({
             'success': True,
             **result
         })
+
+    except TimeoutError as e:
+        print(f"[ERROR] 预测超时: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': '预测超时，请稍后重试'
+        }), 503
         
     except Exception as e:
         print(f"[ERROR] 预测失败: {str(e)}")
@@ -130,6 +287,185 @@ def predict():
         }), 500
 
 
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp', '.tif', '.tiff')
+
+
+def _iter_archive(file, max_image_bytes, max_archive_bytes, max_members):
+    """
+    逐个读取 zip / tar 压缩包中的图片，不一次性解压到内存
+    单个文件、解压总量与条目数超出限制时抛出 ValueError（防止压缩炸弹耗尽内存）
+    """
+    total = 0
+
+    def read_limited(name, declared_size, open_member):
+        nonlocal total
+        if declared_size > max_image_bytes:
+            raise ValueError(f'压缩包中的文件过大: {name} ({declared_size} 字节，上限 {max_image_bytes})')
+        if total + declared_size > max_archive_bytes:
+            raise ValueError(f'压缩包解压后总大小超过上限 {max_archive_bytes} 字节')
+        # 声明的大小可能不可信，实际读取时同样限制
+        with open_member() as member_file:
+            data = member_file.read(max_image_bytes + 1)
+        if len(data) > max_image_bytes:
+            raise ValueError(f'压缩包中的文件过大: {name} (上限 {max_image_bytes} 字节)')
+        total += len(data)
+        if total > max_archive_bytes:
+            raise ValueError(f'压缩包解压后总大小超过上限 {max_archive_bytes} 字节')
+        return data
+
+    stream = file.stream
+    if zipfile.is_zipfile(stream):
+        stream.seek(0)
+        with zipfile.ZipFile(stream) as archive:
+            members = archive.infolist()
+            if len(members) > max_members:
+                raise ValueError(f'压缩包条目数 {len(members)} 超过上限 {max_members}')
+            for info in members:
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield info.filename, read_limited(info.filename, info.file_size,
+                                                      lambda: archive.open(info))
+    else:
+        stream.seek(0)
+        with tarfile.open(fileobj=stream, mode='r:*') as archive:
+            for index, member in enumerate(archive):
+                if index >= max_members:
+                    raise ValueError(f'压缩包条目数超过上限 {max_members}')
+                if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield member.name, read_limited(member.name, member.size,
+                                                    lambda: archive.extractfile(member))
+
+
+def _iter_uploaded_images(batch_config):
+    """按上传方式产出 (文件名, 图片字节)"""
+    if 'archive' in request.files:
+        yield from _iter_archive(
+            request.files['archive'],
+            max_image_bytes=batch_config['max_image_bytes'],
+            max_archive_bytes=batch_config['max_archive_bytes'],
+            max_members=batch_config['max_archive_members']
+        )
+    for file in request.files.getlist('images'):
+        yield file.filename, file.read()
+
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    批量预测接口
+    
+    接收参数（二选一）：
+    - images: 多个图片文件（multipart/form-data 同名字段）
+    - archive: 包含图片的 zip / tar(.gz) 压缩包
+    
+    返回：application/x-ndjson，每张图片一行
+    {"name": "a.png", "success": true, "digit": "123", "confidence": 0.98, "probabilities": [...]}
+    """
+    if 'images' not in request.files and 'archive' not in request.files:
+        return jsonify({
+            'success': False,
+            'error': '没有上传图片，请在请求中包含images或archive字段'
+        }), 400
+
+    if predictor is None:
+        return jsonify({
+            'success': False,
+            'error': '预测器未初始化'
+        }), 500
+
+    batch_config = predictor.config_manager.get_batch_predict_config()
+    batch_predictor = BatchPredictor(
+        predictor,
+        max_workers=batch_config['max_workers'],
+        images_per_batch=batch_config['images_per_batch']
+    )
+    max_images = batch_config['max_images']
+    truncated = []
+
+    def limited_images():
+        for index, item in enumerate(_iter_uploaded_images(batch_config)):
+            if index >= max_images:
+                truncated.append(True)
+                break
+            yield item
+
+    def generate():
+        try:
+            for result in batch_predictor.predict_stream(limited_images()):
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+        except Exception as e:
+            print(f"[ERROR] 批量预测失败: {str(e)}")
+            yield json.dumps({'name': None, 'success': False, 'error': str(e)}, ensure_ascii=False) + '\n'
+            return
+        if truncated:
+            yield json.dumps({
+                'name': None,
+                'success': False,
+                'error': f'单次最多处理 {max_images} 张图片，其余图片未处理'
+            }, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """预测结果缓存统计"""
+    if result_cache is None:
+        return jsonify({
+            'success': True,
+            'enabled': False
+        })
+
+    return jsonify({
+        'success': True,
+        'enabled': True,
+        **result_cache.get_stats()
+    })
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus 指标
+    多进程模式下汇总全部工作进程（含已退出的）的数据，其他进程的数据最多滞后数秒
+    """
+    body = multiprocess_metrics.render() if multiprocess_metrics is not None else REGISTRY.render()
+    return Response(body, mimetype='text/plain; version=0.0.4',
+                    headers={'X-Worker-Pid': str(os.getpid())})
+
+
+@app.route('/api/debug/profile', methods=['GET', 'POST'])
+def debug_profile():
+    """
+    预测请求性能剖析
+    
+    POST 接收参数：
+    - count: 可选，对接下来的 count 次预测请求做 cProfile 剖析（默认 1，最多 max_request_count）
+    GET：列出已保存的 .prof 文件（可用 snakeviz / pstats 查看）
+    未在配置中开启 debug_endpoint 时返回 404
+    """
+    if not profile_endpoint_enabled:
+        return jsonify({
+            'success': False,
+            'error': '性能剖析接口未开启'
+        }), 404
+
+    if request.method == 'POST':
+        try:
+            count = int(request.args.get('count', 1))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'count 必须为整数'
+            }), 400
+        profiler.request(min(count, profiler.max_pending))
+
+    return jsonify({
+        'success': True,
+        **profiler.get_status(),
+        'dumps': profiler.list_dumps()
+    })
+
+
 @app.route('/api/model/info', methods=['GET'])
 def model_info():
     """获取当前加载的模型信息"""
@@ -154,16 +490,85 @@ def model_info():
         }), 500
 
 
+@app.route('/api/model/reload', methods=['POST'])
+def model_reload():
+    """
+    按 prediction_config.json 的当前配置热切换模型
+    
+    接收参数：
+    - wait: 可选，为 true 时等待切换完成后再返回
+    
+    多进程模式下只会切换处理该请求的工作进程，其余进程通过配置监听自动切换
+    """
+    try:
+        if predictor is None:
+            return jsonify({
+                'success': False,
+                'error': '预测器未初始化'
+            }), 500
+
+        wait = request.args.get('wait', 'false').lower() == 'true'
+        started = predictor.reload_model(wait=wait)
+
+        return jsonify({
+            'success': True,
+            'started': started,
+            **predictor.get_model_info()
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 # ==================== 启动服务 ====================
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='手写数字识别移动端预测服务')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=0,
+                        help='工作进程数，0 表示单进程开发模式')
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help='每个工作进程的 torch 线程数，默认按 CPU 核数平分')
+    parser.add_argument('--metrics-dir', default='storage/temp/metrics',
+                        help='多进程模式下各工作进程写入指标的共享目录（相对项目根目录）')
+    args = parser.parse_args()
+
     print("[INFO] 初始化预测器...")
-    load_predictor()
-    
-    print(f"[INFO] 服务启动 - http://localhost:5000/api/predict")
-    
-    app.run(
-        host='0.0.0.0',
-        port=5000,
-        debug=True
-    )
+
+    if args.workers > 0:
+        from mobile.prefork_server import PreforkServer
+
+        # 主进程只加载模型，后台线程在各工作进程中启动
+        load_predictor(start_threads=False)
+        metrics_dir = os.path.join(project_root, args.metrics_dir)
+        MultiprocessMetrics.clear(metrics_dir)
+
+        def on_worker_start(index):
+            start_worker_metrics(metrics_dir)
+            start_background_threads()
+
+        server = PreforkServer(
+            app,
+            predictor,
+            host=args.host,
+            port=args.port,
+            num_workers=args.workers,
+            threads_per_worker=args.threads_per_worker,
+            on_worker_start=on_worker_start
+        )
+        worker_registry = server.registry
+        server.serve_forever()
+    else:
+        load_predictor()
+
+        print(f"[INFO] 服务启动 - http://localhost:{args.port}/api/predict")
+
+        app.run(
+            host=args.host,
+            port=args.port,
+            debug=True
+        )
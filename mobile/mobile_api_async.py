@@ -0,0 +1,309 @@
+"""
+移动端预测API服务（异步 ASGI 版本）
+/api/predict 的参数与返回值与 mobile_api.py 相同（含 model / weights / shadow_model 与预测结果缓存），
+两者共用 core/prediction_service.py 中的预测流程，
+适合上传较慢的移动网络场景
+
+主要区别：
+1. 上传内容在事件循环中异步接收，慢速客户端不会占用工作线程，也不占用处理名额
+2. 解码、分割、推理等 CPU 密集步骤放到有界线程池中执行（OpenCV 与 torch 会释放 GIL）
+3. 限制同时处理的请求数，超出时直接返回 503
+4. 不提供批量预测、性能剖析与多进程预派生模式（见 mobile_api.py）
+
+API端点：
+- POST /api/predict - 上传图片进行预测
+- GET /api/health - 健康检查
+- GET /api/model/info - 当前模型信息
+- GET /api/metrics - Prometheus 文本格式的各阶段延迟、请求数与错误数
+- POST /api/model/reload - 按当前配置在后台热切换模型
+
+启动方式：
+- python mobile_api_async.py
+- uvicorn mobile.mobile_api_async:app --host 0.0.0.0 --port 5000
+"""
+
+import os
+import sys
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+# 动态添加项目根目录到 sys.path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from config.config_manager import ConfigManager
+from core.predictor import Predictor
+from core.inference_scheduler import InferenceScheduler
+from core.result_cache import PredictionCache
+from core.prediction_service import run_prediction, current_model_version
+from core.metrics import REGISTRY, REQUEST_LATENCY, PREDICT_REQUESTS
+
+# 全局变量：预测器、微批调度器、线程池与并发限制
+predictor = None
+scheduler = None
+executor = None
+in_flight = None
+# 全局变量：预测结果缓存（未开启时为 None）
+result_cache = None
+
+
+def load_predictor():
+    """
+    初始化预测器与线程池
+    从配置中读取模型并加载
+    """
+    global predictor, scheduler, executor, in_flight, result_cache
+
+    config_manager = ConfigManager()
+    async_config = config_manager.get_async_server_config()
+    executor = ThreadPoolExecutor(max_workers=async_config["max_workers"], thread_name_prefix="predict")
+    in_flight = asyncio.Semaphore(async_config["max_in_flight"])
+
+    try:
+        predictor = Predictor(config_manager)
+        predictor.load_model()
+
+        cache_config = config_manager.get_result_cache_config()
+        if cache_config["enabled"]:
+            shared_dir = cache_config["shared_dir"]
+            result_cache = PredictionCache(
+                max_entries=cache_config["max_entries"],
+                max_bytes=cache_config["max_bytes"],
+                ttl=cache_config["ttl"],
+                shared_dir=os.path.join(project_root, shared_dir) if shared_dir else None
+            )
+            result_cache.set_model_version(current_model_version(predictor))
+            print(f"[INFO] 已开启预测结果缓存: {cache_config}")
+
+        micro_batching = config_manager.get_micro_batching_config()
+        if micro_batching["enabled"]:
+            scheduler = InferenceScheduler(
+                predictor,
+                window_ms=micro_batching["window_ms"],
+                max_batch_size=micro_batching["max_batch_size"],
+                timeout=micro_batching["timeout"]
+            )
+            scheduler.start()
+            print(f"[INFO] 已开启微批推理: {micro_batching}")
+
+        hot_reload = config_manager.get_hot_reload_config()
+        if hot_reload["enabled"]:
+            predictor.start_config_watch(hot_reload["interval"])
+
+    except Exception as e:
+        print(f"[ERROR] 预测器加载失败: {str(e)}")
+
+
+async def health_check(request):
+    """健康检查接口"""
+    predictor_ready = predictor is not None and predictor.is_ready()
+    health = {
+        'status': 'ok',
+        'predictor_ready': predictor_ready,
+        'device': str(predictor.device) if predictor else 'unknown'
+    }
+    if scheduler is not None:
+        health['scheduler'] = scheduler.get_stats()
+    return JSONResponse(health)
+
+
+async def predict(request):
+    """
+    预测接口，参数与返回值同 mobile_api.predict
+    """
+    start = time.perf_counter()
+    response = await _predict(request)
+    REQUEST_LATENCY.observe(time.perf_counter() - start)
+    PREDICT_REQUESTS.inc(status=response.status_code)
+    return response
+
+
+async def _predict(request):
+    try:
+        # 异步接收上传内容，接收期间不占用处理名额
+        form = await request.form()
+        file = form.get('image')
+
+        # 检查是否有图片上传
+        if file is None or not hasattr(file, 'read'):
+            return JSONResponse({
+                'success': False,
+                'error': '没有上传图片，请在请求中包含image字段'
+            }, status_code=400)
+
+        # 检查文件名
+        if not file.filename:
+            return JSONResponse({
+                'success': False,
+                'error': '文件名为空'
+            }, status_code=400)
+
+        render = str(form.get('render', '')).lower()
+        if render not in ('', 'boxes', 'png', 'jpeg'):
+            return JSONResponse({
+                'success': False,
+                'error': f'不支持的render参数: {render}'
+            }, status_code=400)
+
+        if predictor is None:
+            return JSONResponse({
+                'success': False,
+                'error': '预测器未初始化'
+            }, status_code=500)
+
+        model_spec = tuple(str(form.get(name, '')) for name in
+                           ('model', 'weights', 'shadow_model', 'shadow_weights'))
+        file_bytes = await file.read()
+    except Exception as e:
+        print(f"[ERROR] 接收上传失败: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': str(e)
+        }, status_code=400)
+
+    if in_flight.locked():
+        return JSONResponse({
+            'success': False,
+            'error': '服务繁忙，请稍后重试'
+        }, status_code=503)
+
+    # 只在线程池处理期间占用名额
+    async with in_flight:
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(executor, partial(
+                run_prediction, predictor, file_bytes, render, model_spec,
+                scheduler=scheduler, result_cache=result_cache))
+
+            if result is None:
+                return JSONResponse({
+                    'success': False,
+                    'error': '无法解析图片文件'
+                }, status_code=400)
+
+            # 返回结果
+            return JSONResponse({
+                'success': True,
+                **result
+            })
+
+        except (ValueError, FileNotFoundError) as e:
+            return JSONResponse({
+                'success': False,
+                'error': f'无法加载指定模型: {str(e)}'
+            }, status_code=400)
+
+        except TimeoutError as e:
+            print(f"[ERROR] 预测超时: {str(e)}")
+            return JSONResponse({
+                'success': False,
+                'error': '预测超时，请稍后重试'
+            }, status_code=503)
+
+        except Exception as e:
+            print(f"[ERROR] 预测失败: {str(e)}")
+            return JSONResponse({
+                'success': False,
+                'error': str(e)
+            }, status_code=500)
+
+
+async def metrics(request):
+    """Prometheus 指标"""
+    return PlainTextResponse(REGISTRY.render(), media_type='text/plain; version=0.0.4')
+
+
+async def model_info(request):
+    """获取当前加载的模型信息"""
+    try:
+        if predictor is None:
+            return JSONResponse({
+                'success': False,
+                'error': '预测器未初始化'
+            }, status_code=500)
+
+        return JSONResponse({
+            'success': True,
+            **predictor.get_model_info()
+        })
+
+    except Exception as e:
+        return JSONResponse({
+            'success': False,
+            'error': str(e)
+        }, status_code=500)
+
+
+async def model_reload(request):
+    """按 prediction_config.json 的当前配置热切换模型，wait=true 时等待完成"""
+    try:
+        if predictor is None:
+            return JSONResponse({
+                'success': False,
+                'error': '预测器未初始化'
+            }, status_code=500)
+
+        wait = request.query_params.get('wait', 'false').lower() == 'true'
+        loop = asyncio.get_running_loop()
+        started = await loop.run_in_executor(executor, predictor.reload_model, wait)
+
+        return JSONResponse({
+            'success': True,
+            'started': started,
+            **predictor.get_model_info()
+        })
+
+    except Exception as e:
+        return JSONResponse({
+            'success': False,
+            'error': str(e)
+        }, status_code=500)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """启动时加载预测器，退出时停止微批调度线程与线程池"""
+    print("[INFO] 初始化预测器...")
+    load_predictor()
+    try:
+        yield
+    finally:
+        if scheduler is not None:
+            scheduler.stop()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+# 创建ASGI应用
+app = Starlette(
+    routes=[
+        Route('/api/health', health_check, methods=['GET']),
+        Route('/api/predict', predict, methods=['POST']),
+        Route('/api/metrics', metrics, methods=['GET']),
+        Route('/api/model/info', model_info, methods=['GET']),
+        Route('/api/model/reload', model_reload, methods=['POST']),
+    ],
+    middleware=[
+        # 允许跨域请求（微信小程序需要）
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    ],
+    lifespan=lifespan,
+)
+
+
+# ==================== 启动服务 ====================
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print(f"[INFO] 服务启动 - http://localhost:5000/api/predict")
+    uvicorn.run(app, host='0.0.0.0', port=5000)
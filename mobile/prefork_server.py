@@ -0,0 +1,187 @@
+"""
+预派生（pre-fork）多进程服务模式
+
+主进程加载一次模型，把权重移入共享内存（torch share_memory_），
+然后创建监听 socket 并 fork 出多个工作进程。工作进程共享同一个监听 socket
+（由内核分配连接）和同一份模型权重，各自限制 torch 线程数以避免争抢 CPU。
+
+依赖 os.fork，仅支持 Linux / macOS。
+"""
+
+import os
+import signal
+import socket
+import time
+import multiprocessing
+from typing import Callable, Dict, Any, List, Optional
+
+import numpy as np
+import torch
+from werkzeug.serving import make_server
+
+
+class WorkerRegistry:
+    """
+    跨进程共享的工作进程状态表
+    每个工作进程都能读取所有工作进程的就绪状态，供 /api/health 报告
+    """
+
+    def __init__(self, num_workers: int):
+        self.num_workers = num_workers
+        self._pids = multiprocessing.Array('i', num_workers)
+        self._ready = multiprocessing.Array('b', num_workers)
+        self._restarts = multiprocessing.Array('i', num_workers)
+        self.index: Optional[int] = None  # 当前进程对应的工作进程编号，主进程为 None
+
+    def mark_starting(self, index: int):
+        """fork 之前由主进程调用：清除就绪标记，之后只有子进程会写入就绪状态"""
+        self._pids[index] = 0
+        self._ready[index] = 0
+
+    def mark_started(self, index: int, pid: int):
+        """只记录 pid，不改动就绪标记（子进程可能已经先一步报告就绪）"""
+        self._pids[index] = pid
+
+    def mark_ready(self, index: int):
+        self._ready[index] = 1
+
+    def mark_stopped(self, index: int):
+        self._ready[index] = 0
+        self._restarts[index] += 1
+
+    def get_status(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "index": i,
+                "pid": self._pids[i],
+                "ready": bool(self._ready[i]),
+                "restarts": self._restarts[i],
+                "current": i == self.index,
+            }
+            for i in range(self.num_workers)
+        ]
+
+
+def share_model_memory(model: torch.nn.Module):
+    """把模型参数和缓冲区移入共享内存，fork 后所有工作进程读同一份权重"""
+    if isinstance(model, torch.nn.Module):
+        model.share_memory()
+    return model
+
+
+def default_threads_per_worker(num_workers: int) -> int:
+    """按 CPU 核数平分 torch 线程，至少 1 个"""
+    return max(1, (os.cpu_count() or 1) // num_workers)
+
+
+class PreforkServer:
+    """
+    input: WSGI app、已加载模型的 predictor
+    调用 serve_forever: 派生 num_workers 个工作进程并监控，异常退出时自动重启
+    """
+
+    def __init__(self, app, predictor, host: str = '0.0.0.0', port: int = 5000, num_workers: int = 2,
+                 threads_per_worker: Optional[int] = None,
+                 on_worker_start: Optional[Callable[[int], None]] = None):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("Pre-fork serving requires os.fork (Linux / macOS)")
+
+        self.app = app
+        self.predictor = predictor
+        self.host = host
+        self.port = port
+        self.num_workers = max(1, num_workers)
+        self.threads_per_worker = threads_per_worker or default_threads_per_worker(self.num_workers)
+        self.on_worker_start = on_worker_start
+        self.registry = WorkerRegistry(self.num_workers)
+
+        self._socket = None
+        self._children: Dict[int, int] = {}  # pid -> index
+        self._running = False
+
+    def _bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(128)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self, index: int):
+        self.registry.mark_starting(index)
+        pid = os.fork()
+        if pid == 0:
+            # 子进程：不再处理主进程的信号逻辑
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                self._worker_main(index)
+            except Exception as e:
+                print(f"[ERROR] 工作进程 {index} 异常退出: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+
+        self._children[pid] = index
+        self.registry.mark_started(index, pid)
+
+    def _worker_main(self, index: int):
+        self.registry.index = index
+        self.registry.mark_started(index, os.getpid())
+        torch.set_num_threads(self.threads_per_worker)
+
+        server = make_server(self.host, self.port, self.app, threaded=True, fd=self._socket.fileno())
+
+        if self.on_worker_start:
+            self.on_worker_start(index)
+
+        # 预热：跑一次推理，确认共享权重可用后才报告就绪
+        if self.predictor is not None and self.predictor.is_ready():
+            self.predictor._classify_crops([np.zeros((28, 28), dtype=np.uint8)])
+
+        self.registry.mark_ready(index)
+        print(f"[INFO] 工作进程 {index} 就绪 (pid={os.getpid()}, torch线程={self.threads_per_worker})")
+        server.serve_forever()
+
+    def _shutdown(self, signum=None, frame=None):
+        self._running = False
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def serve_forever(self):
+        if self.predictor is not None and self.predictor.is_ready():
+            share_model_memory(self.predictor.model)
+
+        self._socket = self._bind()
+        self._running = True
+        signal.signal(signal.SIGTERM, self._shutdown)
+        signal.signal(signal.SIGINT, self._shutdown)
+
+        print(f"[INFO] 预派生 {self.num_workers} 个工作进程 - http://{self.host}:{self.port}")
+        for index in range(self.num_workers):
+            self._spawn(index)
+
+        try:
+            while self._children:
+                try:
+                    pid, status = os.waitpid(-1, 0)
+                except ChildProcessError:
+                    break
+                except InterruptedError:
+                    continue
+
+                index = self._children.pop(pid, None)
+                if index is None:
+                    continue
+                self.registry.mark_stopped(index)
+
+                if self._running:
+                    print(f"[WARN] 工作进程 {index} (pid={pid}) 已退出，重新启动")
+                    time.sleep(1)
+                    self._spawn(index)
+        finally:
+            self._socket.close()
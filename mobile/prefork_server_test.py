@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("werkzeug")
+
+from mobile.prefork_server import WorkerRegistry
+
+
+def test_ready_reported_before_parent_records_pid_is_kept():
+    registry = WorkerRegistry(2)
+    registry.mark_starting(0)
+    # 子进程预热很快，先于主进程 fork 返回后的记录报告就绪
+    registry.mark_started(0, 1234)
+    registry.mark_ready(0)
+    registry.mark_started(0, 1234)
+
+    status = registry.get_status()[0]
+    assert status["pid"] == 1234 and status["ready"]
+
+
+def test_restart_clears_ready_flag():
+    registry = WorkerRegistry(1)
+    registry.mark_starting(0)
+    registry.mark_ready(0)
+    registry.mark_stopped(0)
+    registry.mark_starting(0)
+
+    status = registry.get_status()[0]
+    assert not status["ready"] and status["restarts"] == 1